@@ -3,22 +3,57 @@ import matplotlib.pyplot as plt
 import numpy as np
 from datetime import datetime
 import os
+import streak_distribution
+from result_writer import is_columnar, load_columns
+from figure_pool import FigurePool
 
 def load_latest_csv(results_dir):
-    # Get all CSV files in the directory
-    csv_files = [f for f in os.listdir(results_dir) if f.endswith('.csv')]
+    # Get all CSV files and complete columnar stores in the directory
+    csv_files = [f for f in os.listdir(results_dir)
+                 if f.endswith('.csv') or is_columnar(os.path.join(results_dir, f))]
     if not csv_files:
         raise FileNotFoundError(f"No CSV files found in {results_dir}")
     
     # Sort by modification time and get the latest
     latest_file = max(csv_files, key=lambda x: os.path.getmtime(os.path.join(results_dir, x)))
+    if is_columnar(os.path.join(results_dir, latest_file)):
+        # Memory-map the columns instead of parsing text
+        return load_columns(os.path.join(results_dir, latest_file))
     return pd.read_csv(os.path.join(results_dir, latest_file))
 
-def create_individual_runs_plot(df, results_dir, max_streak):
+def streak_statistics(df, max_streak):
+    """
+    Per-streak-length summaries of the flips required, the data behind the plots.
+    
+    Args:
+        df (pd.DataFrame): Rows with Run, Streak and Flips
+        max_streak (int): Longest streak length plotted
+        
+    Returns:
+        dict: run_flips (runs x streak lengths) and the mean, std, median and
+            trimmed mean (middle 90%) per streak length 1..max_streak
+    """
+    streaks = np.arange(1, max_streak + 1)
+    flips = df.groupby('Streak')['Flips']
+    
+    def trimmed_mean(x):
+        # Exclude top and bottom 5%
+        values = np.sort(x.to_numpy())
+        return values[int(0.05 * len(values)):int(0.95 * len(values))].mean()
+    
+    return {
+        'run_flips': df.pivot_table(index='Run', columns='Streak', values='Flips')
+                       .reindex(columns=streaks).to_numpy(),
+        'mean': flips.mean().reindex(streaks).to_numpy(),
+        'std': flips.std().reindex(streaks).to_numpy(),
+        'median': flips.median().reindex(streaks).to_numpy(),
+        'trimmed_mean': flips.apply(trimmed_mean).reindex(streaks).to_numpy()
+    }
+
+def plot_individual_runs(run_flips, results_dir, max_streak):
     plt.figure(figsize=(12, 8))
-    for run in df['Run'].unique():
-        run_data = df[df['Run'] == run]
-        plt.plot(run_data['Streak'], run_data['Flips'], alpha=0.1, color='blue')
+    # One line per run
+    plt.plot(range(1, max_streak + 1), run_flips.T, alpha=0.1, color='blue')
     
     plt.title('Individual Runs: Flips Required vs Streak Length')
     plt.xlabel('Streak Length')
@@ -27,13 +62,14 @@ def create_individual_runs_plot(df, results_dir, max_streak):
     plt.savefig(os.path.join(results_dir, f'individual_runs_{max_streak}.png'))
     plt.close()
 
-def create_median_plot(df, results_dir, max_streak):
-    median_flips = df.groupby('Streak')['Flips'].median()
+def plot_median(median_flips, results_dir, max_streak):
     theoretical = [2**n for n in range(1, max_streak + 1)]
     
     plt.figure(figsize=(12, 8))
     plt.plot(range(1, max_streak + 1), median_flips, 'o-', label='Median Flips')
     plt.plot(range(1, max_streak + 1), theoretical, 'r--', label='Theoretical')
+    plt.plot(range(1, max_streak + 1), streak_distribution.median(np.arange(1, max_streak + 1)),
+             'k:', label='Exact Median')
     plt.title('Median Flips Required vs Streak Length')
     plt.xlabel('Streak Length')
     plt.ylabel('Number of Flips')
@@ -42,15 +78,15 @@ def create_median_plot(df, results_dir, max_streak):
     plt.savefig(os.path.join(results_dir, f'median_plot_{max_streak}.png'))
     plt.close()
 
-def create_combined_plot(df, results_dir, max_streak):
-    mean_flips = df.groupby('Streak')['Flips'].mean()
-    std_flips = df.groupby('Streak')['Flips'].std()
+def plot_combined(mean_flips, std_flips, results_dir, max_streak):
     theoretical = [2**n for n in range(1, max_streak + 1)]
     
     plt.figure(figsize=(12, 8))
     plt.errorbar(range(1, max_streak + 1), mean_flips, yerr=std_flips, 
                 fmt='o-', capsize=5, label='Mean Flips')
     plt.plot(range(1, max_streak + 1), theoretical, 'r--', label='Theoretical')
+    plt.plot(range(1, max_streak + 1), streak_distribution.mean(np.arange(1, max_streak + 1)),
+             'k:', label='Exact Mean')
     plt.title('Mean Flips Required vs Streak Length')
     plt.xlabel('Streak Length')
     plt.ylabel('Number of Flips')
@@ -59,16 +95,15 @@ def create_combined_plot(df, results_dir, max_streak):
     plt.savefig(os.path.join(results_dir, f'combined_plot_{max_streak}.png'))
     plt.close()
 
-def create_trimmed_plot(df, results_dir, max_streak):
-    # Calculate trimmed mean (excluding top and bottom 5%)
-    trimmed_mean = df.groupby('Streak')['Flips'].apply(
-        lambda x: x.sort_values().iloc[int(0.05*len(x)):int(0.95*len(x))].mean()
-    )
+def plot_trimmed(trimmed_mean, results_dir, max_streak):
     theoretical = [2**n for n in range(1, max_streak + 1)]
     
     plt.figure(figsize=(12, 8))
     plt.plot(range(1, max_streak + 1), trimmed_mean, 'o-', label='Trimmed Mean')
     plt.plot(range(1, max_streak + 1), theoretical, 'r--', label='Theoretical')
+    plt.plot(range(1, max_streak + 1),
+             streak_distribution.trimmed_mean(np.arange(1, max_streak + 1), 0.05),
+             'k:', label='Exact Trimmed Mean')
     plt.title('Trimmed Mean Flips Required vs Streak Length')
     plt.xlabel('Streak Length')
     plt.ylabel('Number of Flips')
@@ -77,27 +112,43 @@ def create_trimmed_plot(df, results_dir, max_streak):
     plt.savefig(os.path.join(results_dir, f'trimmed_plot_{max_streak}.png'))
     plt.close()
 
+def create_individual_runs_plot(df, results_dir, max_streak):
+    plot_individual_runs(streak_statistics(df, max_streak)['run_flips'], results_dir, max_streak)
+
+def create_median_plot(df, results_dir, max_streak):
+    plot_median(streak_statistics(df, max_streak)['median'], results_dir, max_streak)
+
+def create_combined_plot(df, results_dir, max_streak):
+    stats = streak_statistics(df, max_streak)
+    plot_combined(stats['mean'], stats['std'], results_dir, max_streak)
+
+def create_trimmed_plot(df, results_dir, max_streak):
+    plot_trimmed(streak_statistics(df, max_streak)['trimmed_mean'], results_dir, max_streak)
+
 def main():
     # Create results directory
     results_dir = os.path.join("results", f"results_{datetime.now().strftime('%Y%m%d')}")
     os.makedirs(results_dir, exist_ok=True)
     
-    # Analyze both 100 and 1000 runs
-    for num_runs in [100, 1000]:
-        run_dir = os.path.join(results_dir, f"results_{num_runs}")
-        os.makedirs(run_dir, exist_ok=True)
-        
-        # Load the latest CSV file for this number of runs
-        df = load_latest_csv(run_dir)
-        
-        # Create plots for different streak ranges
-        for max_streak in [10, 20]:
-            streak_df = df[df['Streak'] <= max_streak]
+    # Analyze both 100 and 1000 runs; figures render in the background while
+    # the next results file loads
+    with FigurePool() as figures:
+        for num_runs in [100, 1000]:
+            run_dir = os.path.join(results_dir, f"results_{num_runs}")
+            os.makedirs(run_dir, exist_ok=True)
+            
+            # Load the latest CSV file for this number of runs
+            df = load_latest_csv(run_dir)
             
-            create_individual_runs_plot(streak_df, run_dir, max_streak)
-            create_median_plot(streak_df, run_dir, max_streak)
-            create_combined_plot(streak_df, run_dir, max_streak)
-            create_trimmed_plot(streak_df, run_dir, max_streak)
+            # Create plots for different streak ranges
+            for max_streak in [10, 20]:
+                # Summarize here; the workers only receive the per-streak arrays
+                stats = streak_statistics(df[df['Streak'] <= max_streak], max_streak)
+                
+                figures.render(plot_individual_runs, stats['run_flips'], run_dir, max_streak)
+                figures.render(plot_median, stats['median'], run_dir, max_streak)
+                figures.render(plot_combined, stats['mean'], stats['std'], run_dir, max_streak)
+                figures.render(plot_trimmed, stats['trimmed_mean'], run_dir, max_streak)
 
 if __name__ == "__main__":
     main() 
\ No newline at end of file
@@ -0,0 +1,264 @@
+"""
+Benchmarks for the simulation and analysis hot paths, with regression checks.
+
+Every benchmark runs a function at several sizes with a fixed seed and
+records, per case:
+- seconds: best wall time over --repeat timed calls
+- alloc_peak_bytes: peak memory allocated by Python and NumPy during one
+  call (tracemalloc)
+- peak_rss_bytes: peak resident memory of the process running the case
+
+Each case runs in a freshly spawned process, so the peak RSS of one case is
+not inflated by an earlier one. Results can be saved as a JSON baseline and
+later runs compared against it; a metric that grows by more than the
+threshold (and by more than a small absolute noise floor) is reported as a
+regression and the script exits with status 1.
+
+Usage:
+    python benchmark.py --save_baseline benchmark_baseline.json
+    python benchmark.py --baseline benchmark_baseline.json --threshold 0.25
+"""
+
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+import contextlib
+import io
+import json
+import multiprocessing
+import platform
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+from run_metrics import peak_memory
+
+SEED = 12345
+METRICS = ('seconds', 'alloc_peak_bytes', 'peak_rss_bytes')
+# Differences below these are noise whatever the relative change
+NOISE_FLOORS = {'seconds': 0.02, 'alloc_peak_bytes': 1 << 20, 'peak_rss_bytes': 8 << 20}
+
+
+def _flip_until_streak(max_streak, runs):
+    from streak_engine import flip_until_streak_numpy
+    rng = np.random.default_rng(SEED)
+    return lambda: [flip_until_streak_numpy(max_streak, rng) for _ in range(runs)]
+
+
+def _convergence(runs, max_flips):
+    from probability_convergence import run_convergence_analysis
+
+    def call():
+        np.random.seed(SEED)
+        return run_convergence_analysis(runs, max_flips)
+    return call
+
+
+def _equal_probability(runs, max_flips):
+    from exact_half_probability import run_equal_probability_analysis
+
+    def call():
+        np.random.seed(SEED)
+        return run_equal_probability_analysis(runs, max_flips)
+    return call
+
+
+def _statistics(runs, max_flips):
+    from probability_convergence import run_convergence_analysis, calculate_statistics
+    np.random.seed(SEED)
+    df = run_convergence_analysis(runs, max_flips)
+    return lambda: calculate_statistics(df)
+
+
+def _histogram_statistics(runs, max_flips):
+    from probability_convergence import run_convergence_analysis, histogram_statistics
+    np.random.seed(SEED)
+    histograms = {}
+    run_convergence_analysis(runs, max_flips, histograms=histograms, keep_rows=False)
+    return lambda: histogram_statistics(histograms)
+
+
+def _exact_half_theory(max_flips):
+    from exact_half_theory import exact_half_probability
+    flips = np.arange(2, max_flips + 1)
+    return lambda: exact_half_probability(flips)
+
+
+def _trimmed_stats(runs, max_streak):
+    from analyze_trimmed_data import calculate_trimmed_stats
+    from streak_engine import simulate_streak_table
+    flips = simulate_streak_table(runs, max_streak, seed=SEED)
+    df = pd.DataFrame({
+        'Run': np.repeat(np.arange(1, runs + 1), max_streak),
+        'Streak Target': np.tile(np.arange(1, max_streak + 1), runs),
+        'Flips Required': flips.ravel()
+    })
+    return lambda: calculate_trimmed_stats(df, max_streak)
+
+
+# name -> (setup returning the timed callable, sizes from small to large)
+BENCHMARKS = {
+    'flip_until_streak_numpy': (_flip_until_streak, [
+        {'max_streak': 10, 'runs': 200},
+        {'max_streak': 14, 'runs': 50},
+        {'max_streak': 18, 'runs': 10},
+    ]),
+    'run_convergence_analysis': (_convergence, [
+        {'runs': 1000, 'max_flips': 50},
+        {'runs': 10000, 'max_flips': 100},
+        {'runs': 100000, 'max_flips': 100},
+    ]),
+    'run_equal_probability_analysis': (_equal_probability, [
+        {'runs': 1000, 'max_flips': 20},
+        {'runs': 10000, 'max_flips': 50},
+        {'runs': 50000, 'max_flips': 100},
+    ]),
+    'calculate_statistics': (_statistics, [
+        {'runs': 1000, 'max_flips': 50},
+        {'runs': 10000, 'max_flips': 100},
+    ]),
+    'histogram_statistics': (_histogram_statistics, [
+        {'runs': 1000, 'max_flips': 50},
+        {'runs': 10000, 'max_flips': 100},
+    ]),
+    'exact_half_probability': (_exact_half_theory, [
+        {'max_flips': 10000},
+        {'max_flips': 1000000},
+    ]),
+    'calculate_trimmed_stats': (_trimmed_stats, [
+        {'runs': 1000, 'max_streak': 12},
+        {'runs': 10000, 'max_streak': 15},
+    ]),
+}
+
+
+def case_id(name, size):
+    """Key of a benchmark case, e.g. 'calculate_statistics[runs=1000,max_flips=50]'."""
+    return f"{name}[{','.join(f'{key}={value}' for key, value in size.items())}]"
+
+
+def run_case(name, size, repeat=5):
+    """
+    Measure one benchmark case in the current process.
+
+    Args:
+        name (str): Benchmark name (key of BENCHMARKS)
+        size (dict): Keyword arguments of the benchmark's setup
+        repeat (int): Number of timed calls; the fastest is kept
+
+    Returns:
+        dict: seconds, alloc_peak_bytes and peak_rss_bytes
+    """
+    setup, _ = BENCHMARKS[name]
+    # The simulators print progress; keep the benchmark output readable
+    with contextlib.redirect_stdout(io.StringIO()):
+        call = setup(**size)
+        times = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            call()
+            times.append(time.perf_counter() - start)
+
+        tracemalloc.start()
+        try:
+            call()
+            _, alloc_peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+
+    return {'seconds': min(times), 'alloc_peak_bytes': alloc_peak,
+            'peak_rss_bytes': peak_memory()[0]}
+
+
+def run_benchmarks(names=None, quick=False, repeat=5):
+    """
+    Run benchmark cases, each in a freshly spawned process.
+
+    Args:
+        names (list): Benchmarks to run (default: all)
+        quick (bool): Only run the smallest size of every benchmark
+        repeat (int): Timed calls per case
+
+    Returns:
+        dict: case id -> metrics
+    """
+    results = {}
+    context = multiprocessing.get_context('spawn')
+    for name in names or BENCHMARKS:
+        sizes = BENCHMARKS[name][1]
+        for size in sizes[:1] if quick else sizes:
+            key = case_id(name, size)
+            with ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+                results[key] = executor.submit(run_case, name, size, repeat).result()
+            print(f"{key:60} {results[key]['seconds']:9.4f}s "
+                  f"{results[key]['alloc_peak_bytes'] / 2**20:9.1f} MiB alloc "
+                  f"{(results[key]['peak_rss_bytes'] or 0) / 2**20:9.1f} MiB RSS")
+    return results
+
+
+def find_regressions(results, baseline, threshold=0.25):
+    """
+    Compare benchmark results with a baseline.
+
+    Args:
+        results (dict): case id -> metrics of the current run
+        baseline (dict): case id -> metrics of the baseline
+        threshold (float): Allowed relative growth of any metric
+
+    Returns:
+        list: (case id, metric, baseline value, new value) for every regression
+    """
+    regressions = []
+    for key, metrics in results.items():
+        if key not in baseline:
+            continue
+        for metric in METRICS:
+            old, new = baseline[key].get(metric), metrics.get(metric)
+            if old is None or new is None:
+                continue
+            if new > old * (1 + threshold) and new - old > NOISE_FLOORS[metric]:
+                regressions.append((key, metric, old, new))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the simulation and analysis hot paths.')
+    parser.add_argument('--benchmarks', nargs='+', choices=list(BENCHMARKS), default=None,
+                      help='Benchmarks to run (default: all)')
+    parser.add_argument('--quick', action='store_true',
+                      help='Only run the smallest size of every benchmark')
+    parser.add_argument('--repeat', type=int, default=5,
+                      help='Timed calls per case, the fastest is kept (default: 5)')
+    parser.add_argument('--baseline', type=str, default=None,
+                      help='JSON baseline to compare against')
+    parser.add_argument('--threshold', type=float, default=0.25,
+                      help='Relative growth of a metric counted as a regression (default: 0.25)')
+    parser.add_argument('--save_baseline', type=str, default=None,
+                      help='Write the results as a JSON baseline')
+
+    args = parser.parse_args()
+    results = run_benchmarks(args.benchmarks, args.quick, args.repeat)
+
+    if args.save_baseline is not None:
+        with open(args.save_baseline, 'w') as f:
+            json.dump({'machine': platform.platform(), 'python': sys.version.split()[0],
+                       'numpy': np.__version__, 'cases': results}, f, indent=2)
+        print(f"\nBaseline saved to {args.save_baseline}")
+
+    if args.baseline is not None:
+        with open(args.baseline) as f:
+            baseline = json.load(f)['cases']
+        regressions = find_regressions(results, baseline, args.threshold)
+        if regressions:
+            print(f"\nRegressions beyond {args.threshold:.0%}:")
+            for key, metric, old, new in regressions:
+                print(f"- {key} {metric}: {old:.4g} -> {new:.4g} ({new / old - 1:+.0%})")
+            return 1
+        print(f"\nNo regressions beyond {args.threshold:.0%} against {args.baseline}")
+    return 0
+
+
+if __name__ == "__main__":
+    exit(main())
@@ -11,24 +11,211 @@ import pandas as pd
 from datetime import datetime
 import os
 import argparse
-import math
+import time
 
-def run_equal_probability_analysis(runs=100000, max_flips=100):
+from result_writer import open_result_writer, CHUNK_ROWS, OUTPUT_FORMATS, RAW_OUTPUTS, SAMPLE_ROWS
+from sequential_sampling import sample_until_precise, proportion_half_width, print_sample_report
+from run_metrics import RunMetrics, SNAPSHOT_INTERVAL
+from exact_half_theory import exact_half_probability
+from flip_grid import flip_grid, GRIDS, POINTS_PER_DECADE
+from coin_flips import chunk_runs, flip_chunks, flip_coins, MEMORY_LIMIT
+
+MODES = ('independent', 'path')
+# Raw row columns per mode: a path row holds the flips since the previous
+# flip count (a Segment of its walk) rather than its whole Sequence
+RAW_COLUMNS = {'independent': ['Run', 'Flips', 'Sequence', 'IsEqual'],
+               'path': ['Run', 'Flips', 'Segment', 'IsEqual']}
+# Working memory per flip of a chunk of walks: coins, their int32 running sum,
+# and the head counts and IsEqual read off at up to one flip count per two flips
+PATH_BYTES_PER_FLIP = 8
+# Memory per flip of a raw row buffered for writing: its H/T string as str,
+# and the letters and fixed-width text it is formatted from
+ROW_BYTES_PER_FLIP = 8
+
+def _sequence_strings(flips):
+    """Rows of 0/1 flips as 'H'/'T' strings."""
+    letters = np.where(flips == 1, ord('H'), ord('T')).astype(np.uint8)
+    return letters.view(f'S{flips.shape[1]}').ravel().astype(str).astype(object)
+
+def simulate_equal_chunk(flip_count, runs, first_run=1, metrics=None,
+                         memory_limit=MEMORY_LIMIT, writer=None):
+    """
+    Simulate runs of flip_count flips and record whether heads and tails are equal.
+    
+    Rows (Run, Flips, Sequence, IsEqual) go to the writer one chunk of coins
+    at a time. The H/T sequence is handed over as a lazy column, so it is
+    only formatted for the rows the writer keeps (see result_writer).
+    
+    Args:
+        flip_count (int): Number of flips per run
+        runs (int): Number of runs
+        first_run (int): Number given to the first run
+        metrics (RunMetrics): Receives flips, runs and rng/reduction/output time
+        memory_limit (int): Working memory in bytes for the coins of a
+            chunk of runs
+        writer (ResultWriter): Optional writer for the rows
+        
+    Returns:
+        np.ndarray: IsEqual of every run
+    """
+    is_equal = np.empty(runs, dtype=bool)
+    
+    # Each chunk is reduced to IsEqual (and the writer's rows) before the next
+    for first, flips in flip_chunks(runs, flip_count, 1, memory_limit, metrics):
+        start = time.perf_counter()
+        rows = slice(first, first + len(flips))
+        
+        # Count heads and check for equality
+        is_equal[rows] = np.count_nonzero(flips, axis=1) == flip_count // 2
+        reduced = time.perf_counter()
+        if writer is not None:
+            writer.write({
+                'Run': np.arange(first_run + first, first_run + first + len(flips)),
+                'Flips': flip_count,
+                'Sequence': lambda kept, flips=flips: _sequence_strings(flips[kept]),
+                'IsEqual': is_equal[rows]
+            })
+        if metrics is not None:
+            metrics.add(reduction=reduced - start, output=time.perf_counter() - reduced)
+    if metrics is not None:
+        metrics.add(flips=runs * flip_count, runs=runs)
+    
+    return is_equal
+
+def simulate_equal_paths(runs, max_flips, first_run=1, metrics=None, flip_counts=None,
+                         writer=None):
+    """
+    Simulate runs of max_flips flips and read off every even prefix (or those in flip_counts).
+    
+    Each run is one random walk; the run of n flips is its first n flips, so
+    heads and tails are equal after n flips exactly when the walk is back at
+    zero, i.e. when the running head count is n / 2. One running sum per run
+    answers every flip count, so the work per run is linear in max_flips.
+    
+    Rows (Run, Flips, Segment, IsEqual) go to the writer flip count by flip
+    count. Writing every prefix in full would store each walk once per flip
+    count, so instead of a Sequence a row has the Segment of flips since the
+    previous flip count: a run's segments, joined in flip-count order, spell
+    out its walk. Like in simulate_equal_chunk the letters are formatted for
+    the kept rows only.
+    
+    Args:
+        runs (int): Number of runs
+        max_flips (int): Length of every run (even)
+        first_run (int): Number given to the first run
+        metrics (RunMetrics): Receives flips, runs and rng/reduction/output time
+        flip_counts (array-like): Even prefix lengths to read, at most
+            max_flips (default: 2..max_flips)
+        writer (ResultWriter): Optional writer for the rows
+        
+    Returns:
+        np.ndarray: IsEqual with one row per run and one column per flip count
+    """
+    start = time.perf_counter()
+    flips = flip_coins(runs, max_flips)
+    drawn = time.perf_counter()
+    
+    # Heads after each even number of flips, compared with half of it
+    if flip_counts is None:
+        flip_counts = flip_grid(max_flips, even=True)
+    half = np.asarray(flip_counts) // 2
+    heads = np.cumsum(flips, axis=1, dtype=np.int32)[:, 2 * half - 1]
+    is_equal = heads == half
+    reduced = time.perf_counter()
+    
+    if writer is not None:
+        run_numbers = np.arange(first_run, first_run + runs)
+        previous = 0
+        for index, n in enumerate(half.tolist()):
+            writer.write({
+                'Run': run_numbers,
+                'Flips': 2 * n,
+                'Segment': lambda kept, start=previous, stop=2 * n:
+                    _sequence_strings(flips[kept, start:stop]),
+                'IsEqual': is_equal[:, index]
+            })
+            previous = 2 * n
+    if metrics is not None:
+        metrics.add(flips=runs * max_flips, runs=runs, rng=drawn - start,
+                    reduction=reduced - drawn, output=time.perf_counter() - reduced)
+    return is_equal
+
+def run_equal_probability_analysis(runs=100000, max_flips=100, writer=None, tolerance=None,
+                                   max_runs=1000000, confidence=0.95, metrics=None,
+                                   mode='independent', flip_counts=None,
+                                   memory_limit=MEMORY_LIMIT):
     """
     Run the equal probability analysis for different flip counts.
     
+    With a tolerance every flip count starts with `runs` runs and keeps
+    adding batches until the confidence-interval half-width of its exact-50%
+    probability is below `tolerance`, or max_runs is reached, so flip counts
+    are sampled only as much as they need.
+    
+    In 'independent' mode every even flip count draws fresh runs, so the
+    random-number work grows with the square of max_flips. In 'path' mode
+    each run is flipped once up to max_flips and every even flip count n
+    reads its first n flips (see simulate_equal_paths), which costs one
+    linear pass. Each
+    flip count's estimate is still unbiased, but the estimates for
+    different flip counts now come from the same walks and are correlated:
+    a run that is level at 10 flips is likely level near 10 as well, so
+    errors across the curve move together instead of averaging out. With a
+    tolerance, path mode adds runs until every flip count is precise.
+    
+    In both modes coins are flipped in chunks of runs that fit memory_limit
+    (see coin_flips), which does not change the results.
+    
+    Rows go to the writer as they are simulated and only the number of runs
+    and of runs with equal heads and tails per flip count are kept, so memory
+    does not grow with the number of runs. In path mode the streamed rows are
+    ordered by chunk, then flip count, and have a Segment column with only
+    the flips since the previous flip count in place of the Sequence (see
+    RAW_COLUMNS and simulate_equal_paths); a ReservoirWriter samples the
+    same walks for every flip count, so the sampled walks are complete.
+    
+    By default every even flip count from 2 to max_flips is simulated; a
+    grid from flip_grid (e.g. log-spaced) can be passed as flip_counts
+    instead. In path mode the walks are max_flips long either way.
+    
     Args:
-        runs (int): Number of simulations to run
+        runs (int): Number of simulations to run (first batch with a tolerance)
         max_flips (int): Maximum number of flips (must be even)
+        writer (ResultWriter): Optional writer that streams each flip count's
+            rows to disk as soon as they are simulated
+        tolerance (float): Absolute half-width target (default: fixed runs)
+        max_runs (int): Budget of runs per flip count with a tolerance
+        confidence (float): Confidence level of the interval
+        metrics (RunMetrics): Receives throughput, wall time per flip count
+            and time spent drawing flips ('rng'), counting heads
+            ('reduction') and writing rows ('output')
+        mode (str): 'independent' or 'path'
+        flip_counts (array-like): Even flip counts to simulate, at most
+            max_flips (default: 2, 4, ..., max_flips)
+        memory_limit (int): Bytes of working memory for one chunk of runs
         
     Returns:
-        pd.DataFrame: Results of all simulations
+        pd.DataFrame: Flips, Total_Runs and Equal_Runs per flip count
     """
     if max_flips % 2 != 0:
         raise ValueError("max_flips must be even")
+    if mode not in MODES:
+        raise ValueError(f"Unknown mode: {mode}")
+    if metrics is None:
+        metrics = RunMetrics('equal probability')
+    if flip_counts is None:
+        flip_counts = flip_grid(max_flips, even=True)
+    flip_counts = [int(flip_count) for flip_count in flip_counts]
+    if any(flip_count % 2 or flip_count > max_flips for flip_count in flip_counts):
+        raise ValueError("Flip counts must be even and at most max_flips")
+    if mode == 'path':
+        return _run_equal_paths(runs, max_flips, writer, tolerance, max_runs, confidence,
+                                metrics, flip_counts, memory_limit)
         
-    results = []
-    flip_counts = range(2, max_flips + 2, 2)
+    total_runs = []
+    equal_runs = []
+    samples_used = []
+    half_widths = []
     
     # Print progress header
     print("\nRunning simulations:")
@@ -37,38 +224,83 @@ def run_equal_probability_analysis(runs=100000, max_flips=100):
     for flip_count in flip_counts:
         print(f"Processing {flip_count} flips...", end='\r')
         
-        # Generate random flips (0 for tails, 1 for heads)
-        flips = np.random.randint(0, 2, size=(runs, flip_count))
+        next_run = 1
+        equal = 0
         
-        # Convert to sequences of 'H' and 'T'
-        sequences = np.where(flips == 1, 'H', 'T')
-        sequences = [''.join(seq) for seq in sequences]
-        
-        # Count heads and check for equality
-        heads_count = np.sum(flips, axis=1)
-        is_equal = heads_count == flip_count // 2
+        def draw(size):
+            # Stream results as columns, numbering runs on from earlier batches
+            nonlocal next_run, equal
+            is_equal = simulate_equal_chunk(flip_count, size, next_run, metrics, memory_limit,
+                                            writer)
+            next_run += size
+            equal += int(np.count_nonzero(is_equal))
+            return is_equal
         
-        # Store results
-        for run_idx in range(runs):
-            results.append({
-                'Run': run_idx + 1,
-                'Flips': flip_count,
-                'Sequence': sequences[run_idx],
-                'IsEqual': is_equal[run_idx]
-            })
+        with metrics.cell(flip_count):
+            if tolerance is None:
+                draw(runs)
+            else:
+                samples, width, _ = sample_until_precise(
+                    draw, tolerance, lambda values: proportion_half_width(values, confidence),
+                    max_runs, min_samples=runs)
+                samples_used.append(len(samples))
+                half_widths.append(width)
+        total_runs.append(next_run - 1)
+        equal_runs.append(equal)
+    
+    print("\nSimulations complete!")
+    if tolerance is not None:
+        print_sample_report('Flips', flip_counts, samples_used, half_widths, tolerance)
+    return pd.DataFrame({'Flips': flip_counts, 'Total_Runs': total_runs,
+                         'Equal_Runs': equal_runs})
+
+def _run_equal_paths(runs, max_flips, writer, tolerance, max_runs, confidence, metrics,
+                     flip_counts, memory_limit):
+    """Path mode of run_equal_probability_analysis."""
+    runs_per_chunk = chunk_runs(PATH_BYTES_PER_FLIP * max_flips, memory_limit)
+    equal_runs = np.zeros(len(flip_counts), dtype=np.int64)
+    next_run = 1
+    
+    print("\nRunning simulations (one walk per run):")
+    print("-" * 50)
+    
+    def draw(size):
+        # One row per run, one column per flip count
+        nonlocal next_run, equal_runs
+        is_equal = []
+        for first in range(0, size, runs_per_chunk):
+            is_equal.append(simulate_equal_paths(min(runs_per_chunk, size - first), max_flips,
+                                                 next_run + first, metrics, flip_counts,
+                                                 writer))
+            equal_runs += np.count_nonzero(is_equal[-1], axis=0)
+            print(f"Processed {next_run + first + len(is_equal[-1]) - 1:,} runs...", end='\r')
+        next_run += size
+        return np.concatenate(is_equal)
+    
+    with metrics.cell('paths'):
+        if tolerance is None:
+            draw(runs)
+        else:
+            samples, _, _ = sample_until_precise(
+                draw, tolerance,
+                lambda values: max(proportion_half_width(column, confidence)
+                                   for column in values.T),
+                max_runs, min_samples=runs)
     
     print("\nSimulations complete!")
-    return pd.DataFrame(results)
+    if tolerance is not None:
+        half_widths = [proportion_half_width(column, confidence) for column in samples.T]
+        print_sample_report('Flips', flip_counts, [len(samples)] * len(flip_counts),
+                            half_widths, tolerance)
+    return pd.DataFrame({'Flips': flip_counts, 'Total_Runs': next_run - 1,
+                         'Equal_Runs': equal_runs})
 
-def save_results(df):
+def create_results_dir():
     """
-    Save results to a CSV file in the results directory.
+    Create a timestamped directory for this analysis.
     
-    Args:
-        df (pd.DataFrame): Results dataframe to save
-        
     Returns:
-        tuple: (filepath, results_dir) - Path to saved file and results directory
+        str: Path to results directory
     """
     # Create main results directory if it doesn't exist
     os.makedirs('results', exist_ok=True)
@@ -77,20 +309,37 @@ def save_results(df):
     timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
     results_dir = os.path.join('results', f'equal_probability_{timestamp}')
     os.makedirs(results_dir, exist_ok=True)
+    return results_dir
+
+def probability_summary(counts):
+    """
+    Empirical and theoretical probabilities per flip count.
     
-    # Save full results
-    filename = 'equal_heads_tails_full.csv'
-    filepath = os.path.join(results_dir, filename)
-    df.to_csv(filepath, index=False)
+    Computed from the number of runs and of runs with equal heads and tails,
+    which give the same mean and standard deviation as the 0/1 IsEqual rows.
     
-    # Calculate and save summary statistics
-    summary = df.groupby('Flips')['IsEqual'].agg(['count', 'mean', 'std']).reset_index()
-    summary.columns = ['Flips', 'Total_Runs', 'Empirical_Probability', 'Standard_Deviation']
+    Args:
+        counts (pd.DataFrame): Flips, Total_Runs and Equal_Runs per flip count
+        
+    Returns:
+        pd.DataFrame: Summary table, one row per flip count
+    """
+    counts = counts.sort_values('Flips')
+    total = counts['Total_Runs'].to_numpy(np.float64)
+    probability = counts['Equal_Runs'].to_numpy() / total
+    
+    # Sample standard deviation (ddof=1) of the 0/1 outcomes
+    with np.errstate(divide='ignore', invalid='ignore'):
+        std = np.sqrt(probability * (1 - probability) * total / (total - 1))
+    summary = pd.DataFrame({
+        'Flips': counts['Flips'].to_numpy(),
+        'Total_Runs': counts['Total_Runs'].to_numpy(),
+        'Empirical_Probability': probability,
+        'Standard_Deviation': std
+    })
     
     # Add theoretical probability
-    summary['Theoretical_Probability'] = summary['Flips'].apply(
-        lambda n: math.comb(n, n//2) * (0.5 ** n)
-    )
+    summary['Theoretical_Probability'] = exact_half_probability(summary['Flips'].to_numpy())
     
     # Calculate absolute and relative differences
     summary['Absolute_Difference'] = abs(
@@ -99,19 +348,34 @@ def save_results(df):
     summary['Relative_Difference_Percent'] = (
         summary['Absolute_Difference'] / summary['Theoretical_Probability'] * 100
     )
+    return summary
+
+def save_results(counts, results_dir=None):
+    """
+    Save summary statistics to a CSV file in the results directory.
+    
+    Args:
+        counts (pd.DataFrame): Counts from run_equal_probability_analysis
+        results_dir (str): Results directory (default: create one)
+        
+    Returns:
+        tuple: (filepath, results_dir) - Path to saved file and results directory
+    """
+    if results_dir is None:
+        results_dir = create_results_dir()
     
-    # Save summary
+    # Calculate and save summary statistics
     summary_filepath = os.path.join(results_dir, 'probability_summary.csv')
-    summary.to_csv(summary_filepath, index=False)
+    probability_summary(counts).to_csv(summary_filepath, index=False)
     
-    return filepath, results_dir
+    return summary_filepath, results_dir
 
-def print_probabilities(df, results_dir):
+def print_probabilities(counts, results_dir):
     """
     Print empirical probabilities for each flip count.
     
     Args:
-        df (pd.DataFrame): Results dataframe
+        counts (pd.DataFrame): Counts from run_equal_probability_analysis
         results_dir (str): Directory where results are saved
     """
     print("\nEmpirical Probabilities of Equal Heads and Tails:")
@@ -119,34 +383,16 @@ def print_probabilities(df, results_dir):
     print(f"{'Flips':>6} | {'Probability':>10} | {'Theoretical':>10} | {'Diff %':>8} | {'Std Dev':>8}")
     print("-" * 75)
     
-    # Create data for plotting
-    plot_data = []
-    
-    for flips in sorted(df['Flips'].unique()):
-        mask = df['Flips'] == flips
-        empirical_prob = df[mask]['IsEqual'].mean()
-        std_dev = df[mask]['IsEqual'].std()
-        
-        # Calculate theoretical probability using binomial coefficient
-        n = flips
-        k = flips // 2
-        theoretical_prob = math.comb(n, k) * (0.5 ** n)
-        
-        # Calculate percentage difference
-        diff_percent = abs(empirical_prob - theoretical_prob) / theoretical_prob * 100
-        
-        print(f"{flips:6d} | {empirical_prob:10.4f} | {theoretical_prob:10.4f} | "
-              f"{diff_percent:8.2f} | {std_dev:8.4f}")
-        
-        plot_data.append({
-            'Flips': flips,
-            'Empirical': empirical_prob,
-            'Theoretical': theoretical_prob,
-            'StdDev': std_dev
-        })
+    summary = probability_summary(counts)
+    for row in summary.itertuples(index=False):
+        print(f"{row.Flips:6d} | {row.Empirical_Probability:10.4f} | "
+              f"{row.Theoretical_Probability:10.4f} | {row.Relative_Difference_Percent:8.2f} | "
+              f"{row.Standard_Deviation:8.4f}")
     
     # Save plot data for potential future visualization
-    plot_df = pd.DataFrame(plot_data)
+    plot_df = summary[['Flips', 'Empirical_Probability', 'Theoretical_Probability',
+                       'Standard_Deviation']]
+    plot_df.columns = ['Flips', 'Empirical', 'Theoretical', 'StdDev']
     plot_df.to_csv(os.path.join(results_dir, 'plot_data.csv'), index=False)
 
 def main():
@@ -155,21 +401,88 @@ def main():
                       help='Number of simulations to run (default: 100000)')
     parser.add_argument('--max_flips', type=int, default=100,
                       help='Maximum number of flips, must be even (default: 100)')
+    parser.add_argument('--grid', choices=GRIDS, default='linear',
+                      help='Flip counts to simulate: every one up to --max_flips (linear), '
+                           '--points_per_decade log-spaced even counts up to --max_flips (log), '
+                           'or the counts given with --flips (custom) (default: linear)')
+    parser.add_argument('--points_per_decade', type=int, default=POINTS_PER_DECADE,
+                      help=f'Flip counts per decade of a log grid (default: {POINTS_PER_DECADE})')
+    parser.add_argument('--flips', type=int, nargs='+', default=None,
+                      help='Flip counts of a custom grid')
+    parser.add_argument('--memory_limit', type=float, default=MEMORY_LIMIT / 2**20,
+                      help='MiB of coins held at once; runs are flipped in chunks that fit '
+                           f'(default: {MEMORY_LIMIT / 2**20:g})')
+    parser.add_argument('--output_format', choices=OUTPUT_FORMATS, default='csv',
+                      help='CSV, or memory-mappable .npy columns (default: csv)')
+    parser.add_argument('--tolerance', type=float, default=None,
+                      help='Add runs to each flip count until the confidence interval of '
+                           'P(exactly 50%%) is this narrow; --runs is then the first batch '
+                           '(default: fixed --runs)')
+    parser.add_argument('--max_runs', type=int, default=1000000,
+                      help='Budget of runs per flip count with --tolerance (default: 1000000)')
+    parser.add_argument('--confidence', type=float, default=0.95,
+                      help='Confidence level for --tolerance (default: 0.95)')
+    parser.add_argument('--mode', choices=MODES, default='independent',
+                      help='Fresh runs for every flip count, or one walk per run read at '
+                           'every even prefix (linear cost, correlated flip counts) '
+                           '(default: independent)')
+    parser.add_argument('--raw_output', choices=RAW_OUTPUTS, default='sample',
+                      help='Write a uniform sample of --sample_rows raw rows per flip count, '
+                           'or every row (default: sample)')
+    parser.add_argument('--sample_rows', type=int, default=SAMPLE_ROWS,
+                      help=f'Raw rows kept per flip count with --raw_output sample '
+                           f'(default: {SAMPLE_ROWS})')
+    parser.add_argument('--sample_seed', type=int, default=0,
+                      help='Seed of the raw row sample (default: 0)')
+    parser.add_argument('--metrics_file', type=str, default=None,
+                      help='Keep a JSON snapshot of progress and throughput here '
+                           '(default: only print a summary)')
+    parser.add_argument('--metrics_interval', type=float, default=SNAPSHOT_INTERVAL,
+                      help=f'Seconds between metrics snapshots (default: {SNAPSHOT_INTERVAL:g})')
     
     args = parser.parse_args()
     
     try:
         # Run analysis
-        print(f"\nStarting analysis with {args.runs:,} runs and {args.max_flips} max flips...")
-        results_df = run_equal_probability_analysis(args.runs, args.max_flips)
+        if args.grid != 'custom' and args.max_flips % 2 != 0:
+            raise ValueError("max_flips must be even")
+        grid = flip_grid(args.max_flips, args.grid, args.points_per_decade, args.flips, even=True)
+        max_flips = int(grid[-1])
+        print(f"\nStarting analysis with {args.runs:,} runs and {len(grid)} flip counts "
+              f"from {grid[0]} to {max_flips}...")
+        
+        # Stream raw results to disk while simulating: every row only on
+        # request, otherwise a uniform sample per flip count for spot checks
+        results_dir = create_results_dir()
+        memory_limit = int(args.memory_limit * 2**20)
+        full = args.raw_output == 'full'
+        # Every written row is formatted, so size the writer's buffers to the budget
+        chunk_rows = min(CHUNK_ROWS, max(1, memory_limit // (ROW_BYTES_PER_FLIP * max_flips)))
+        raw_path = os.path.join(results_dir, 'equal_heads_tails_' + ('full' if full else 'sample'))
+        letters = RAW_COLUMNS[args.mode][2]
+        with open_result_writer(raw_path, RAW_COLUMNS[args.mode], args.output_format,
+                                params={'runs': args.runs, 'max_flips': args.max_flips,
+                                        'tolerance': args.tolerance, 'max_runs': args.max_runs,
+                                        'confidence': args.confidence, 'mode': args.mode,
+                                        'grid': args.grid, 'flips': grid.tolist()},
+                                dtypes={letters: f'S{max_flips}'}, chunk_rows=chunk_rows,
+                                sample_rows=None if full else args.sample_rows, sample_by='Flips',
+                                seed=args.sample_seed) as writer, \
+                RunMetrics('equal probability', args.metrics_file, args.metrics_interval,
+                           total_cells=len(grid)) as metrics:
+            counts = run_equal_probability_analysis(
+                args.runs, max_flips, writer=writer, tolerance=args.tolerance,
+                max_runs=args.max_runs, confidence=args.confidence, metrics=metrics,
+                mode=args.mode, flip_counts=grid, memory_limit=memory_limit)
+        print(f"Simulation: {metrics.summary()}")
         
         # Save results
-        filepath, results_dir = save_results(results_df)
+        save_results(counts, results_dir)
         print(f"\nResults directory: {results_dir}")
-        print(f"Full results saved to: {filepath}")
+        print(f"Raw results saved to: {writer.path}")
         
         # Print probabilities
-        print_probabilities(results_df, results_dir)
+        print_probabilities(counts, results_dir)
         
     except ValueError as e:
         print(f"Error: {e}")
@@ -0,0 +1,90 @@
+"""
+Exact probability of getting exactly half heads in n fair coin flips.
+
+For even n = 2m the probability is C(2m, m) / 2^(2m), and 0 for odd n.
+Evaluating it with big-integer binomials gets slow as n grows, and the
+factor 0.5 ** n underflows to 0 past n = 1074, so it is computed in log
+space instead:
+
+    log P(2m) = log Gamma(2m + 1) - 2 log Gamma(m + 1) - 2m log 2
+
+Subtracting log-gamma values that are orders of magnitude larger than the
+result would lose digits for large m, so the difference is taken term by
+term from Stirling's series, where the leading terms cancel exactly:
+
+    log P(2m) = -log(pi m) / 2 + sum_k c_k (2^-(2k-1) - 2) / m^(2k-1)
+
+with c_k = B_2k / (2k (2k - 1)) the Stirling coefficients. From
+m = SERIES_FROM on the truncated series is accurate to double precision, so
+P(n) keeps ~15 significant digits up to n = 10^9 and beyond. Smaller n are
+looked up in a table of correctly rounded exact values.
+"""
+
+import functools
+import math
+
+import numpy as np
+
+SERIES_FROM = 32  # half flip count from which Stirling's series is used
+# B_2k / (2k (2k - 1)) for k = 1..6
+STIRLING = (1 / 12, -1 / 360, 1 / 1260, -1 / 1680, 1 / 1188, -691 / 360360)
+
+
+@functools.lru_cache(maxsize=None)
+def _small_table():
+    """log P(2m) for m < SERIES_FROM, from exact integer binomials."""
+    return np.array([math.log(math.comb(2 * m, m) / 4 ** m) for m in range(SERIES_FROM)])
+
+
+def log_exact_half_probability(n):
+    """
+    Natural log of the probability of exactly n / 2 heads in n flips.
+
+    Args:
+        n (int or array-like): Number(s) of flips
+
+    Returns:
+        float or np.ndarray: log P(n), -inf for odd n
+    """
+    n_arr = np.asarray(n, dtype=np.int64)
+    out = np.full(n_arr.shape, -np.inf)
+    even = n_arr % 2 == 0
+    m = n_arr[even] // 2
+    log_p = np.empty(m.shape)
+
+    small = m < SERIES_FROM
+    log_p[small] = _small_table()[m[small]]
+
+    # Horner's scheme in 1 / m^2
+    large = m[~small].astype(np.float64)
+    inverse = 1 / large
+    inverse_sq = inverse * inverse
+    series = np.zeros(large.shape)
+    for k, c in reversed(list(enumerate(STIRLING, start=1))):
+        series = series * inverse_sq + c * (2.0 ** -(2 * k - 1) - 2)
+    log_p[~small] = series * inverse - 0.5 * np.log(np.pi * large)
+
+    out[even] = log_p
+    return out if out.ndim else out[()]
+
+
+@functools.lru_cache(maxsize=None)
+def _exact_half_scalar(n):
+    return float(np.exp(log_exact_half_probability(n)))
+
+
+def exact_half_probability(n):
+    """
+    Probability of exactly n / 2 heads in n fair flips, C(n, n/2) * 2^-n.
+
+    Evaluated over whole arrays at once; single flip counts are cached.
+
+    Args:
+        n (int or array-like): Number(s) of flips
+
+    Returns:
+        float or np.ndarray: P(n), 0 for odd n
+    """
+    if np.ndim(n) == 0:
+        return _exact_half_scalar(int(n))
+    return np.exp(log_exact_half_probability(n))
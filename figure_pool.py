@@ -0,0 +1,95 @@
+"""
+Render figures in worker processes while the analysis carries on.
+
+The analysis scripts draw their figures with matplotlib after the
+simulation, one after another on the main thread. A FigurePool takes plot
+functions together with the small, precomputed data they draw (stats
+tables, fitted parameters) and renders them in a pool of processes with the
+non-interactive Agg backend, so the main process can write reports and print
+results meanwhile and the plotting tail costs about as much as the slowest
+single figure.
+
+Workers are started when the pool is created, so creating it before a long
+simulation hides their start-up (importing matplotlib) as well. Plot
+functions must be importable module-level functions and their arguments
+picklable. Leaving the with block (or close()) waits for every figure and
+re-raises the first rendering error. With workers=0 each figure is rendered
+immediately in the calling process instead.
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing
+import os
+
+# Leave one core for the analysis itself
+FIGURE_WORKERS = max(0, min(4, (os.cpu_count() or 1) - 1))
+
+
+def _init_worker():
+    import matplotlib
+    matplotlib.use('Agg')
+
+
+def _ready():
+    return True
+
+
+class FigurePool:
+    """
+    Pool of processes rendering figures in the background.
+
+    Args:
+        workers (int): Worker processes (default: FIGURE_WORKERS); 0 renders
+            every figure in the calling process as it is submitted
+    """
+
+    def __init__(self, workers=FIGURE_WORKERS):
+        self.workers = workers
+        self._futures = []
+        self._executor = None
+        if workers > 0:
+            # Spawned workers behave the same on every platform
+            self._executor = ProcessPoolExecutor(
+                max_workers=workers, mp_context=multiprocessing.get_context('spawn'),
+                initializer=_init_worker)
+            # Start every worker now rather than at the first figure
+            for _ in range(workers):
+                self._executor.submit(_ready)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close(raise_errors=exc_type is None)
+
+    def render(self, plot, *args, **kwargs):
+        """
+        Render a figure: call plot(*args, **kwargs) in a worker.
+
+        Args:
+            plot (callable): Module-level function that draws and saves a figure
+            *args, **kwargs: Its (picklable) arguments
+        """
+        if self._executor is None:
+            plot(*args, **kwargs)
+            return
+        self._futures.append(self._executor.submit(plot, *args, **kwargs))
+
+    def close(self, raise_errors=True):
+        """
+        Wait for every submitted figure and stop the workers.
+
+        Args:
+            raise_errors (bool): Re-raise the first error of a plot function
+        """
+        if self._executor is None:
+            return
+        try:
+            if raise_errors:
+                for future in self._futures:
+                    future.result()
+        finally:
+            # Figures not started yet are dropped after an error
+            self._executor.shutdown(cancel_futures=True)
+            self._executor = None
+            self._futures = []
@@ -0,0 +1,58 @@
+"""
+Grids of flip counts for the convergence and exact-half sweeps.
+
+A linear grid visits every flip count from 2 to max_flips, which is what the
+simulators always did. Convergence like 1/(2 sqrt(n)) is a power law, so a
+log grid with a fixed number of points per decade shows it just as well
+while the number of flip counts only grows with the number of decades: a
+sweep out to a million flips visits about as many flip counts as the
+default 2..100 linear sweep. Log grids use even flip counts only, so the
+exact-50% analyses get every point. A custom grid takes the flip counts
+as given.
+"""
+
+import math
+
+import numpy as np
+
+GRIDS = ('linear', 'log', 'custom')
+POINTS_PER_DECADE = 20
+MIN_FLIPS = 2
+
+
+def flip_grid(max_flips, grid='linear', points_per_decade=POINTS_PER_DECADE, flips=None,
+              even=False):
+    """
+    Flip counts to simulate.
+
+    Args:
+        max_flips (int): Largest flip count of a linear or log grid
+        grid (str): 'linear', 'log' or 'custom'
+        points_per_decade (int): Density of a log grid
+        flips (list): Flip counts of a custom grid
+        even (bool): Only even flip counts (a linear grid steps by 2, a
+            custom grid must not contain odd counts)
+
+    Returns:
+        np.ndarray: Sorted, distinct int64 flip counts
+    """
+    if grid == 'linear':
+        return np.arange(MIN_FLIPS, max_flips + 1, 2 if even else 1, dtype=np.int64)
+    if grid == 'log':
+        if points_per_decade < 1:
+            raise ValueError("points_per_decade must be at least 1")
+        decades = math.log10(max(max_flips, MIN_FLIPS) / MIN_FLIPS)
+        points = max(2, math.ceil(decades * points_per_decade) + 1)
+        # Rounded down to even counts; close to MIN_FLIPS several points coincide
+        values = np.geomspace(MIN_FLIPS, max(max_flips, MIN_FLIPS), points)
+        return np.unique(2 * (values.astype(np.int64) // 2))
+    if grid == 'custom':
+        if not flips:
+            raise ValueError("A custom grid needs flip counts")
+        counts = np.unique(np.asarray(flips, dtype=np.int64))
+        if counts[0] < MIN_FLIPS:
+            raise ValueError(f"Flip counts must be at least {MIN_FLIPS}")
+        if even and np.any(counts % 2):
+            raise ValueError("Flip counts must be even")
+        return counts
+    raise ValueError(f"Unknown grid: {grid!r} (expected one of {', '.join(GRIDS)})")
@@ -1,68 +1,221 @@
 import numpy as np
-import csv
+import pandas as pd
 from datetime import datetime
 import os
+import argparse
+import time
 
-def flip_until_streak_numpy(streak_target):
-    max_batch = 10_000_000  # process in big batches
-    total_flips = 0
-    current_streak = 1
+from streak_engine import (
+    simulate_streak_table, simulate_streak_until_precise, seed_params, checkpoint_seed
+)
+from result_writer import open_result_writer, CHUNK_ROWS, OUTPUT_FORMATS
+from sequential_sampling import print_sample_report
+from run_metrics import RunMetrics, SNAPSHOT_INTERVAL
 
-    # Start with a random flip
-    last_flip = np.random.randint(1, 3)
-
-    while current_streak < streak_target:
-        # Generate a large batch of random flips
-        flips = np.random.randint(1, 3, size=max_batch)
-        for flip in flips:
-            total_flips += 1
-            if flip == last_flip:
-                current_streak += 1
-                if current_streak == streak_target:
-                    return total_flips
-            else:
-                current_streak = 1
-                last_flip = flip
-
-    return total_flips
-
-def run_multiple_simulations(num_runs=10000, max_streak=20):
+def run_multiple_simulations(num_runs=10000, max_streak=20, single_pass=False,
+                             workers=1, seed=None, sampler='flips', output_format='csv',
+                             checkpoint_dir=None, resume=False, tolerance=None,
+                             max_runs=100000, confidence=0.95, metrics=None):
+    """
+    Simulate every streak target 1..max_streak for a number of runs.
+    
+    By default each (run, target) cell flips its own fresh sequence, with all
+    runs of a target advanced together by simulate_streak_runs. With
+    single_pass=True each run flips one sequence and records the first time
+    every target is reached, so a run costs about as much as its longest
+    target alone. The targets within a run are then correlated (a run that
+    reaches 10 early also reached 9 early), while runs stay independent.
+    
+    With sampler='attempts' waiting times are drawn from whole streak
+    attempts (see sample_streak_attempts) instead of simulating every flip,
+    which keeps max_streak of 40-59 cheap.
+    
+    Runs are simulated in seeded shards that can be spread over `workers`
+    processes; the output for a given seed does not depend on `workers`.
+    
+    With output_format='columnar' the results are written as memory-mappable
+    .npy columns with a meta.json of the parameters (see result_writer)
+    instead of a CSV.
+    
+    With checkpoint_dir the finished shards are saved as they complete, and
+    resume=True continues an interrupted sweep from them with identical
+    output (see simulate_streak_table).
+    
+    With a tolerance every target starts with num_runs runs and keeps adding
+    batches until the confidence-interval half-width of its mean flips is
+    below `tolerance` times the mean, or max_runs is reached (see
+    simulate_streak_until_precise). Rows are then written target by target,
+    and a streak_precision_summary CSV records the runs each target used.
+    
+    Args:
+        num_runs (int): Number of runs
+        max_streak (int): Longest streak target
+        single_pass (bool): Share one flip sequence across a run's targets
+        workers (int): Number of worker processes
+        seed (int or np.random.SeedSequence): Master seed (default: fresh entropy)
+        sampler (str): 'flips' or 'attempts'
+        output_format (str): 'csv' or 'columnar'
+        checkpoint_dir (str): Directory for shard checkpoints (default: none)
+        resume (bool): Continue from the checkpoints in checkpoint_dir
+        tolerance (float): Relative half-width target (default: fixed num_runs)
+        max_runs (int): Budget of runs per target with a tolerance
+        confidence (float): Confidence level of the interval
+        metrics (RunMetrics): Receives throughput, per-target timings and the
+            time spent writing results ('output')
+        
+    Returns:
+        str: Path to results directory
+    """
     # Create results directory with today's date
     today = datetime.now().strftime("%Y%m%d")
     results_dir = f"results_{today}"
     os.makedirs(results_dir, exist_ok=True)
     
-    # Create CSV filename with timestamp
+    # Create output filename with timestamp
     timestamp = datetime.now().strftime("%H%M%S")
-    filename = os.path.join(results_dir, f'streak_simulation_results_{timestamp}.csv')
+    filename = os.path.join(results_dir, f'streak_simulation_results_{timestamp}')
     
-    # Open CSV file for writing
-    with open(filename, 'w', newline='') as csvfile:
-        writer = csv.writer(csvfile)
-        # Write header
-        writer.writerow(['Run', 'Streak Target', 'Flips Required'])
-        
-        # Run multiple simulations
-        for run in range(1, num_runs + 1):
-            #print(f"\nRun {run}:")
-            for streak_target in range(1, max_streak + 1):
-                total_flips = flip_until_streak_numpy(streak_target)
-                #print(f"Streak of {streak_target}: {total_flips:,} flips")
-                writer.writerow([run, streak_target, total_flips])
+    seed_seq = seed if isinstance(seed, np.random.SeedSequence) else np.random.SeedSequence(seed)
+    if tolerance is not None:
+        if single_pass or checkpoint_dir is not None:
+            raise ValueError("A tolerance cannot be combined with single_pass or checkpoints")
+        _run_precise_simulations(filename, num_runs, max_streak, workers, seed_seq, sampler,
+                                 output_format, tolerance, max_runs, confidence, metrics)
+        return results_dir
+    
+    # Flips required for every run (rows) and streak target (columns)
+    flips_required = simulate_streak_table(num_runs, max_streak, seed=seed_seq,
+                                           workers=workers, single_pass=single_pass,
+                                           sampler=sampler, checkpoint_dir=checkpoint_dir,
+                                           resume=resume, metrics=metrics)
+    
+    # Stream results in run order, a block of runs at a time
+    write_start = time.perf_counter()
+    params = {'num_runs': num_runs, 'max_streak': max_streak, 'single_pass': single_pass,
+              'sampler': sampler, 'seed': seed_params(seed_seq)}
+    run_block = max(CHUNK_ROWS // max_streak, 1)
+    with open_result_writer(filename, ['Run', 'Streak Target', 'Flips Required'],
+                            output_format, params=params) as writer:
+        for start in range(0, num_runs, run_block):
+            block = flips_required[start:start + run_block]
+            writer.write({
+                'Run': np.repeat(np.arange(start + 1, start + len(block) + 1), max_streak),
+                'Streak Target': np.tile(np.arange(1, max_streak + 1), len(block)),
+                'Flips Required': block.ravel()
+            })
+    if metrics is not None:
+        metrics.add(output=time.perf_counter() - write_start)
     
     #print(f"\nResults have been saved to {filename}")
     return results_dir
 
-# Run the simulations
-if __name__ == "__main__":
-    # Run 100 simulations
-    #print("Running 100 simulations...")
-    results_dir_100 = run_multiple_simulations(num_runs=100, max_streak=20)
+def _run_precise_simulations(filename, min_runs, max_streak, workers, seed_seq, sampler,
+                             output_format, tolerance, max_runs, confidence, metrics=None):
+    """Precision-targeted sweep of run_multiple_simulations, written target by target."""
+    flips, half_widths = simulate_streak_until_precise(
+        max_streak, tolerance, min_runs=min_runs, max_runs=max_runs, seed=seed_seq,
+        workers=workers, sampler=sampler, confidence=confidence, metrics=metrics)
     
-    # Run 1000 simulations
-    #print("\nRunning 1000 simulations...")
-    results_dir_1000 = run_multiple_simulations(num_runs=1000, max_streak=20) 
+    start = time.perf_counter()
+    params = {'min_runs': min_runs, 'max_runs': max_runs, 'max_streak': max_streak,
+              'tolerance': tolerance, 'confidence': confidence, 'sampler': sampler,
+              'seed': seed_params(seed_seq)}
+    with open_result_writer(filename, ['Run', 'Streak Target', 'Flips Required'],
+                            output_format, params=params) as writer:
+        for streak_target, target_flips in enumerate(flips, start=1):
+            writer.write({
+                'Run': np.arange(1, len(target_flips) + 1),
+                'Streak Target': streak_target,
+                'Flips Required': target_flips
+            })
+    if metrics is not None:
+        metrics.add(output=time.perf_counter() - start)
+    
+    # Report how many runs every target needed
+    samples_used = [len(target_flips) for target_flips in flips]
+    pd.DataFrame({
+        'Streak Target': np.arange(1, max_streak + 1),
+        'Runs': samples_used,
+        'Mean Flips': [target_flips.mean() for target_flips in flips],
+        'Relative Half Width': half_widths,
+        'Converged': half_widths <= tolerance
+    }).to_csv(filename.replace('streak_simulation_results', 'streak_precision_summary') + '.csv',
+              index=False)
+    print_sample_report('Streak', range(1, max_streak + 1), samples_used, half_widths, tolerance)
 
-    # Run 10000 simulations
-    #print("\nRunning 10000 simulations...")
-    results_dir_10000 = run_multiple_simulations(num_runs=10000, max_streak=20) 
+def main():
+    parser = argparse.ArgumentParser(description='Simulate flips required for streaks of each length.')
+    parser.add_argument('--runs', type=int, nargs='+', default=[100, 1000, 10000],
+                      help='Number of runs for each sweep (default: 100 1000 10000)')
+    parser.add_argument('--max_streak', type=int, default=20,
+                      help='Longest streak target (default: 20)')
+    parser.add_argument('--single_pass', action='store_true',
+                      help='Record all targets of a run from one flip sequence '
+                           '(targets within a run become correlated)')
+    
+    parser.add_argument('--sampler', choices=['flips', 'attempts'], default='flips',
+                      help='Simulate every flip, or draw waiting times from streak '
+                           'attempts for long streaks (default: flips)')
+    parser.add_argument('--workers', type=int, default=1,
+                      help='Number of worker processes (default: 1)')
+    parser.add_argument('--seed', type=int, default=None,
+                      help='Master random seed (default: fresh entropy)')
+    parser.add_argument('--output_format', choices=OUTPUT_FORMATS, default='csv',
+                      help='CSV, or memory-mappable .npy columns (default: csv)')
+    parser.add_argument('--checkpoint_dir', type=str, default=None,
+                      help='Save finished shards here so the sweeps can be resumed')
+    parser.add_argument('--resume', action='store_true',
+                      help='Continue the sweeps checkpointed in --checkpoint_dir')
+    parser.add_argument('--tolerance', type=float, default=None,
+                      help='Add runs to each target until the confidence interval of its '
+                           'mean is within this fraction of the mean; --runs is then the '
+                           'first batch (default: fixed --runs)')
+    parser.add_argument('--max_runs', type=int, default=100000,
+                      help='Budget of runs per target with --tolerance (default: 100000)')
+    parser.add_argument('--confidence', type=float, default=0.95,
+                      help='Confidence level for --tolerance (default: 0.95)')
+    parser.add_argument('--metrics_file', type=str, default=None,
+                      help='Keep a JSON snapshot of progress and throughput here '
+                           '(default: only print a summary per sweep)')
+    parser.add_argument('--metrics_interval', type=float, default=SNAPSHOT_INTERVAL,
+                      help=f'Seconds between metrics snapshots (default: {SNAPSHOT_INTERVAL:g})')
+    
+    args = parser.parse_args()
+    if args.resume and args.checkpoint_dir is None:
+        parser.error('--resume requires --checkpoint_dir')
+    
+    # Give every sweep its own stream from the master seed
+    if args.checkpoint_dir is not None:
+        master_seed = checkpoint_seed(args.checkpoint_dir, args.seed, args.resume)
+    else:
+        master_seed = np.random.SeedSequence(args.seed)
+    sweep_seeds = master_seed.spawn(len(args.runs))
+    
+    # Run the simulations
+    for index, (num_runs, sweep_seed) in enumerate(zip(args.runs, sweep_seeds)):
+        sweep_dir = None
+        if args.checkpoint_dir is not None:
+            sweep_dir = os.path.join(args.checkpoint_dir, f'sweep_{index}')
+            done_path = os.path.join(sweep_dir, 'done')
+            if args.resume and os.path.exists(done_path):
+                print(f"Sweep of {num_runs} runs already finished, skipping")
+                continue
+            if os.path.exists(done_path):
+                os.remove(done_path)
+        
+        #print(f"Running {num_runs} simulations...")
+        with RunMetrics(f'streak sweep {index} ({num_runs} runs)', args.metrics_file,
+                        args.metrics_interval, total_cells=args.max_streak) as metrics:
+            run_multiple_simulations(num_runs=num_runs, max_streak=args.max_streak,
+                                     single_pass=args.single_pass,
+                                     workers=args.workers, seed=sweep_seed,
+                                     sampler=args.sampler, output_format=args.output_format,
+                                     checkpoint_dir=sweep_dir, resume=args.resume,
+                                     tolerance=args.tolerance, max_runs=args.max_runs,
+                                     confidence=args.confidence, metrics=metrics)
+        print(f"Sweep of {num_runs} runs: {metrics.summary()}")
+        if sweep_dir is not None:
+            open(done_path, 'w').close()
+
+if __name__ == "__main__":
+    main()
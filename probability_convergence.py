@@ -11,52 +11,275 @@ import pandas as pd
 from datetime import datetime
 import os
 import argparse
-import math
+import time
 import matplotlib.pyplot as plt
 from scipy.optimize import curve_fit
 
-def run_convergence_analysis(runs=100000, max_flips=100):
+from result_writer import open_result_writer, OUTPUT_FORMATS, RAW_OUTPUTS, SAMPLE_ROWS
+from sequential_sampling import sample_until_precise, mean_half_width, print_sample_report
+from run_metrics import RunMetrics, SNAPSHOT_INTERVAL
+from exact_half_theory import exact_half_probability
+from flip_grid import flip_grid, GRIDS, POINTS_PER_DECADE
+from coin_flips import count_heads, MEMORY_LIMIT
+from figure_pool import FigurePool, FIGURE_WORKERS
+
+# Compact result columns: 14 bytes per row instead of 24. Probability stays
+# float64 so row statistics agree with histogram_statistics to the last digits
+RUN_DTYPE = np.uint32
+PROBABILITY_DTYPE = np.float64
+SAMPLERS = ('matrix', 'binomial')
+LOG_AXIS_SPAN = 1000  # flip-count ratio beyond which plots use a log flip axis
+NOT_FITTED = 'not fitted (too few flip counts in the grid, or no convergence)'
+
+class HeadCountHistogram:
+    """
+    Number of runs with each head count k, for one flip count n.
+    
+    Every probability of a run of n flips is k / n, so these counts are a
+    lossless summary of all the runs: the statistics of calculate_statistics
+    follow from them without keeping any run. Only the range of head counts
+    seen so far is stored, which stays within a few sqrt(n) of n / 2.
+    
+    Args:
+        flip_count (int): Number of flips per run
+    """
+    
+    def __init__(self, flip_count):
+        self.flip_count = flip_count
+        self.offset = 0  # head count of counts[0]
+        self.counts = np.zeros(0, dtype=np.int64)
+    
+    def add(self, heads):
+        """
+        Count a batch of runs.
+        
+        Args:
+            heads (np.ndarray): Number of heads of each run
+        """
+        if len(heads) == 0:
+            return
+        lo, hi = int(heads.min()), int(heads.max())
+        if len(self.counts):
+            lo = min(lo, self.offset)
+            hi = max(hi, self.offset + len(self.counts) - 1)
+        grown = np.zeros(hi - lo + 1, dtype=np.int64)
+        start = self.offset - lo
+        grown[start:start + len(self.counts)] = self.counts
+        grown += np.bincount(heads - lo, minlength=len(grown))
+        self.offset, self.counts = lo, grown
+    
+    @property
+    def total(self):
+        """Number of runs counted."""
+        return int(self.counts.sum())
+    
+    def probabilities(self):
+        """Probability k / n of every stored head count."""
+        return (self.offset + np.arange(len(self.counts))) / self.flip_count
+    
+    def percentile(self, q):
+        """
+        Percentile of the run probabilities, as np.percentile of all runs.
+        
+        Args:
+            q (float): Percentile in [0, 100]
+            
+        Returns:
+            float: Linearly interpolated percentile
+        """
+        values = self.probabilities()
+        position = q / 100 * (self.total - 1)
+        below = int(np.floor(position))
+        # Value of the i-th smallest run for the two neighbouring order statistics
+        cumulative = np.cumsum(self.counts)
+        a, b = values[np.searchsorted(cumulative, [below, min(below + 1, self.total - 1)],
+                                      side='right')]
+        t = position - below
+        # Same interpolation as np.percentile
+        return b - (b - a) * (1 - t) if t >= 0.5 else a + (b - a) * t
+    
+    def exact_half_frequency(self):
+        """Fraction of runs with exactly as many heads as tails."""
+        if self.flip_count % 2:
+            return 0.0
+        k = self.flip_count // 2 - self.offset
+        return self.counts[k] / self.total if 0 <= k < len(self.counts) else 0.0
+    
+    def statistics(self):
+        """
+        Summary of the runs, as one row of calculate_statistics.
+        
+        Returns:
+            dict: Flips, Mean, Std, Q1, Median, Q3, Min, Max and Count
+        """
+        values = self.probabilities()
+        total = self.total
+        mean = np.dot(self.counts, values) / total
+        std = np.sqrt(np.dot(self.counts, (values - mean) ** 2) / (total - 1)) if total > 1 else np.nan
+        seen = np.flatnonzero(self.counts)
+        return {
+            'Flips': self.flip_count,
+            'Mean': mean,
+            'Std': std,
+            'Q1': self.percentile(25),
+            'Median': self.percentile(50),
+            'Q3': self.percentile(75),
+            'Min': values[seen[0]],
+            'Max': values[seen[-1]],
+            'Count': total
+        }
+
+def run_convergence_analysis(runs=100000, max_flips=100, writer=None, tolerance=None,
+                             max_runs=1000000, confidence=0.95, metrics=None,
+                             sampler='matrix', rng=None, histograms=None, keep_rows=True,
+                             flip_counts=None, memory_limit=MEMORY_LIMIT):
     """
     Run the convergence analysis for different flip counts.
     
+    With a tolerance every flip count starts with `runs` runs and keeps
+    adding batches until the confidence-interval half-width of its mean
+    probability is below `tolerance`, or max_runs is reached. Short
+    sequences, whose proportions spread the most, get the most runs.
+    
+    The result frame is assembled from NumPy columns with compact dtypes
+    (uint32 Run, uint16 Flips unless max_flips needs more, float64
+    Probability). With a fixed number of runs the columns are allocated
+    once up front and filled flip count by flip count.
+    
+    The 'matrix' sampler flips a runs x flip_count matrix of coins and sums
+    each row, in chunks of runs that fit memory_limit (see coin_flips); the
+    results are the same for any budget. Only the number of heads matters,
+    so the 'binomial' sampler draws it directly from Binomial(flip_count,
+    1/2), which has the same distribution at O(runs) cost per flip count
+    instead of O(runs x flip_count), making flip counts in the millions
+    practical.
+    
+    Passing a dict as `histograms` collects a HeadCountHistogram per flip
+    count while simulating; histogram_statistics turns them into the stats
+    table. Together with keep_rows=False (and optionally a writer for the
+    raw rows) memory no longer grows with the number of runs.
+    
+    By default every flip count from 2 to max_flips is simulated; a grid
+    from flip_grid (e.g. log-spaced) can be passed as flip_counts instead.
+    
     Args:
-        runs (int): Number of simulations to run
+        runs (int): Number of simulations to run (first batch with a tolerance)
         max_flips (int): Maximum number of flips
+        writer (ResultWriter): Optional writer that streams each flip count's
+            rows to disk as soon as they are simulated
+        tolerance (float): Absolute half-width target (default: fixed runs)
+        max_runs (int): Budget of runs per flip count with a tolerance
+        confidence (float): Confidence level of the interval
+        metrics (RunMetrics): Receives throughput, wall time per flip count
+            and time spent drawing flips ('rng'), counting heads
+            ('reduction') and writing rows ('output')
+        sampler (str): 'matrix' or 'binomial'
+        rng (np.random.Generator): Generator for the binomial sampler
+            (default: fresh generator); the matrix sampler uses np.random
+        histograms (dict): Filled with flip count -> HeadCountHistogram
+        keep_rows (bool): Keep every run in memory and return them
+        flip_counts (array-like): Flip counts to simulate (default: 2..max_flips)
+        memory_limit (int): Bytes of coins the matrix sampler holds at once
         
     Returns:
-        pd.DataFrame: Results of all simulations
+        pd.DataFrame: Results of all simulations (None with keep_rows=False)
     """
+    if sampler not in SAMPLERS:
+        raise ValueError(f"Unknown sampler: {sampler}")
+    if sampler == 'binomial' and rng is None:
+        rng = np.random.default_rng()
+    if metrics is None:
+        metrics = RunMetrics('convergence')
     results = []
-    flip_counts = range(2, max_flips + 1)
+    samples_used = []
+    half_widths = []
+    if flip_counts is None:
+        flip_counts = flip_grid(max_flips)
+    flip_counts = [int(flip_count) for flip_count in flip_counts]
+    flips_dtype = np.promote_types(np.uint16, np.min_scalar_type(max(flip_counts, default=max_flips)))
+    if tolerance is None and keep_rows:
+        # Every flip count gets exactly `runs` rows
+        probability_column = np.empty(runs * len(flip_counts), dtype=PROBABILITY_DTYPE)
     
     # Print progress header
     print("\nRunning simulations:")
     print("-" * 50)
     
-    for flip_count in flip_counts:
+    for index, flip_count in enumerate(flip_counts):
         print(f"Processing {flip_count} flips...", end='\r')
+        next_run = 1
+        if histograms is not None:
+            histograms[flip_count] = HeadCountHistogram(flip_count)
         
-        # Generate random flips (0 for tails, 1 for heads)
-        flips = np.random.randint(0, 2, size=(runs, flip_count))
-        
-        # Calculate probability (proportion of heads) for each run
-        probabilities = np.sum(flips, axis=1) / flip_count
+        def draw(size):
+            nonlocal next_run
+            start = time.perf_counter()
+            if sampler == 'binomial':
+                # Draw the number of heads directly
+                heads = rng.binomial(flip_count, 0.5, size=size)
+                metrics.add(rng=time.perf_counter() - start)
+            else:
+                # Flip coins in chunks of runs that fit the memory budget
+                heads = count_heads(size, flip_count, memory_limit, metrics)
+            drawn = time.perf_counter()
+            
+            # Calculate probability (proportion of heads) for each run
+            probabilities = heads / flip_count
+            if histograms is not None:
+                histograms[flip_count].add(heads)
+            reduced = time.perf_counter()
+            
+            # Store results as columns, numbering runs on from earlier batches
+            chunk = {
+                'Run': np.arange(next_run, next_run + size, dtype=RUN_DTYPE),
+                'Flips': np.full(size, flip_count, dtype=flips_dtype),
+                'Probability': probabilities.astype(PROBABILITY_DTYPE)
+            }
+            if keep_rows and tolerance is None:
+                probability_column[index * runs:(index + 1) * runs] = chunk['Probability']
+            elif keep_rows:
+                results.append(chunk)
+            next_run += size
+            if writer is not None:
+                writer.write(chunk)
+            metrics.add(flips=size * flip_count, runs=size, reduction=reduced - drawn,
+                        output=time.perf_counter() - reduced)
+            return probabilities
         
-        # Store results
-        for run_idx in range(runs):
-            results.append({
-                'Run': run_idx + 1,
-                'Flips': flip_count,
-                'Probability': probabilities[run_idx]
-            })
+        with metrics.cell(flip_count):
+            if tolerance is None:
+                draw(runs)
+            else:
+                samples, width, _ = sample_until_precise(
+                    draw, tolerance, lambda values: mean_half_width(values, confidence),
+                    max_runs, min_samples=runs)
+                samples_used.append(len(samples))
+                half_widths.append(width)
     
     print("\nSimulations complete!")
-    return pd.DataFrame(results)
+    if tolerance is not None:
+        print_sample_report('Flips', flip_counts, samples_used, half_widths, tolerance)
+    if not keep_rows:
+        return None
+    if tolerance is None:
+        columns = {
+            'Run': np.tile(np.arange(1, runs + 1, dtype=RUN_DTYPE), len(flip_counts)),
+            'Flips': np.repeat(np.array(flip_counts, dtype=flips_dtype), runs),
+            'Probability': probability_column
+        }
+    else:
+        columns = {column: np.concatenate([chunk[column] for chunk in results])
+                   for column in ['Run', 'Flips', 'Probability']}
+    return pd.DataFrame(columns, copy=False)
 
 def calculate_statistics(df):
     """
     Calculate statistics for each flip count.
     
+    Besides the distribution of the probability, the table carries
+    Exact_50_Frequency, the fraction of runs with exactly 50% heads, so the
+    plots and fits never need the runs themselves.
+    
     Args:
         df (pd.DataFrame): Results dataframe
         
@@ -84,23 +307,48 @@ def calculate_statistics(df):
     # Ensure Flips is integer type
     stats['Flips'] = stats['Flips'].astype(int)
     
-    # Calculate distance from 0.5
+    # Share of runs with exactly 50% heads, in one pass over the runs
+    exact = (df['Probability'] == 0.5).groupby(df['Flips']).mean()
+    stats['Exact_50_Frequency'] = exact.to_numpy(np.float64)
+    
+    return _add_distances(stats)
+
+def _add_distances(stats):
+    """Add the distances of the mean and extremes from 0.5 to a stats table."""
     stats['Mean_Distance_from_0.5'] = abs(stats['Mean'] - 0.5)
     stats['Max_Distance_from_0.5'] = np.maximum(
         abs(stats['Min'] - 0.5),
         abs(stats['Max'] - 0.5)
     )
-    
     return stats
 
-def save_results(df, stats):
+def histogram_statistics(histograms):
     """
-    Save results to CSV files in the results directory.
+    Statistics for each flip count from head-count histograms.
+    
+    Gives the same table as calculate_statistics on the runs the histograms
+    were filled from, computed from the exact counts instead of the rows.
     
     Args:
-        df (pd.DataFrame): Full results dataframe
-        stats (pd.DataFrame): Statistical summary dataframe
+        histograms (dict): Flip count -> HeadCountHistogram
         
+    Returns:
+        pd.DataFrame: Statistical summary
+    """
+    stats = pd.DataFrame([histograms[flip_count].statistics()
+                          for flip_count in sorted(histograms)],
+                         columns=['Flips', 'Mean', 'Std', 'Q1', 'Median', 'Q3',
+                                  'Min', 'Max', 'Count'])
+    stats['Flips'] = stats['Flips'].astype(int)
+    stats['Exact_50_Frequency'] = [histograms[flip_count].exact_half_frequency()
+                                   for flip_count in sorted(histograms)]
+    
+    return _add_distances(stats)
+
+def create_results_dir():
+    """
+    Create a timestamped directory for this analysis.
+    
     Returns:
         str: Path to results directory
     """
@@ -111,9 +359,26 @@ def save_results(df, stats):
     timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
     results_dir = os.path.join('results', f'probability_convergence_{timestamp}')
     os.makedirs(results_dir, exist_ok=True)
+    return results_dir
+
+def save_results(df, stats, results_dir=None):
+    """
+    Save results to CSV files in the results directory.
     
-    # Save full results
-    df.to_csv(os.path.join(results_dir, 'convergence_full.csv'), index=False)
+    Args:
+        df (pd.DataFrame): Full results dataframe
+        stats (pd.DataFrame): Statistical summary dataframe
+        results_dir (str): Directory the full results were already streamed
+            to (default: create one and write the full results there)
+        
+    Returns:
+        str: Path to results directory
+    """
+    if results_dir is None:
+        results_dir = create_results_dir()
+        
+        # Save full results
+        df.to_csv(os.path.join(results_dir, 'convergence_full.csv'), index=False)
     
     # Save statistics
     stats.to_csv(os.path.join(results_dir, 'convergence_stats.csv'), index=False)
@@ -142,16 +407,16 @@ def theoretical_probability(n):
     """
     Calculate theoretical probability of getting exactly 50% heads in n flips.
     
+    Evaluated in log space (see exact_half_theory), so it stays accurate
+    for very large n and takes whole arrays of flip counts at once.
+    
     Args:
-        n (int): Number of flips
+        n (int or array-like): Number of flips
         
     Returns:
-        float: Probability of exactly 50% heads
+        float: Probability of exactly 50% heads (0 for odd n)
     """
-    if n % 2 != 0:  # Odd number of flips can't give exactly 50%
-        return 0
-    k = n // 2  # Number of heads needed for 50%
-    return math.comb(n, k) * (0.5 ** n)
+    return exact_half_probability(n)
 
 def theoretical_convergence(n):
     """
@@ -165,23 +430,24 @@ def theoretical_convergence(n):
     """
     return 1 / (2 * np.sqrt(n))
 
-def create_empirical_exact_plot(stats_df, results_df, results_dir):
+def _scale_flip_axis(flips):
+    """Use a log flip axis when the flip counts span more than LOG_AXIS_SPAN."""
+    if len(flips) > 0 and max(flips) / min(flips) > LOG_AXIS_SPAN:
+        plt.xscale('log')
+
+def create_empirical_exact_plot(stats_df, results_dir):
     """
     Create plot showing empirical probability of getting exactly p = 0.5
     """
     plt.figure(figsize=(10, 6))
     flips = stats_df['Flips']
     
-    # Calculate proportion of runs with exactly 0.5
-    exact_50_percent = []
-    for flip_count in flips:
-        exact_50_percent.append(
-            len(results_df[(results_df['Flips'] == flip_count) & 
-                         (results_df['Probability'] == 0.5)]) / args.runs
-        )
+    # Proportion of runs with exactly 0.5
+    exact_50_percent = stats_df['Exact_50_Frequency'].tolist()
     
     plt.plot(flips, exact_50_percent, 'b-', linewidth=2, label='Empirical P(50%)')
     plt.xlabel('Number of Flips')
+    _scale_flip_axis(flips)
     plt.ylabel('Probability of Exactly 50% Heads')
     plt.title('Empirical Probability of Getting Exactly 50% Heads')
     plt.grid(True)
@@ -201,6 +467,7 @@ def create_empirical_convergence_plot(stats_df, results_dir):
     
     plt.plot(flips, stats_df['Std'], 'b-', linewidth=2, label='Empirical σ')
     plt.xlabel('Number of Flips')
+    _scale_flip_axis(flips)
     plt.ylabel('Standard Deviation')
     plt.title('Empirical Convergence of Probability')
     plt.grid(True)
@@ -209,7 +476,7 @@ def create_empirical_convergence_plot(stats_df, results_dir):
     plt.savefig(os.path.join(results_dir, 'empirical_convergence.png'))
     plt.close()
 
-def create_even_flips_exact_plot(stats_df, results_df, results_dir):
+def create_even_flips_exact_plot(stats_df, results_dir):
     """
     Create plot showing empirical probability of getting exactly p = 0.5,
     only for even numbers of flips (since odd numbers cannot achieve exactly 50%).
@@ -217,26 +484,23 @@ def create_even_flips_exact_plot(stats_df, results_df, results_dir):
     plt.figure(figsize=(10, 6))
     
     # Filter for even numbers of flips
-    even_flips = stats_df[stats_df['Flips'] % 2 == 0]['Flips']
+    even_stats = stats_df[stats_df['Flips'] % 2 == 0]
+    even_flips = even_stats['Flips']
     
-    # Calculate proportion of runs with exactly 0.5 for even flips
-    exact_50_percent_even = []
-    for flip_count in even_flips:
-        exact_50_percent_even.append(
-            len(results_df[(results_df['Flips'] == flip_count) & 
-                         (results_df['Probability'] == 0.5)]) / args.runs
-        )
+    # Proportion of runs with exactly 0.5 for even flips
+    exact_50_percent_even = even_stats['Exact_50_Frequency'].tolist()
     
     # Empirical probability for even flips
     plt.plot(even_flips, exact_50_percent_even, 'g-', linewidth=2, 
              label='Empirical P(50%) - Even Flips')
     
     # Theoretical probability for even flips
-    theoretical_exact_even = [theoretical_probability(n) for n in even_flips]
+    theoretical_exact_even = theoretical_probability(even_flips.to_numpy())
     plt.plot(even_flips, theoretical_exact_even, 'r--', linewidth=2,
              label='Theoretical P(50%) - Even Flips')
     
     plt.xlabel('Number of Flips (Even Only)')
+    _scale_flip_axis(even_flips)
     plt.ylabel('Probability of Exactly 50% Heads')
     plt.title('Probability of Exactly 50% Heads (Even Flips Only)')
     plt.grid(True)
@@ -265,6 +529,7 @@ def create_combined_theoretical_plot(stats_df, exact_50_percent, results_dir):
     plt.plot(flips, theoretical_std, 'r--', linewidth=2, label='Theoretical σ (1/2√n)')
     
     plt.xlabel('Number of Flips')
+    _scale_flip_axis(flips)
     plt.ylabel('Standard Deviation')
     plt.title('Convergence of Probability: Empirical vs Theoretical')
     plt.legend()
@@ -277,10 +542,11 @@ def create_combined_theoretical_plot(stats_df, exact_50_percent, results_dir):
     plt.plot(flips, exact_50_percent, 'b-', linewidth=2, label='Empirical P(50%)')
     
     # Theoretical probability of exactly 50%
-    theoretical_exact = [theoretical_probability(n) for n in flips]
+    theoretical_exact = theoretical_probability(flips.to_numpy())
     plt.plot(flips, theoretical_exact, 'r--', linewidth=2, label='Theoretical P(50%)')
     
     plt.xlabel('Number of Flips')
+    _scale_flip_axis(flips)
     plt.ylabel('Probability of Exactly 50% Heads')
     plt.title('Probability of Exactly 50% Heads: Empirical vs Theoretical')
     plt.legend()
@@ -305,29 +571,19 @@ def calculate_fit_statistics(stats_df, results_dir):
     theoretical_std = np.array([theoretical_convergence(n) for n in flips])
     
     # Calculate error metrics for convergence
-    std_mape = np.mean(np.abs((empirical_std - theoretical_std) / theoretical_std)) * 100
-    std_rmse = np.sqrt(np.mean((empirical_std - theoretical_std) ** 2))
+    std_mape, std_rmse = _error_metrics(empirical_std, theoretical_std)
     
     # Fit empirical standard deviation to power law
-    def power_law(x, a, b):
-        return a * (x ** b)
-    
-    popt_std, _ = curve_fit(power_law, flips, empirical_std)
+    popt_std = fit_power_law(flips, empirical_std)
     
     # Exact 50% Analysis
-    empirical_exact = np.array([
-        len(results_df[(results_df['Flips'] == f) & 
-            (results_df['Probability'] == 0.5)]) / args.runs
-        for f in flips
-    ])
-    theoretical_exact = np.array([theoretical_probability(n) for n in flips])
+    empirical_exact = stats_df['Exact_50_Frequency'].values
+    theoretical_exact = theoretical_probability(flips)
     
     # Calculate error metrics for exact 50%
     # Only include non-zero theoretical values to avoid division by zero
     mask = theoretical_exact != 0
-    exact_mape = np.mean(np.abs(
-        (empirical_exact[mask] - theoretical_exact[mask]) / theoretical_exact[mask]
-    )) * 100
+    exact_mape, _ = _error_metrics(empirical_exact[mask], theoretical_exact[mask])
     exact_rmse = np.sqrt(np.mean((empirical_exact - theoretical_exact) ** 2))
     
     # Save statistical analysis
@@ -337,7 +593,10 @@ def calculate_fit_statistics(stats_df, results_dir):
         f.write("## Standard Deviation Convergence\n")
         f.write(f"- MAPE: {std_mape:.2f}%\n")
         f.write(f"- RMSE: {std_rmse:.4f}\n")
-        f.write(f"- Fitted power law: σ = {popt_std[0]:.4f} * n^({popt_std[1]:.4f})\n")
+        if popt_std is None:
+            f.write(f"- Fitted power law: {NOT_FITTED}\n")
+        else:
+            f.write(f"- Fitted power law: σ = {popt_std[0]:.4f} * n^({popt_std[1]:.4f})\n")
         f.write(f"- Theoretical model: σ = 1/(2√n)\n\n")
         
         f.write("## Exact 50% Probability\n")
@@ -347,28 +606,70 @@ def calculate_fit_statistics(stats_df, results_dir):
         
         f.write("## Key Findings\n")
         f.write("1. Standard Deviation Convergence:\n")
-        f.write(f"   - The empirical standard deviation follows a power law with exponent {popt_std[1]:.4f}\n")
-        f.write("   - This is close to the theoretical -0.5 exponent from the 1/2√n relationship\n\n")
+        if popt_std is not None:
+            f.write(f"   - The empirical standard deviation follows a power law with exponent {popt_std[1]:.4f}\n")
+            f.write("   - This is close to the theoretical -0.5 exponent from the 1/2√n relationship\n\n")
+        else:
+            f.write("   - The grid has too few flip counts to fit a power law\n\n")
         
         f.write("2. Exact 50% Probability:\n")
         f.write("   - The probability of getting exactly 50% heads decreases with the number of flips\n")
         f.write("   - This matches the theoretical prediction that it becomes increasingly unlikely\n")
         f.write("     to get exactly half heads as the number of flips increases\n")
 
+def _error_metrics(empirical, theoretical):
+    """MAPE (%) and RMSE of empirical against theoretical values (NaN without values)."""
+    if len(empirical) == 0:
+        return np.nan, np.nan
+    return (np.mean(np.abs((empirical - theoretical) / theoretical)) * 100,
+            np.sqrt(np.mean((empirical - theoretical) ** 2)))
+
+def _try_curve_fit(f, x, y, p0, **kwargs):
+    """
+    curve_fit that gives up on grids it cannot fit.
+    
+    A custom grid may hold fewer flip counts than the model has parameters,
+    no even flip counts at all, or only flip counts too large for the
+    model to converge on; the analysis then goes on without that fit.
+    
+    Returns:
+        np.ndarray: Fitted parameters, or None if the fit is not possible
+    """
+    finite = np.isfinite(y)
+    if np.count_nonzero(finite) < len(p0):
+        return None
+    try:
+        popt, _ = curve_fit(f, np.asarray(x)[finite], np.asarray(y)[finite], p0=p0, **kwargs)
+    except RuntimeError:
+        # No convergence within maxfev
+        return None
+    return popt
+
 def fit_power_law(x, y):
     """
     Fit data to a power law function y = ax^b
+    
+    Returns:
+        tuple: (a, b), or None with fewer than two points or no convergence
     """
     def power_law(x, a, b):
         return a * (x ** b)
     
-    popt, _ = curve_fit(power_law, x, y)
-    return popt[0], popt[1]
+    # Start from the theoretical 0.5 n^-0.5, so fits over wide grids converge
+    popt = _try_curve_fit(power_law, x, y, p0=[0.5, -0.5])
+    return None if popt is None else (popt[0], popt[1])
 
-def create_comprehensive_plot(stats_df, results_df, results_dir):
+def comprehensive_fits(stats_df):
     """
-    Create a comprehensive plot showing all measures for even flips only,
-    including fitted functions and deviations from theoretical values.
+    Fit and compare both measures for even flips only, for the comprehensive analysis.
+    
+    Args:
+        stats_df (pd.DataFrame): Statistical summary dataframe
+        
+    Returns:
+        dict: Even flip counts; empirical, theoretical and fitted values;
+            fit parameters; MAPE and RMSE of both measures. Fitted values
+            and parameters are None for fits the grid does not allow.
     """
     # Filter for even numbers of flips
     even_stats = stats_df[stats_df['Flips'] % 2 == 0].copy()
@@ -376,42 +677,70 @@ def create_comprehensive_plot(stats_df, results_df, results_dir):
     
     # Calculate empirical values
     empirical_std = even_stats['Std'].values
-    empirical_exact = np.array([
-        len(results_df[(results_df['Flips'] == f) & 
-            (results_df['Probability'] == 0.5)]) / args.runs
-        for f in even_flips
-    ])
+    empirical_exact = even_stats['Exact_50_Frequency'].values
     
     # Calculate theoretical values
     theoretical_std = np.array([theoretical_convergence(n) for n in even_flips])
-    theoretical_exact = np.array([theoretical_probability(n) for n in even_flips])
+    theoretical_exact = theoretical_probability(even_flips)
     
     # Fit functions
     # For standard deviation
-    a_std, b_std = fit_power_law(even_flips, empirical_std)
-    fitted_std = a_std * (even_flips ** b_std)
+    a_std, b_std = fit_power_law(even_flips, empirical_std) or (None, None)
+    fitted_std = None if a_std is None else a_std * (even_flips ** b_std)
     
     # For exact probability (try exponential fit)
     def exp_decay(x, a, b, c):
         return a * np.exp(-b * x) + c
     
-    popt_exact, _ = curve_fit(exp_decay, even_flips, empirical_exact, 
-                             p0=[0.5, 0.1, 0], bounds=([0, 0, -1], [1, 1, 1]))
-    fitted_exact = exp_decay(even_flips, *popt_exact)
+    popt_exact = _try_curve_fit(exp_decay, even_flips, empirical_exact,
+                                p0=[0.5, 0.1, 0], bounds=([0, 0, -1], [1, 1, 1]))
+    fitted_exact = None if popt_exact is None else exp_decay(even_flips, *popt_exact)
+    
+    # Calculate deviations and statistics
+    std_mape, std_rmse = _error_metrics(empirical_std, theoretical_std)
+    exact_mape, exact_rmse = _error_metrics(empirical_exact, theoretical_exact)
+    
+    return {
+        'even_flips': even_flips,
+        'empirical_std': empirical_std,
+        'theoretical_std': theoretical_std,
+        'fitted_std': fitted_std,
+        'a_std': a_std,
+        'b_std': b_std,
+        'empirical_exact': empirical_exact,
+        'theoretical_exact': theoretical_exact,
+        'fitted_exact': fitted_exact,
+        'popt_exact': popt_exact,
+        'std_mape': std_mape,
+        'std_rmse': std_rmse,
+        'exact_mape': exact_mape,
+        'exact_rmse': exact_rmse
+    }
+
+def plot_comprehensive_analysis(fits, results_dir):
+    """
+    Create a comprehensive plot showing all measures for even flips only,
+    including fitted functions, from comprehensive_fits.
+    """
+    even_flips = fits['even_flips']
+    a_std, b_std = fits['a_std'], fits['b_std']
+    popt_exact = fits['popt_exact']
     
     # Create plot
     plt.figure(figsize=(15, 10))
     
     # Plot 1: Standard Deviation
     plt.subplot(2, 1, 1)
-    plt.plot(even_flips, empirical_std, 'b-', linewidth=2, 
+    plt.plot(even_flips, fits['empirical_std'], 'b-', linewidth=2, 
              label='Empirical σ')
-    plt.plot(even_flips, theoretical_std, 'r--', linewidth=2, 
+    plt.plot(even_flips, fits['theoretical_std'], 'r--', linewidth=2, 
              label='Theoretical σ (1/2√n)')
-    plt.plot(even_flips, fitted_std, 'g:', linewidth=2,
-             label=f'Fitted σ ({a_std:.4f}n^{b_std:.4f})')
+    if fits['fitted_std'] is not None:
+        plt.plot(even_flips, fits['fitted_std'], 'g:', linewidth=2,
+                 label=f'Fitted σ ({a_std:.4f}n^{b_std:.4f})')
     
     plt.xlabel('Number of Flips (Even Only)')
+    _scale_flip_axis(even_flips)
     plt.ylabel('Standard Deviation')
     plt.title('Convergence Analysis (Even Flips Only)')
     plt.grid(True)
@@ -419,14 +748,16 @@ def create_comprehensive_plot(stats_df, results_df, results_dir):
     
     # Plot 2: Exact Probability
     plt.subplot(2, 1, 2)
-    plt.plot(even_flips, empirical_exact, 'b-', linewidth=2,
+    plt.plot(even_flips, fits['empirical_exact'], 'b-', linewidth=2,
              label='Empirical P(50%)')
-    plt.plot(even_flips, theoretical_exact, 'r--', linewidth=2,
+    plt.plot(even_flips, fits['theoretical_exact'], 'r--', linewidth=2,
              label='Theoretical P(50%)')
-    plt.plot(even_flips, fitted_exact, 'g:', linewidth=2,
-             label=f'Fitted P(50%) ({popt_exact[0]:.4f}e^(-{popt_exact[1]:.4f}n) + {popt_exact[2]:.4f})')
+    if fits['fitted_exact'] is not None:
+        plt.plot(even_flips, fits['fitted_exact'], 'g:', linewidth=2,
+                 label=f'Fitted P(50%) ({popt_exact[0]:.4f}e^(-{popt_exact[1]:.4f}n) + {popt_exact[2]:.4f})')
     
     plt.xlabel('Number of Flips (Even Only)')
+    _scale_flip_axis(even_flips)
     plt.ylabel('Probability of Exactly 50% Heads')
     plt.title('Exact 50% Probability (Even Flips Only)')
     plt.grid(True)
@@ -435,46 +766,68 @@ def create_comprehensive_plot(stats_df, results_df, results_dir):
     plt.tight_layout()
     plt.savefig(os.path.join(results_dir, 'comprehensive_analysis.png'))
     plt.close()
-    
-    # Calculate deviations and statistics
-    std_mape = np.mean(np.abs((empirical_std - theoretical_std) / theoretical_std)) * 100
-    std_rmse = np.sqrt(np.mean((empirical_std - theoretical_std) ** 2))
-    
-    exact_mape = np.mean(np.abs((empirical_exact - theoretical_exact) / theoretical_exact)) * 100
-    exact_rmse = np.sqrt(np.mean((empirical_exact - theoretical_exact) ** 2))
+
+def write_comprehensive_analysis(fits, results_dir):
+    """
+    Save the comprehensive analysis of even flips, from comprehensive_fits.
+    """
+    a_std, b_std = fits['a_std'], fits['b_std']
+    popt_exact = fits['popt_exact']
     
     # Save comprehensive analysis
     with open(os.path.join(results_dir, 'comprehensive_analysis.md'), 'w') as f:
         f.write("# Comprehensive Analysis of Even Flips\n\n")
         
         f.write("## Standard Deviation Convergence\n")
-        f.write(f"- Empirical function: σ = {a_std:.4f}n^{b_std:.4f}\n")
+        if a_std is None:
+            f.write(f"- Empirical function: {NOT_FITTED}\n")
+        else:
+            f.write(f"- Empirical function: σ = {a_std:.4f}n^{b_std:.4f}\n")
         f.write("- Theoretical function: σ = 1/(2√n)\n")
-        f.write(f"- MAPE: {std_mape:.2f}%\n")
-        f.write(f"- RMSE: {std_rmse:.4f}\n")
-        f.write(f"- Power law exponent deviation: {abs(b_std + 0.5):.4f} from theoretical -0.5\n\n")
+        f.write(f"- MAPE: {fits['std_mape']:.2f}%\n")
+        f.write(f"- RMSE: {fits['std_rmse']:.4f}\n")
+        if a_std is not None:
+            f.write(f"- Power law exponent deviation: {abs(b_std + 0.5):.4f} from theoretical -0.5\n")
+        f.write("\n")
         
         f.write("## Exact 50% Probability\n")
-        f.write(f"- Empirical function: P(50%) = {popt_exact[0]:.4f}e^(-{popt_exact[1]:.4f}n) + {popt_exact[2]:.4f}\n")
+        if popt_exact is None:
+            f.write(f"- Empirical function: {NOT_FITTED}\n")
+        else:
+            f.write(f"- Empirical function: P(50%) = {popt_exact[0]:.4f}e^(-{popt_exact[1]:.4f}n) + {popt_exact[2]:.4f}\n")
         f.write("- Theoretical function: P(50%) = C(n,n/2) * (1/2)^n\n")
-        f.write(f"- MAPE: {exact_mape:.2f}%\n")
-        f.write(f"- RMSE: {exact_rmse:.4f}\n\n")
+        f.write(f"- MAPE: {fits['exact_mape']:.2f}%\n")
+        f.write(f"- RMSE: {fits['exact_rmse']:.4f}\n\n")
         
         f.write("## Key Findings\n")
         f.write("1. Standard Deviation:\n")
-        f.write(f"   - The empirical power law exponent ({b_std:.4f}) closely matches\n")
-        f.write("     the theoretical -0.5, with only small deviation\n")
-        f.write(f"   - The empirical coefficient ({a_std:.4f}) is very close to\n")
-        f.write("     the theoretical 0.5\n\n")
+        if a_std is not None:
+            f.write(f"   - The empirical power law exponent ({b_std:.4f}) closely matches\n")
+            f.write("     the theoretical -0.5, with only small deviation\n")
+            f.write(f"   - The empirical coefficient ({a_std:.4f}) is very close to\n")
+            f.write("     the theoretical 0.5\n\n")
+        else:
+            f.write("   - The grid has too few even flip counts to fit a power law\n\n")
         
         f.write("2. Exact 50% Probability:\n")
-        f.write("   - The empirical probability follows an exponential decay plus offset\n")
-        f.write("   - This matches the theoretical prediction that exact 50% becomes\n")
-        f.write("     increasingly rare with more flips\n")
-        f.write(f"   - The decay rate ({popt_exact[1]:.4f}) indicates how quickly the\n")
-        f.write("     probability approaches the asymptotic value\n")
-    
-    return std_mape, std_rmse, exact_mape, exact_rmse
+        if popt_exact is not None:
+            f.write("   - The empirical probability follows an exponential decay plus offset\n")
+            f.write("   - This matches the theoretical prediction that exact 50% becomes\n")
+            f.write("     increasingly rare with more flips\n")
+            f.write(f"   - The decay rate ({popt_exact[1]:.4f}) indicates how quickly the\n")
+            f.write("     probability approaches the asymptotic value\n")
+        else:
+            f.write("   - The exponential decay could not be fitted to this grid\n")
+
+def create_comprehensive_plot(stats_df, results_dir):
+    """
+    Create a comprehensive plot showing all measures for even flips only,
+    including fitted functions and deviations from theoretical values.
+    """
+    fits = comprehensive_fits(stats_df)
+    plot_comprehensive_analysis(fits, results_dir)
+    write_comprehensive_analysis(fits, results_dir)
+    return fits['std_mape'], fits['std_rmse'], fits['exact_mape'], fits['exact_rmse']
 
 def main():
     parser = argparse.ArgumentParser(
@@ -484,44 +837,118 @@ def main():
                       help='Number of simulations to run (default: 100000)')
     parser.add_argument('--max_flips', type=int, default=100,
                       help='Maximum number of flips (default: 100)')
+    parser.add_argument('--grid', choices=GRIDS, default='linear',
+                      help='Flip counts to simulate: every one up to --max_flips (linear), '
+                           '--points_per_decade log-spaced even counts up to --max_flips (log), '
+                           'or the counts given with --flips (custom) (default: linear)')
+    parser.add_argument('--points_per_decade', type=int, default=POINTS_PER_DECADE,
+                      help=f'Flip counts per decade of a log grid (default: {POINTS_PER_DECADE})')
+    parser.add_argument('--flips', type=int, nargs='+', default=None,
+                      help='Flip counts of a custom grid')
+    parser.add_argument('--memory_limit', type=float, default=MEMORY_LIMIT / 2**20,
+                      help='MiB of coins held at once; runs are flipped in chunks that fit '
+                           f'(default: {MEMORY_LIMIT / 2**20:g})')
+    parser.add_argument('--output_format', choices=OUTPUT_FORMATS, default='csv',
+                      help='CSV, or memory-mappable .npy columns (default: csv)')
+    parser.add_argument('--tolerance', type=float, default=None,
+                      help='Add runs to each flip count until the confidence interval of '
+                           'its mean probability is this narrow; --runs is then the first '
+                           'batch (default: fixed --runs)')
+    parser.add_argument('--max_runs', type=int, default=1000000,
+                      help='Budget of runs per flip count with --tolerance (default: 1000000)')
+    parser.add_argument('--confidence', type=float, default=0.95,
+                      help='Confidence level for --tolerance (default: 0.95)')
+    parser.add_argument('--sampler', choices=SAMPLERS, default='matrix',
+                      help='Flip every coin (matrix), or draw head counts directly from '
+                           'Binomial(n, 1/2) at a cost independent of n (default: matrix)')
+    parser.add_argument('--raw_output', choices=RAW_OUTPUTS, default='sample',
+                      help='Write a uniform sample of --sample_rows raw rows per flip count, '
+                           'or every row (default: sample)')
+    parser.add_argument('--sample_rows', type=int, default=SAMPLE_ROWS,
+                      help=f'Raw rows kept per flip count with --raw_output sample '
+                           f'(default: {SAMPLE_ROWS})')
+    parser.add_argument('--sample_seed', type=int, default=0,
+                      help='Seed of the raw row sample (default: 0)')
+    parser.add_argument('--plot_workers', type=int, default=FIGURE_WORKERS,
+                      help='Processes rendering figures while the analysis continues; 0 renders '
+                           f'them one after another (default: {FIGURE_WORKERS})')
+    parser.add_argument('--metrics_file', type=str, default=None,
+                      help='Keep a JSON snapshot of progress and throughput here '
+                           '(default: only print a summary)')
+    parser.add_argument('--metrics_interval', type=float, default=SNAPSHOT_INTERVAL,
+                      help=f'Seconds between metrics snapshots (default: {SNAPSHOT_INTERVAL:g})')
     
-    global args
     args = parser.parse_args()
     
     try:
         # Run analysis
-        print(f"\nStarting analysis with {args.runs:,} runs and {args.max_flips} max flips...")
-        global results_df
-        results_df = run_convergence_analysis(args.runs, args.max_flips)
-        
-        # Calculate statistics
-        stats_df = calculate_statistics(results_df)
-        
-        # Save results
-        results_dir = save_results(results_df, stats_df)
-        print(f"\nResults saved in: {results_dir}")
-        
-        # Create individual empirical plots
-        exact_50_percent = create_empirical_exact_plot(stats_df, results_df, results_dir)
-        create_empirical_convergence_plot(stats_df, results_dir)
-        
-        # Create even-only exact probability plot
-        exact_50_percent_even, even_flips = create_even_flips_exact_plot(stats_df, results_df, results_dir)
-        
-        # Create combined theoretical plot
-        create_combined_theoretical_plot(stats_df, exact_50_percent, results_dir)
-        
-        # Create comprehensive analysis for even flips
-        std_mape, std_rmse, exact_mape, exact_rmse = create_comprehensive_plot(stats_df, results_df, results_dir)
+        grid = flip_grid(args.max_flips, args.grid, args.points_per_decade, args.flips)
+        print(f"\nStarting analysis with {args.runs:,} runs and {len(grid)} flip counts "
+              f"from {grid[0]} to {grid[-1]}...")
+        # Stream raw results to disk while simulating: every row only on
+        # request, otherwise a uniform sample per flip count for spot checks
+        results_dir = create_results_dir()
+        full = args.raw_output == 'full'
+        raw_path = os.path.join(results_dir, 'convergence_' + ('full' if full else 'sample'))
+        # Start the figure workers now so they are ready when the simulation ends
+        figures = FigurePool(args.plot_workers)
+        try:
+            with open_result_writer(raw_path,
+                                    ['Run', 'Flips', 'Probability'], args.output_format,
+                                    params={'runs': args.runs, 'max_flips': args.max_flips,
+                                            'tolerance': args.tolerance, 'max_runs': args.max_runs,
+                                            'confidence': args.confidence,
+                                            'sampler': args.sampler, 'grid': args.grid,
+                                            'flips': grid.tolist()},
+                                    sample_rows=None if full else args.sample_rows, sample_by='Flips',
+                                    seed=args.sample_seed) as writer, \
+                    RunMetrics('convergence', args.metrics_file, args.metrics_interval,
+                               total_cells=len(grid)) as metrics:
+                histograms = {}
+                # Only the writer sees the rows; everything after this point
+                # works from the per-flip-count histograms and stats table
+                run_convergence_analysis(
+                    args.runs, args.max_flips, writer=writer, tolerance=args.tolerance,
+                    max_runs=args.max_runs, confidence=args.confidence, metrics=metrics,
+                    sampler=args.sampler, histograms=histograms, keep_rows=False,
+                    flip_counts=grid, memory_limit=int(args.memory_limit * 2**20))
+            print(f"Simulation: {metrics.summary()}")
+            
+            # Calculate statistics from the head-count histograms
+            stats_df = histogram_statistics(histograms)
+            
+            # Save results
+            save_results(None, stats_df, results_dir)
+            print(f"\nResults saved in: {results_dir}")
+            
+            # Fit the comprehensive analysis for even flips up front; the figures
+            # only draw precomputed data
+            fits = comprehensive_fits(stats_df)
+            even_stats = stats_df[stats_df['Flips'] % 2 == 0]
+            even_flips = even_stats['Flips']
+            exact_50_percent_even = even_stats['Exact_50_Frequency'].tolist()
+            
+            # Render the figures in the background while the analysis goes on
+            with figures:
+                figures.render(create_empirical_exact_plot, stats_df, results_dir)
+                figures.render(create_empirical_convergence_plot, stats_df, results_dir)
+                figures.render(create_even_flips_exact_plot, stats_df, results_dir)
+                figures.render(create_combined_theoretical_plot, stats_df,
+                               stats_df['Exact_50_Frequency'].tolist(), results_dir)
+                figures.render(plot_comprehensive_analysis, fits, results_dir)
+                
+                # Save the comprehensive and statistical analyses
+                write_comprehensive_analysis(fits, results_dir)
+                calculate_fit_statistics(stats_df, results_dir)
+                print(f"Statistical analysis saved in: {results_dir}")
+                
+                # Print statistics
+                print_statistics(stats_df)
+        finally:
+            # Stop the workers even if the simulation or the analysis fails
+            figures.close(raise_errors=False)
         print(f"Plots saved in: {results_dir}")
         
-        # Calculate and save statistical analysis
-        calculate_fit_statistics(stats_df, results_dir)
-        print(f"Statistical analysis saved in: {results_dir}")
-        
-        # Print statistics
-        print_statistics(stats_df)
-        
         # Print key findings
         print("\nKey Findings:")
         print("-" * 50)
@@ -552,8 +979,8 @@ def main():
         # Print comprehensive analysis results
         print("\nComprehensive Analysis (Even Flips Only):")
         print("-" * 50)
-        print(f"Standard Deviation MAPE: {std_mape:.2f}%")
-        print(f"Exact 50% Probability MAPE: {exact_mape:.2f}%")
+        print(f"Standard Deviation MAPE: {fits['std_mape']:.2f}%")
+        print(f"Exact 50% Probability MAPE: {fits['exact_mape']:.2f}%")
         
     except Exception as e:
         print(f"Error: {e}")
@@ -0,0 +1,472 @@
+"""
+Streaming output for simulation results.
+
+Simulations hand over results as NumPy column chunks instead of one row at a
+time. ResultWriter buffers them up to a fixed number of rows and formats and
+writes each full buffer on a background thread, so the simulation keeps
+filling the next buffer while the previous one goes to disk (double
+buffering). At most two buffers are alive at once, so memory is bounded by
+the chunk size rather than by the number of rows written.
+
+Two formats are supported:
+- csv: one text file, identical to DataFrame.to_csv(index=False)
+- columnar: a '.cols' directory with one typed .npy file per column and a
+  meta.json sidecar (column names, row count, run parameters). load_columns
+  memory-maps the .npy files, so loading costs no parsing and no copies.
+
+Raw rows are rarely read back, so instead of every row a simulation can keep
+a fixed-size uniform sample per flip count (or streak target) with
+ReservoirWriter, which writes only that sample on close. Columns that are
+expensive to build (e.g. flips formatted as strings) can be handed over as
+a function of row indices; every writer calls it during write() for the
+rows it keeps only.
+"""
+
+import json
+import os
+import queue
+import threading
+
+import numpy as np
+import pandas as pd
+
+CHUNK_ROWS = 1 << 16  # rows per buffer handed to the I/O thread
+OUTPUT_FORMATS = ('csv', 'columnar')
+RAW_OUTPUTS = ('sample', 'full')
+SAMPLE_ROWS = 1000  # raw rows kept per group in sample mode
+COLUMNAR_SUFFIX = '.cols'
+
+
+class ResultWriter:
+    """
+    Write columns of results to a CSV file in chunks on a background thread.
+
+    The output is the same as DataFrame.to_csv(path, index=False) on the
+    concatenated chunks. Use as a context manager, or call close().
+
+    Args:
+        path (str): CSV file to create
+        columns (list): Column names, in output order
+        chunk_rows (int): Rows buffered before a chunk is handed to the I/O thread
+    """
+
+    def __init__(self, path, columns, chunk_rows=CHUNK_ROWS):
+        self.path = path
+        self.columns = list(columns)
+        self.chunk_rows = chunk_rows
+        self.rows_written = 0
+        self._pending = []
+        self._pending_rows = 0
+        self._error = None
+        self._closed = False
+
+        # Holds the chunk being written; flush() waits for it before queuing the next
+        self._queue = queue.Queue()
+        self._open()
+        self._thread = threading.Thread(target=self._drain, daemon=True)
+        self._thread.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close(raise_errors=exc_type is None)
+
+    def write(self, chunk):
+        """
+        Append rows given as columns.
+
+        Args:
+            chunk (dict): Column name -> array (or scalar, broadcast to the
+                length of the other columns, or a function of row indices,
+                see eager_columns). Arrays are copied, so callers may reuse
+                them after the call.
+        """
+        self._raise_pending_error()
+        arrays, length = eager_columns(chunk, self.columns)
+        start = 0
+        while start < length:
+            take = min(length - start, self.chunk_rows - self._pending_rows)
+            # Lazy columns are built one buffer at a time
+            rows = np.arange(start, start + take)
+            self._pending.append([arrays[column][start:start + take].copy() if column in arrays
+                                  else np.asarray(chunk[column](rows))
+                                  for column in self.columns])
+            self._pending_rows += take
+            start += take
+            if self._pending_rows >= self.chunk_rows:
+                self.flush()
+
+    def flush(self):
+        """Hand the buffered rows to the I/O thread once it has written the previous chunk."""
+        if not self._pending:
+            return
+        frame = {column: np.concatenate([part[i] for part in self._pending])
+                 for i, column in enumerate(self.columns)}
+        self.rows_written += self._pending_rows
+        self._pending = []
+        self._pending_rows = 0
+        self._queue.join()
+        self._queue.put(frame)
+
+    def close(self, raise_errors=True):
+        """
+        Write any buffered rows, wait for the I/O thread and close the output.
+
+        Args:
+            raise_errors (bool): Re-raise an error from the I/O thread
+        """
+        if self._closed:
+            return
+        self._closed = True
+        try:
+            self.flush()
+        finally:
+            self._queue.put(None)
+            self._thread.join()
+            if self._error is None:
+                try:
+                    self._finish()
+                except Exception as e:
+                    self._error = e
+            else:
+                self._abort()
+        if raise_errors:
+            self._raise_pending_error()
+
+    def _open(self):
+        self._file = open(self.path, 'w', newline='')
+        pd.DataFrame(columns=self.columns).to_csv(self._file, index=False)
+
+    def _write_frame(self, frame):
+        pd.DataFrame(frame, columns=self.columns).to_csv(self._file, header=False, index=False)
+
+    def _finish(self):
+        self._file.close()
+
+    def _abort(self):
+        self._file.close()
+
+    def _drain(self):
+        """I/O thread: write chunks until the None sentinel."""
+        while True:
+            frame = self._queue.get()
+            if frame is None:
+                self._queue.task_done()
+                return
+            # After an error keep draining so the producer never blocks on a dead writer
+            if self._error is None:
+                try:
+                    self._write_frame(frame)
+                except Exception as e:
+                    self._error = e
+            self._queue.task_done()
+
+    def _raise_pending_error(self):
+        if self._error is not None:
+            raise IOError(f"Writing {self.path} failed: {self._error}") from self._error
+
+
+class ColumnarWriter(ResultWriter):
+    """
+    Write columns of results as one .npy file per column in a directory.
+
+    Each column file is appended to as chunks arrive and its header is
+    rewritten with the final length on close, after which meta.json is
+    written; a store without meta.json is incomplete. Column dtypes are
+    taken from the first chunk unless given. String columns need a fixed
+    width, e.g. dtypes={'Sequence': 'S100'}.
+
+    Args:
+        path (str): Directory to create (conventionally ending in '.cols')
+        columns (list): Column names, in output order
+        chunk_rows (int): Rows buffered before a chunk is handed to the I/O thread
+        params (dict): JSON-serializable run parameters for the sidecar
+        dtypes (dict): Optional column name -> dtype
+    """
+
+    def __init__(self, path, columns, chunk_rows=CHUNK_ROWS, params=None, dtypes=None):
+        self.params = params or {}
+        self._dtypes = {column: np.dtype(dtype) for column, dtype in (dtypes or {}).items()}
+        self._files = {}
+        super().__init__(path, columns, chunk_rows)
+
+    @staticmethod
+    def column_file(column):
+        """File name used for a column, e.g. 'Streak Target' -> 'streak_target.npy'."""
+        return column.lower().replace(' ', '_') + '.npy'
+
+    def _open(self):
+        os.makedirs(self.path, exist_ok=True)
+        # A stale sidecar would mark a half-written store as complete
+        meta_path = os.path.join(self.path, 'meta.json')
+        if os.path.exists(meta_path):
+            os.remove(meta_path)
+
+    def _header(self, dtype, length):
+        return {'descr': np.lib.format.dtype_to_descr(dtype),
+                'fortran_order': False, 'shape': (length,)}
+
+    def _write_frame(self, frame):
+        for column in self.columns:
+            values = np.asarray(frame[column], dtype=self._dtypes.get(column))
+            if values.dtype.kind in 'OU' and column not in self._dtypes:
+                raise TypeError(f"Column '{column}' holds strings; give it a fixed "
+                                f"width in dtypes, e.g. 'S100'")
+            if column not in self._files:
+                self._dtypes[column] = values.dtype
+                f = open(os.path.join(self.path, self.column_file(column)), 'wb')
+                np.lib.format.write_array_header_1_0(f, self._header(values.dtype, 0))
+                self._files[column] = f
+            np.ascontiguousarray(values).tofile(self._files[column])
+
+    def _finish(self):
+        for column in self.columns:
+            dtype = self._dtypes.get(column, np.dtype(np.float64))
+            if column not in self._files:
+                # No rows were written
+                np.save(os.path.join(self.path, self.column_file(column)),
+                        np.empty(0, dtype=dtype))
+                continue
+            f = self._files.pop(column)
+            # The header has room for any length, so it can be rewritten in place
+            f.seek(0)
+            np.lib.format.write_array_header_1_0(f, self._header(dtype, self.rows_written))
+            f.close()
+
+        meta = {
+            'columns': [{'name': column, 'file': self.column_file(column)}
+                        for column in self.columns],
+            'rows': self.rows_written,
+            'params': self.params
+        }
+        tmp_path = os.path.join(self.path, 'meta.json.tmp')
+        with open(tmp_path, 'w') as f:
+            json.dump(meta, f, indent=2)
+        os.replace(tmp_path, os.path.join(self.path, 'meta.json'))
+
+    def _abort(self):
+        for f in self._files.values():
+            f.close()
+        self._files = {}
+
+
+class ReservoirWriter:
+    """
+    Keep a uniform random sample of at most `rows` rows per group and write it on close.
+
+    Accepts the same chunks as ResultWriter. Every group (value of
+    `group_column`, e.g. a flip count) has its own reservoir (algorithm R):
+    the t-th row of a group replaces a random slot with probability
+    rows / t, so however many rows arrive, each has the same chance of
+    being kept. Chunks are processed with vectorized draws, and only the
+    sample is held in memory and written. Sampled rows are written grouped
+    and in arrival order; with a seed the choice of rows is reproducible.
+    Every group draws from its own generator started from the same seed, so
+    groups that receive the same number of rows in the same chunks keep the
+    same positions (e.g. the same runs for every flip count).
+
+    Args:
+        path (str): Output path without extension
+        columns (list): Column names, in output order
+        group_column (str): Column whose values each get their own sample
+        rows (int): Rows kept per group
+        output_format (str): 'csv' or 'columnar'
+        params (dict): Run parameters for the columnar sidecar
+        dtypes (dict): Column dtypes for the columnar format
+        seed (int): Seed of the sampling generator (default: fresh entropy)
+    """
+
+    def __init__(self, path, columns, group_column, rows=SAMPLE_ROWS, output_format='csv',
+                 params=None, dtypes=None, seed=None):
+        if output_format not in OUTPUT_FORMATS:
+            raise ValueError(f"Unknown output format: {output_format!r} "
+                             f"(expected one of {', '.join(OUTPUT_FORMATS)})")
+        self.base_path = path
+        self.path = path + ('.csv' if output_format == 'csv' else COLUMNAR_SUFFIX)
+        self.columns = list(columns)
+        self.group_column = group_column
+        self.rows = rows
+        self.output_format = output_format
+        self.params = params or {}
+        self.dtypes = dtypes
+        self.seed = seed
+        self.rows_seen = 0
+        self.rows_written = 0
+        self._seed_sequence = np.random.SeedSequence(seed)
+        # group -> (rows seen, arrival position per slot, column -> slot values, generator)
+        self._groups = {}
+        self._closed = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+
+    def write(self, chunk):
+        """
+        Offer rows given as columns to the sample.
+
+        Args:
+            chunk (dict): Column name -> array (or scalar, broadcast to the
+                length of the other columns, or a function of row indices,
+                see eager_columns, called for the sampled rows only)
+        """
+        arrays, length = eager_columns(chunk, self.columns)
+        self.rows_seen += length
+        keys, inverse = np.unique(arrays[self.group_column], return_inverse=True)
+        for index, key in enumerate(keys.tolist()):
+            rows = np.flatnonzero(inverse == index) if len(keys) > 1 else np.arange(length)
+            self._offer(key, chunk, arrays, rows)
+
+    def _offer(self, key, chunk, arrays, rows):
+        if key not in self._groups:
+            # Slot arrays are allocated with the dtype of the first values kept
+            self._groups[key] = [0, np.empty(self.rows, dtype=np.int64), {},
+                                 np.random.default_rng(self._seed_sequence)]
+        group = self._groups[key]
+        seen = group[0]
+        group[0] = seen + len(rows)
+        positions = seen + np.arange(len(rows))
+        # The first `rows` rows fill the reservoir, later row t takes a slot in [0, t]
+        slots = positions.copy()
+        late = positions >= self.rows
+        slots[late] = group[3].integers(0, positions[late] + 1)
+        keep = slots < self.rows
+        slots, rows, positions = slots[keep], rows[keep], positions[keep]
+        # When several rows land on one slot, the latest one wins
+        _, last = np.unique(slots[::-1], return_index=True)
+        last = len(slots) - 1 - last
+        if len(last) == 0:
+            return
+        group[1][slots[last]] = positions[last]
+        for column in self.columns:
+            kept = (arrays[column][rows[last]] if column in arrays
+                    else np.asarray(chunk[column](rows[last])))
+            if column not in group[2]:
+                group[2][column] = np.empty(self.rows, dtype=kept.dtype)
+            group[2][column][slots[last]] = kept
+
+    def sample(self):
+        """
+        The current sample.
+
+        Returns:
+            dict: Column name -> array, grouped and in arrival order
+        """
+        parts = []
+        for key in sorted(self._groups):
+            seen, positions, values, _ = self._groups[key]
+            filled = min(seen, self.rows)
+            if filled == 0:
+                continue
+            order = np.argsort(positions[:filled], kind='stable')
+            parts.append({column: values[column][:filled][order] for column in self.columns})
+        if not parts:
+            return {column: np.empty(0) for column in self.columns}
+        return {column: np.concatenate([part[column] for part in parts])
+                for column in self.columns}
+
+    def close(self):
+        """Write the sample."""
+        if self._closed:
+            return
+        self._closed = True
+        params = dict(self.params, sample_rows=self.rows, sample_seed=self.seed,
+                      rows_seen=self.rows_seen)
+        with open_result_writer(self.base_path, self.columns, self.output_format,
+                                params=params, dtypes=self.dtypes) as writer:
+            writer.write(self.sample())
+        self.rows_written = writer.rows_written
+
+
+def eager_columns(chunk, columns):
+    """
+    Broadcast the array columns of a chunk, leaving out its lazy columns.
+
+    A column may be given as a function that takes an array of row indices
+    into the chunk and returns the values of those rows. Writers call it
+    during write() for the rows they keep only, so a column that is
+    expensive to build is built for the written rows alone.
+
+    Args:
+        chunk (dict): Column name -> array, scalar or function of row indices
+        columns (list): Columns to take; at least one must not be lazy
+
+    Returns:
+        tuple: (column -> array for the non-lazy columns, number of rows)
+    """
+    names = [column for column in columns if not callable(chunk[column])]
+    arrays = dict(zip(names, np.broadcast_arrays(*(np.asarray(chunk[column])
+                                                   for column in names))))
+    return arrays, len(arrays[names[0]])
+
+
+def open_result_writer(path, columns, output_format='csv', params=None, dtypes=None,
+                       chunk_rows=CHUNK_ROWS, sample_rows=None, sample_by=None, seed=None):
+    """
+    Open a writer for `path` (without extension) in the requested format.
+
+    Args:
+        path (str): Output path without extension
+        columns (list): Column names, in output order
+        output_format (str): 'csv' or 'columnar'
+        params (dict): Run parameters for the columnar sidecar
+        dtypes (dict): Column dtypes for the columnar format
+        chunk_rows (int): Rows buffered before a chunk is handed to the I/O thread
+        sample_rows (int): Only write a uniform sample of this many rows per
+            value of `sample_by` (default: write every row)
+        sample_by (str): Grouping column of the sample
+        seed (int): Seed of the sample
+
+    Returns:
+        ResultWriter: CSV writer for '<path>.csv' or ColumnarWriter for
+            '<path>.cols', or a ReservoirWriter writing either on close
+    """
+    if sample_rows is not None:
+        return ReservoirWriter(path, columns, sample_by, sample_rows, output_format,
+                               params=params, dtypes=dtypes, seed=seed)
+    if output_format == 'csv':
+        return ResultWriter(path + '.csv', columns, chunk_rows)
+    if output_format == 'columnar':
+        return ColumnarWriter(path + COLUMNAR_SUFFIX, columns, chunk_rows,
+                              params=params, dtypes=dtypes)
+    raise ValueError(f"Unknown output format: {output_format!r} "
+                     f"(expected one of {', '.join(OUTPUT_FORMATS)})")
+
+
+def is_columnar(path):
+    """Whether `path` is a complete columnar result store."""
+    return os.path.isfile(os.path.join(path, 'meta.json'))
+
+
+def load_columns(path, mmap=True):
+    """
+    Load a columnar result store as a DataFrame.
+
+    Numeric and boolean columns are memory-mapped read-only and shared with
+    the DataFrame without copying; fixed-width byte-string columns are
+    decoded to str. The run parameters are in df.attrs['params'].
+
+    Args:
+        path (str): Store directory
+        mmap (bool): Memory-map the column files instead of reading them
+
+    Returns:
+        pd.DataFrame: Results with the stored column order
+    """
+    with open(os.path.join(path, 'meta.json')) as f:
+        meta = json.load(f)
+
+    data = {}
+    for column in meta['columns']:
+        values = np.load(os.path.join(path, column['file']), mmap_mode='r' if mmap else None)
+        if values.dtype.kind == 'S':
+            values = values.astype(str).astype(object)
+        data[column['name']] = values
+
+    df = pd.DataFrame(data, columns=[column['name'] for column in meta['columns']], copy=False)
+    df.attrs['params'] = meta['params']
+    return df
@@ -0,0 +1,219 @@
+"""
+Throughput metrics and live progress snapshots for the simulators.
+
+A RunMetrics object collects counters (flips, runs), wall time per cell
+(streak target or flip count), time split by phase (drawing random numbers
+vs reducing them to results) and peak memory. With a snapshot path it
+rewrites a JSON snapshot every few seconds from a background thread, so a
+monitor can tail the file and tell a slow sweep from a stuck one even while
+a single cell runs for a long time. Snapshots are written atomically
+(temporary file + rename), so readers never see a partial file.
+
+Work done in other processes is collected in a RunMetrics there and folded
+in with merge(as_dict()).
+"""
+
+from contextlib import contextmanager
+from datetime import datetime
+import json
+import os
+import sys
+import threading
+import time
+
+try:
+    import resource
+except ImportError:  # not available on Windows
+    resource = None
+
+SNAPSHOT_INTERVAL = 5.0  # seconds between snapshots
+
+
+def peak_memory():
+    """
+    Peak resident memory of this process and of its finished children.
+
+    Returns:
+        tuple: (self_bytes, children_bytes), or (None, None) where unsupported
+    """
+    if resource is None:
+        return None, None
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    scale = 1 if sys.platform == 'darwin' else 1024
+    return (resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale,
+            resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss * scale)
+
+
+class RunMetrics:
+    """
+    Counters, timers and periodic JSON snapshots for one simulation.
+
+    Args:
+        name (str): Name of the simulation, recorded in snapshots
+        snapshot_path (str): JSON file to keep updated (default: no snapshots)
+        interval (float): Seconds between snapshots
+        total_cells (int): Number of cells expected, for progress reporting
+    """
+
+    def __init__(self, name, snapshot_path=None, interval=SNAPSHOT_INTERVAL, total_cells=None):
+        self.name = name
+        self.snapshot_path = snapshot_path
+        self.interval = interval
+        self.total_cells = total_cells
+        self.flips = 0
+        self.runs = 0
+        self.phases = {}
+        self.cells = {}
+        self.current_cell = None
+        self.status = 'running'
+        self._started = time.time()
+        self._start_perf = time.perf_counter()
+        self._end_perf = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        if snapshot_path is not None:
+            self.write_snapshot()
+            self._thread = threading.Thread(target=self._snapshot_loop, daemon=True)
+            self._thread.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close('failed' if exc_type is not None else 'finished')
+
+    def add(self, flips=0, runs=0, **phase_seconds):
+        """
+        Count work done and time spent per phase.
+
+        Args:
+            flips (int): Flips simulated
+            runs (int): Runs completed
+            **phase_seconds: Seconds per phase, e.g. rng=0.2, reduction=0.1
+        """
+        with self._lock:
+            self.flips += int(flips)
+            self.runs += int(runs)
+            if self.current_cell is not None:
+                cell = self.cells[self.current_cell]
+                cell['flips'] += int(flips)
+                cell['runs'] += int(runs)
+            for phase, seconds in phase_seconds.items():
+                self.phases[phase] = self.phases.get(phase, 0.0) + seconds
+
+    @contextmanager
+    def cell(self, label):
+        """Attribute work and wall time inside the block to a cell (e.g. a streak target)."""
+        key = str(label)
+        with self._lock:
+            self.cells.setdefault(key, {'seconds': 0.0, 'flips': 0, 'runs': 0})
+            self.current_cell = key
+        start = time.perf_counter()
+        try:
+            yield self
+        finally:
+            with self._lock:
+                self.cells[key]['seconds'] += time.perf_counter() - start
+                self.current_cell = None
+
+    def merge(self, other):
+        """
+        Fold in metrics collected elsewhere, e.g. by a worker process.
+
+        Args:
+            other (dict): RunMetrics.as_dict() of the other collector
+        """
+        with self._lock:
+            self.flips += other['flips']
+            self.runs += other['runs']
+            for phase, seconds in other['phases'].items():
+                self.phases[phase] = self.phases.get(phase, 0.0) + seconds
+            for key, cell in other['cells'].items():
+                mine = self.cells.setdefault(key, {'seconds': 0.0, 'flips': 0, 'runs': 0})
+                for field in mine:
+                    mine[field] += cell[field]
+
+    def as_dict(self):
+        """Raw counters, suitable for merge() in another process."""
+        with self._lock:
+            return {'flips': self.flips, 'runs': self.runs, 'phases': dict(self.phases),
+                    'cells': {key: dict(cell) for key, cell in self.cells.items()}}
+
+    def snapshot(self):
+        """
+        Current progress and throughput.
+
+        Returns:
+            dict: JSON-serializable snapshot
+        """
+        elapsed = (self._end_perf or time.perf_counter()) - self._start_perf
+        peak_self, peak_children = peak_memory()
+        counters = self.as_dict()
+        return {
+            'name': self.name,
+            'status': self.status,
+            'pid': os.getpid(),
+            'started': datetime.fromtimestamp(self._started).isoformat(timespec='seconds'),
+            'updated': datetime.now().isoformat(timespec='seconds'),
+            'elapsed_seconds': elapsed,
+            'flips': counters['flips'],
+            'runs': counters['runs'],
+            'flips_per_second': counters['flips'] / elapsed if elapsed > 0 else 0.0,
+            'runs_per_second': counters['runs'] / elapsed if elapsed > 0 else 0.0,
+            'current_cell': self.current_cell,
+            'cells_started': len(counters['cells']),
+            'total_cells': self.total_cells,
+            'phase_seconds': counters['phases'],
+            'cells': counters['cells'],
+            'peak_memory_bytes': peak_self,
+            'peak_child_memory_bytes': peak_children
+        }
+
+    def write_snapshot(self):
+        """Atomically rewrite the snapshot file, if there is one."""
+        if self.snapshot_path is None:
+            return
+        tmp_path = self.snapshot_path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(self.snapshot(), f, indent=2)
+        os.replace(tmp_path, self.snapshot_path)
+
+    def close(self, status='finished'):
+        """
+        Stop periodic snapshots and write the final one.
+
+        Args:
+            status (str): Final status recorded in the snapshot
+        """
+        self.status = status
+        self._end_perf = time.perf_counter()
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+        self.write_snapshot()
+
+    def summary(self):
+        """
+        One-line throughput summary for printing.
+
+        Returns:
+            str: Flips/sec, runs/sec and the phase split
+        """
+        snapshot = self.snapshot()
+        phases = ', '.join(f"{phase} {seconds:.2f}s"
+                           for phase, seconds in snapshot['phase_seconds'].items())
+        return (f"{snapshot['flips']:,} flips, {snapshot['runs']:,} runs in "
+                f"{snapshot['elapsed_seconds']:.2f}s "
+                f"({snapshot['flips_per_second']:,.0f} flips/s, "
+                f"{snapshot['runs_per_second']:,.0f} runs/s"
+                + (f"; {phases}" if phases else '') + ")")
+
+    def _snapshot_loop(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.write_snapshot()
+            except OSError:
+                # A monitor reading the directory must not kill the simulation
+                pass
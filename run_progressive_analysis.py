@@ -3,81 +3,212 @@ import pandas as pd
 import matplotlib.pyplot as plt
 from datetime import datetime
 import os
+import argparse
+import time
+from contextlib import closing
 
-def flip_until_streak_numpy(streak_target):
-    max_batch = 10_000_000  # process in big batches
-    total_flips = 0
-    current_streak = 1
+from streak_engine import iter_streak_table, seed_params, checkpoint_seed
+from result_writer import open_result_writer, OUTPUT_FORMATS
+from run_metrics import RunMetrics, SNAPSHOT_INTERVAL
 
-    # Start with a random flip
-    last_flip = np.random.randint(1, 3)
+STAT_COLUMNS = ['Absolute Difference', 'Percentage Difference']
 
-    while current_streak < streak_target:
-        # Generate a large batch of random flips
-        flips = np.random.randint(1, 3, size=max_batch)
-        for flip in flips:
-            total_flips += 1
-            if flip == last_flip:
-                current_streak += 1
-                if current_streak == streak_target:
-                    return total_flips
-            else:
-                current_streak = 1
-                last_flip = flip
-
-    return total_flips
-
-def run_progressive_simulations(max_runs=100, max_streak=15):
+def run_progressive_simulations(max_runs=100, max_streak=15, workers=1, seed=None,
+                                incremental=False, output_format='csv', checkpoint_dir=None,
+                                resume=False, metrics=None, keep_rows=True):
+    """
+    Simulate fresh sets of 1..max_runs runs and record every streak target.
+    
+    All sum(1..max_runs) runs are drawn as one sharded table (see
+    simulate_streak_table), so the output for a given seed does not depend
+    on `workers`, and then split into the consecutive sets. The shards are
+    simulated as the sets reach them, so only the current set and the shard
+    it ends in are held in memory, never the whole table.
+    
+    In incremental mode only max_runs runs are simulated and the set of k
+    runs is their first k, so the sweep is linear rather than quadratic in
+    max_runs. The sets are then nested instead of independent; pass the
+    result to analyze_progressive_results with incremental=True.
+    
+    With output_format='columnar' the raw results are written as
+    memory-mappable .npy columns with a meta.json of the parameters.
+    
+    With checkpoint_dir the finished shards are saved as they complete, and
+    resume=True continues an interrupted sweep from them with identical
+    output (see simulate_streak_table).
+    
+    With keep_rows=False the statistics of analyze_progressive_results are
+    computed set by set while the rows are streamed to disk, and returned
+    instead of the rows, so memory does not grow with the rows written.
+    
+    Args:
+        max_runs (int): Largest number of runs in a set
+        max_streak (int): Longest streak target
+        workers (int): Number of worker processes
+        seed (int or np.random.SeedSequence): Master seed (default: fresh entropy)
+        incremental (bool): Simulate each run once and use nested sets
+        output_format (str): 'csv' or 'columnar'
+        checkpoint_dir (str): Directory for shard checkpoints (default: none)
+        resume (bool): Continue from the checkpoints in checkpoint_dir
+        metrics (RunMetrics): Receives throughput, per-target timings and the
+            time spent writing results ('output')
+        keep_rows (bool): Return every row rather than the statistics per set
+        
+    Returns:
+        pd.DataFrame: One row per (set, run, streak target), or per
+            (run, streak target) in incremental mode; with keep_rows=False
+            one row of statistics per set size
+    """
     # Create results directory if it doesn't exist
     results_dir = os.path.join("results", "results_20250419_progressive")
     os.makedirs(results_dir, exist_ok=True)
     
-    # Create CSV filename with timestamp
+    # Create output filename with timestamp
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    filename = os.path.join(results_dir, f'progressive_simulation_results_{timestamp}.csv')
+    filename = os.path.join(results_dir, f'progressive_simulation_results_{timestamp}')
+    
+    # Simulate the runs of every set as one sharded table, shard by shard
+    total_runs = max_runs if incremental else max_runs * (max_runs + 1) // 2
+    print(f"\nRunning {total_runs} runs...")
+    seed_seq = seed if isinstance(seed, np.random.SeedSequence) else np.random.SeedSequence(seed)
+    shards = iter_streak_table(total_runs, max_streak, seed=seed_seq, workers=workers,
+                               checkpoint_dir=checkpoint_dir, resume=resume, metrics=metrics)
+    
+    if incremental:
+        # Every set is a prefix of the same runs, so record them once
+        sets = _split_sets(shards, [max_runs])
+    else:
+        # Split the table into sets of 1..max_runs runs
+        sets = _split_sets(shards, range(1, max_runs + 1))
+    
+    # Stream each set as columns, keeping either the columns for the returned
+    # frame or only each set's statistics
+    write_start = time.perf_counter()
+    columns = ['Total Runs', 'Current Run', 'Streak Target', 'Flips Required',
+               'Theoretical Flips', 'Absolute Difference', 'Percentage Difference']
+    chunks = []
+    set_stats = []
+    theoretical_flips = 2 ** np.arange(1, max_streak + 1)
+    params = {'max_runs': max_runs, 'max_streak': max_streak, 'incremental': incremental,
+              'seed': seed_params(seed_seq)}
+    with closing(shards), open_result_writer(filename, columns, output_format,
+                                             params=params) as writer:
+        for num_runs, flips_required in sets:
+            difference = flips_required - theoretical_flips
+            chunk = dict(zip(columns, np.broadcast_arrays(
+                num_runs,
+                np.arange(1, num_runs + 1)[:, None],
+                np.arange(1, max_streak + 1),
+                flips_required,
+                theoretical_flips,
+                difference,
+                (difference / theoretical_flips) * 100
+            )))
+            if not keep_rows:
+                by_run = {column: chunk[column] for column in STAT_COLUMNS}
+                if incremental:
+                    prefix_stats = _prefix_stats(by_run)
+                else:
+                    set_stats.append(_set_stats(num_runs, by_run))
+            chunk = {column: values.ravel() for column, values in chunk.items()}
+            writer.write(chunk)
+            if keep_rows:
+                chunks.append(chunk)
+    if metrics is not None:
+        metrics.add(output=time.perf_counter() - write_start)
+    print(f"\nResults have been saved to {writer.path}")
+    
+    if not keep_rows:
+        return prefix_stats if incremental else pd.DataFrame(set_stats)
+    return pd.DataFrame({column: np.concatenate([chunk[column] for chunk in chunks])
+                         for column in columns})
+
+def _split_sets(shards, set_sizes):
+    """Cut consecutive sets of the given sizes from shards of runs; yields (size, runs)."""
+    pending = []
+    available = 0
+    for num_runs in set_sizes:
+        while available < num_runs:
+            shard = next(shards)
+            pending.append(shard)
+            available += len(shard)
+        runs = np.concatenate(pending) if len(pending) > 1 else pending[0]
+        pending = [runs[num_runs:]]
+        available -= num_runs
+        yield num_runs, runs[:num_runs]
+
+def progressive_prefix_stats(df):
+    """
+    Statistics of every leading set of runs 1..k from cumulative aggregates.
     
-    # Initialize DataFrame to store results
-    results = []
+    Produces the same columns as the groupby in analyze_progressive_results,
+    using running sums, sums of squares, minima and maxima over the runs in
+    order, so the cost is linear in the number of runs.
     
-    # Run simulations for each number of runs
-    for num_runs in range(1, max_runs + 1):
-        print(f"\nRunning {num_runs} runs...")
+    Args:
+        df (pd.DataFrame): Rows of run_progressive_simulations(incremental=True)
         
-        # Run simulations for current number of runs
-        for run in range(1, num_runs + 1):
-            for streak_target in range(1, max_streak + 1):
-                total_flips = flip_until_streak_numpy(streak_target)
-                theoretical_flips = 2 ** streak_target
-                difference = total_flips - theoretical_flips
-                percentage_diff = (difference / theoretical_flips) * 100
-                
-                results.append({
-                    'Total Runs': num_runs,
-                    'Current Run': run,
-                    'Streak Target': streak_target,
-                    'Flips Required': total_flips,
-                    'Theoretical Flips': theoretical_flips,
-                    'Absolute Difference': difference,
-                    'Percentage Difference': percentage_diff
-                })
-    
-    # Convert results to DataFrame and save to CSV
-    df = pd.DataFrame(results)
-    df.to_csv(filename, index=False)
-    print(f"\nResults have been saved to {filename}")
-    
-    return df
+    Returns:
+        pd.DataFrame: One row per set size k with mean/std/min/max columns
+    """
+    df = df.sort_values(['Current Run', 'Streak Target'])
+    num_runs = df['Current Run'].nunique()
+    return _prefix_stats({column: df[column].to_numpy().reshape(num_runs, -1)
+                          for column in STAT_COLUMNS})
 
-def analyze_progressive_results(df):
-    # Group by number of runs and calculate statistics
-    stats = df.groupby('Total Runs').agg({
-        'Absolute Difference': ['mean', 'std', 'min', 'max'],
-        'Percentage Difference': ['mean', 'std', 'min', 'max']
-    }).reset_index()
+def _prefix_stats(by_run):
+    """Prefix statistics from column -> (runs x streak targets) values, runs in order."""
+    num_runs = len(next(iter(by_run.values())))
+    stats = {'Total Runs_': np.arange(1, num_runs + 1)}
     
-    # Flatten column names
-    stats.columns = ['_'.join(col).strip() for col in stats.columns.values]
+    for column in STAT_COLUMNS:
+        values = by_run[column]
+        count = np.arange(1, num_runs + 1) * values.shape[1]
+        
+        # Shift by the first run's mean so the sums of squares do not cancel
+        shifted = values - values[0].mean()
+        total = np.cumsum(shifted.sum(axis=1))
+        total_sq = np.cumsum((shifted ** 2).sum(axis=1))
+        with np.errstate(divide='ignore', invalid='ignore'):
+            variance = (total_sq - total ** 2 / count) / (count - 1)
+        
+        stats[f'{column}_mean'] = total / count + values[0].mean()
+        stats[f'{column}_std'] = np.sqrt(np.maximum(variance, 0))
+        stats[f'{column}_min'] = np.minimum.accumulate(values.min(axis=1))
+        stats[f'{column}_max'] = np.maximum.accumulate(values.max(axis=1))
+    
+    return pd.DataFrame(stats)
+
+def _set_stats(num_runs, by_run):
+    """Statistics of one set of runs, as one row of the groupby in analyze_progressive_results."""
+    stats = {'Total Runs_': num_runs}
+    for column in STAT_COLUMNS:
+        values = by_run[column]
+        stats[f'{column}_mean'] = values.mean()
+        stats[f'{column}_std'] = values.std(ddof=1) if values.size > 1 else np.nan
+        stats[f'{column}_min'] = values.min()
+        stats[f'{column}_max'] = values.max()
+    return stats
+
+def analyze_progressive_results(df, incremental=False):
+    if incremental:
+        # Sets are prefixes of the same runs
+        stats = progressive_prefix_stats(df)
+    else:
+        # Group by number of runs and calculate statistics
+        stats = df.groupby('Total Runs').agg({
+            'Absolute Difference': ['mean', 'std', 'min', 'max'],
+            'Percentage Difference': ['mean', 'std', 'min', 'max']
+        }).reset_index()
+        
+        # Flatten column names
+        stats.columns = ['_'.join(col).strip() for col in stats.columns.values]
     
+    plot_progressive_results(stats)
+    return stats
+
+def plot_progressive_results(stats):
+    """Plot the mean differences from theory against the number of runs."""
     # Create directory for plots if it doesn't exist
     results_dir = os.path.join("results", "results_20250419_progressive")
     os.makedirs(results_dir, exist_ok=True)
@@ -115,15 +246,53 @@ def analyze_progressive_results(df):
     plt.legend()
     plt.savefig(os.path.join(results_dir, 'percentage_difference_vs_runs.png'))
     plt.close()
-    
-    return stats
 
 def main():
-    # Run progressive simulations
-    df = run_progressive_simulations(max_runs=100, max_streak=15)
+    parser = argparse.ArgumentParser(description='Progressive streak simulation analysis.')
+    parser.add_argument('--runs', type=int, default=100,
+                      help='Largest number of runs in a set (default: 100)')
+    parser.add_argument('--max_streak', type=int, default=15,
+                      help='Longest streak target (default: 15)')
+    parser.add_argument('--workers', type=int, default=1,
+                      help='Number of worker processes (default: 1)')
+    parser.add_argument('--seed', type=int, default=None,
+                      help='Master random seed (default: fresh entropy)')
+    parser.add_argument('--incremental', action='store_true',
+                      help='Simulate each run once and use nested sets (linear cost)')
+    parser.add_argument('--output_format', choices=OUTPUT_FORMATS, default='csv',
+                      help='CSV, or memory-mappable .npy columns (default: csv)')
+    parser.add_argument('--checkpoint_dir', type=str, default=None,
+                      help='Save finished shards here so the sweep can be resumed')
+    parser.add_argument('--resume', action='store_true',
+                      help='Continue the sweep checkpointed in --checkpoint_dir')
+    parser.add_argument('--metrics_file', type=str, default=None,
+                      help='Keep a JSON snapshot of progress and throughput here '
+                           '(default: only print a summary)')
+    parser.add_argument('--metrics_interval', type=float, default=SNAPSHOT_INTERVAL,
+                      help=f'Seconds between metrics snapshots (default: {SNAPSHOT_INTERVAL:g})')
+    
+    args = parser.parse_args()
+    if args.resume and args.checkpoint_dir is None:
+        parser.error('--resume requires --checkpoint_dir')
+    
+    # An unseeded sweep keeps the entropy it started with when resumed
+    seed = args.seed
+    if args.checkpoint_dir is not None:
+        seed = checkpoint_seed(args.checkpoint_dir, args.seed, args.resume)
+    
+    # Run progressive simulations, computing the statistics while streaming
+    with RunMetrics('progressive sweep', args.metrics_file, args.metrics_interval,
+                    total_cells=args.max_streak) as metrics:
+        stats = run_progressive_simulations(max_runs=args.runs, max_streak=args.max_streak,
+                                         workers=args.workers, seed=seed,
+                                         incremental=args.incremental,
+                                         output_format=args.output_format,
+                                         checkpoint_dir=args.checkpoint_dir, resume=args.resume,
+                                         metrics=metrics, keep_rows=False)
+    print(f"Simulation: {metrics.summary()}")
     
-    # Analyze results
-    stats = analyze_progressive_results(df)
+    # Plot results
+    plot_progressive_results(stats)
     
     # Save statistics to CSV
     results_dir = os.path.join("results", "results_20250419_progressive")
@@ -0,0 +1,117 @@
+"""
+Sequential sampling: draw batches until an estimate is precise enough.
+
+Instead of a fixed number of runs per cell (streak target or flip count),
+sample_until_precise keeps drawing batches for a cell until the half-width
+of the normal confidence interval of its estimate falls below a tolerance,
+or the cell's budget is spent. Each new batch is sized from the current
+variance estimate to land just past the tolerance, so cells with noisy
+estimates get many samples and easy cells stop early.
+"""
+
+import numpy as np
+from scipy.stats import norm
+
+MIN_SAMPLES = 100  # samples drawn before the first precision check
+
+
+def mean_half_width(values, confidence=0.95):
+    """
+    Half-width of the normal confidence interval of a sample mean.
+
+    Args:
+        values (np.ndarray): Samples
+        confidence (float): Two-sided confidence level
+
+    Returns:
+        float: z * s / sqrt(n)
+    """
+    if len(values) < 2:
+        return np.inf
+    return norm.ppf(0.5 + confidence / 2) * np.std(values, ddof=1) / np.sqrt(len(values))
+
+
+def relative_half_width(values, confidence=0.95):
+    """
+    Mean half-width relative to the mean, for estimates spanning many scales.
+
+    Args:
+        values (np.ndarray): Samples
+        confidence (float): Two-sided confidence level
+
+    Returns:
+        float: Half-width divided by the mean (the plain half-width if the mean is 0)
+    """
+    half_width = mean_half_width(values, confidence)
+    mean = abs(np.mean(values)) if len(values) else 0
+    return half_width / mean if mean > 0 else half_width
+
+
+def proportion_half_width(values, confidence=0.95):
+    """
+    Half-width of the Agresti-Coull interval of a proportion.
+
+    Unlike the plain normal interval this does not collapse to zero when no
+    (or every) sample is a success, so rare events are not declared precise
+    after the first batch.
+
+    Args:
+        values (np.ndarray): Boolean samples
+        confidence (float): Two-sided confidence level
+
+    Returns:
+        float: Half-width of the interval
+    """
+    z = norm.ppf(0.5 + confidence / 2)
+    n = len(values) + z ** 2
+    p = (np.count_nonzero(values) + z ** 2 / 2) / n
+    return z * np.sqrt(p * (1 - p) / n)
+
+
+def sample_until_precise(draw, tolerance, half_width, max_samples, min_samples=MIN_SAMPLES):
+    """
+    Draw batches until half_width(samples) <= tolerance or max_samples are used.
+
+    Args:
+        draw (callable): draw(n) returns an array of n new samples
+        tolerance (float): Target half-width
+        half_width (callable): half_width(samples) of the current estimate,
+            e.g. mean_half_width or proportion_half_width
+        max_samples (int): Budget for this cell
+        min_samples (int): Size of the first batch
+
+    Returns:
+        tuple: (samples, half_width, converged)
+    """
+    batches = [draw(min(min_samples, max_samples))]
+    count = len(batches[0])
+    samples = batches[0]
+    width = half_width(samples)
+    while width > tolerance and count < max_samples:
+        # Width shrinks like 1/sqrt(n); aim 10% past the projected requirement
+        needed = int(np.ceil(count * (width / tolerance) ** 2 * 1.1)) if np.isfinite(width) else 2 * count
+        batch = int(np.clip(needed - count, min_samples, max_samples - count))
+        batches.append(draw(batch))
+        count += batch
+        samples = np.concatenate(batches)
+        width = half_width(samples)
+    return samples, width, width <= tolerance
+
+
+def print_sample_report(label, cells, samples_used, half_widths, tolerance):
+    """
+    Print how many samples every cell used and how precise it ended up.
+
+    Args:
+        label (str): Name of the cell column, e.g. 'Flips' or 'Streak'
+        cells (list): Cell values
+        samples_used (list): Samples drawn per cell
+        half_widths (list): Final half-width per cell
+        tolerance (float): Target half-width
+    """
+    print(f"\nSamples used per cell (tolerance {tolerance:g}):")
+    print("-" * 50)
+    print(f"{label:>8} | {'Samples':>10} | {'Half-width':>12} | {'Done':>6}")
+    print("-" * 50)
+    for cell, used, width in zip(cells, samples_used, half_widths):
+        print(f"{cell:8d} | {used:10,d} | {width:12.4g} | {'yes' if width <= tolerance else 'budget':>6}")
@@ -0,0 +1,275 @@
+"""
+Exact distribution of the number of flips needed to reach a streak.
+
+T is the number of flips counted by flip_until_streak_numpy: after a seeding
+flip, the flips until the same face has come up n times in a row. Every
+counted flip either matches the previous one (probability 1/2) or breaks the
+streak, so T is the waiting time for n - 1 consecutive matches and its
+survival function S(t) = P(T > t) satisfies
+
+    S(t) = 1                                  for t < n - 1
+    S(t) = S(t - 1) - 2^-n * S(t - n)         for t >= n - 1
+
+for n >= 2, taking S(-1) = 2 so that P(T = n - 1) = 2^-(n - 1).
+
+The recurrence is a linear system whose dominant root is lambda = 1 - delta
+with 2^n * delta * (1 - delta)^(n - 1) = 1; every other root is smaller than
+1/2 in modulus. The survival function is therefore tabulated exactly over a
+short head, after which S(t) = S(t0) * lambda^(t - t0) to double precision.
+Mean, variance, quantiles and trimmed means follow in closed form from the
+head table and the geometric tail, for any n and any horizon.
+"""
+
+import functools
+import math
+
+import numpy as np
+
+HEAD_MARGIN = 128  # steps past 2(n - 1) after which the tail is geometric
+
+
+@functools.lru_cache(maxsize=None)
+def _table(n):
+    """
+    Head survival table and tail decay for a streak of length n.
+
+    Returns:
+        tuple: (head, log_lambda, delta) - head[t] = S(t) for t < len(head)
+    """
+    m = n - 1
+    head_len = 2 * m + HEAD_MARGIN
+    head = np.ones(head_len)
+    if m == 0:
+        return head * 0, -math.inf, 1.0
+
+    # p(m) = 2^-m, p(t) = 2^-(m + 1) S(t - m - 1) for t > m
+    head[m] = 1 - 0.5 ** m
+    for t in range(m + 1, head_len):
+        head[t] = head[t - 1] - 0.5 ** (m + 1) * head[t - m - 1]
+
+    # Dominant root 1 - delta: Newton on log(delta) + m*log(1 - delta) + (m + 1)*log(2)
+    if m == 1:
+        delta = 0.5
+    else:
+        delta = 0.5 ** (m + 1)
+        for _ in range(100):
+            h = math.log(delta) + m * math.log1p(-delta) + (m + 1) * math.log(2)
+            step = h / (1 / delta - m / (1 - delta))
+            delta -= step
+            if abs(step) <= 1e-17 * delta:
+                break
+
+    return head, math.log1p(-delta), delta
+
+
+def _by_streak(func):
+    """Evaluate func(n, values) for every distinct n, broadcasting n against values."""
+    @functools.wraps(func)
+    def wrapper(n, values):
+        n_arr, v_arr = np.broadcast_arrays(np.asarray(n), np.asarray(values, dtype=np.float64))
+        out = np.empty(n_arr.shape)
+        for streak in np.unique(n_arr):
+            mask = n_arr == streak
+            out[mask] = func(int(streak), v_arr[mask])
+        return out if out.ndim else out[()]
+    return wrapper
+
+
+def _survival(n, t):
+    """P(T > t) for integer array t."""
+    head, log_lambda, _ = _table(n)
+    t0 = len(head) - 1
+    out = np.ones(t.shape)
+    inside = (t >= 0) & (t <= t0)
+    out[inside] = head[t[inside].astype(np.int64)]
+    beyond = t > t0
+    out[beyond] = head[t0] * np.exp((t[beyond] - t0) * log_lambda)
+    return out
+
+
+@_by_streak
+def survival(n, t):
+    """
+    Probability that a streak of n needs more than t flips, P(T > t).
+
+    Args:
+        n (int or array): Streak length
+        t (int or array): Number of flips
+
+    Returns:
+        float or np.ndarray: Survival probability
+    """
+    return _survival(n, np.floor(t))
+
+
+def cdf(n, t):
+    """
+    Probability that a streak of n needs at most t flips, P(T <= t).
+
+    Args:
+        n (int or array): Streak length
+        t (int or array): Number of flips
+
+    Returns:
+        float or np.ndarray: Cumulative probability
+    """
+    return 1 - survival(n, t)
+
+
+@_by_streak
+def pmf(n, t):
+    """
+    Probability that a streak of n needs exactly t flips, P(T = t).
+
+    Args:
+        n (int or array): Streak length
+        t (int or array): Number of flips
+
+    Returns:
+        float or np.ndarray: Probability mass
+    """
+    out = _survival(n, t - 1) - _survival(n, t)
+    out[t != np.floor(t)] = 0
+    return out
+
+
+def mean(n):
+    """
+    Expected number of flips to reach a streak of n, E[T] = 2^n - 2.
+
+    Args:
+        n (int or array): Streak length
+
+    Returns:
+        float or np.ndarray: Expected flips
+    """
+    return np.exp2(n) - 2
+
+
+def variance(n):
+    """
+    Variance of the number of flips to reach a streak of n.
+
+    Uses the closed form for the waiting time of m = n - 1 successes in a
+    row with success probability p = 1/2 (q = 1 - p):
+    (1 - (2m + 1) q p^m - p^(2m + 1)) / (q^2 p^(2m)).
+
+    Args:
+        n (int or array): Streak length
+
+    Returns:
+        float or np.ndarray: Variance of the flips required
+    """
+    m = np.asarray(n, dtype=np.float64) - 1
+    p_m = np.exp2(-m)
+    return (1 - (2 * m + 1) * 0.5 * p_m - 0.5 * p_m * p_m) / (0.25 * p_m * p_m)
+
+
+def _quantile(n, q):
+    """Smallest t with P(T <= t) >= q, for scalar n and q."""
+    head, log_lambda, _ = _table(n)
+    if n <= 1:
+        return 0
+    t0 = len(head) - 1
+    target = 1 - q
+    if head[t0] <= target:
+        # head is non-increasing; first index where S(t) <= 1 - q
+        return int(np.argmax(head <= target))
+    t = t0 + math.ceil(math.log(target / head[t0]) / log_lambda)
+    # Guard against rounding at the boundary
+    while _survival(n, np.array([t - 1.0]))[0] <= target:
+        t -= 1
+    while _survival(n, np.array([float(t)]))[0] > target:
+        t += 1
+    return t
+
+
+@_by_streak
+def quantile(n, q):
+    """
+    Smallest number of flips t with P(T <= t) >= q.
+
+    Args:
+        n (int or array): Streak length
+        q (float or array): Probability level in (0, 1)
+
+    Returns:
+        float or np.ndarray: Quantile of the flips required
+    """
+    return np.array([_quantile(n, level) for level in q.ravel()]).reshape(q.shape)
+
+
+def median(n):
+    """
+    Median number of flips to reach a streak of n.
+
+    Args:
+        n (int or array): Streak length
+
+    Returns:
+        float or np.ndarray: Median flips required
+    """
+    return quantile(n, 0.5)
+
+
+def _survival_sum(n, lo, hi):
+    """Sum of S(t) for integer t in [lo, hi]."""
+    if hi < lo:
+        return 0.0
+    head, log_lambda, delta = _table(n)
+    t0 = len(head) - 1
+    total = 0.0
+    if lo <= t0:
+        total += head[lo:min(hi, t0) + 1].sum()
+    if hi > t0:
+        start = max(lo, t0 + 1)
+        # S(t0) * sum of lambda^(t - t0) for t in [start, hi]
+        first = head[t0] * math.exp((start - t0) * log_lambda)
+        if math.isinf(hi):
+            total += first / delta
+        else:
+            total += first * -math.expm1((hi - start + 1) * log_lambda) / delta
+    return total
+
+
+def _first_moment(n, lo, hi):
+    """Sum of t * P(T = t) for integer t in [lo, hi] (hi may be infinite)."""
+    if hi < lo:
+        return 0.0
+    s_before = _survival(n, np.array([lo - 1.0]))[0]
+    s_last = 0.0 if math.isinf(hi) else hi * _survival(n, np.array([float(hi)]))[0]
+    return lo * s_before + _survival_sum(n, lo, hi - 1) - s_last
+
+
+def _trimmed_mean(n, proportion):
+    """Mean of the quantile function over [proportion, 1 - proportion]."""
+    if n <= 1:
+        return 0.0
+    if proportion == 0:
+        return _first_moment(n, 0, math.inf)
+    lower = _quantile(n, proportion)
+    upper = _quantile(n, 1 - proportion)
+    if upper == lower:
+        return float(lower)
+    mass_lower = (1 - _survival(n, np.array([float(lower)]))[0]) - proportion
+    mass_upper = (1 - proportion) - (1 - _survival(n, np.array([upper - 1.0]))[0])
+    middle = _first_moment(n, lower + 1, upper - 1)
+    return (lower * mass_lower + middle + upper * mass_upper) / (1 - 2 * proportion)
+
+
+@_by_streak
+def trimmed_mean(n, proportion):
+    """
+    Mean flips to reach a streak of n with a proportion cut from each tail.
+
+    This is the population counterpart of sorting simulated values and
+    dropping `proportion` of them from each end before averaging.
+
+    Args:
+        n (int or array): Streak length
+        proportion (float or array): Fraction trimmed from each tail, in [0, 0.5)
+
+    Returns:
+        float or np.ndarray: Trimmed mean of the flips required
+    """
+    return np.array([_trimmed_mean(n, p) for p in proportion.ravel()]).reshape(proportion.shape)
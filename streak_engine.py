@@ -0,0 +1,921 @@
+"""
+Streak detection kernels shared by the streak simulators.
+
+A streak simulation draws coin flips (0 for tails, 1 for heads) until the
+same face has come up `streak_target` times in a row. The very first flip
+only seeds the streak and is not counted, so the hitting time reported by
+`flip_until_streak_numpy` is the number of flips drawn after it.
+
+Flips are drawn in batches. Each batch is handed to a scan kernel together
+with the carried state (`last_flip`, `current_streak`); the kernel returns
+how many flips of the batch were consumed before the streak was reached
+(or None) and the state to carry into the next batch.
+
+The 'bitpacked' backend draws raw 64-bit words from the bit generator and
+treats every bit as one flip (least significant bit first), so a batch
+costs one bit of memory and randomness per flip instead of one byte.
+
+Batches start near the expected waiting time of the streak and double
+after every miss, up to the number of flips whose working memory fits the
+memory ceiling, so short streaks no longer pay for huge batches.
+
+For long streaks, sample_streak_attempts draws the same waiting time from
+streak attempts instead of single flips.
+
+Whole sweeps are split into fixed-size shards of runs, each with its own
+stream spawned from a master np.random.SeedSequence. Shards can run in a
+process pool; since the shard layout does not depend on the number of
+workers, a given seed always produces the same table. A shard's stream is
+fully determined by the master seed and the shard index, so a sweep can be
+checkpointed by saving each finished shard and resumed by simulating only
+the missing ones. iter_streak_table hands out the shards in order, so a
+sweep can be consumed without ever holding the whole table.
+
+simulate_streak_until_precise replaces the fixed run count by a precision
+target: each streak target gets its own stream and draws runs until the
+confidence interval of its mean is narrow enough.
+
+The simulators optionally report into a run_metrics.RunMetrics: flips and
+runs completed, wall time per streak target, and time spent drawing random
+words ('rng') vs scanning them for streaks ('reduction'). Worker processes
+collect their own metrics, which are merged as each task finishes.
+"""
+
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import json
+import os
+import time
+
+import numpy as np
+
+from run_metrics import RunMetrics
+from sequential_sampling import sample_until_precise, relative_half_width
+
+WORD_BITS = 64
+MIN_BATCH = WORD_BITS  # smallest batch drawn (one word)
+MEMORY_LIMIT = 64 * 2**20  # default ceiling on a batch's working memory (bytes)
+SHARD_RUNS = 1000  # runs per independently seeded shard
+
+
+def scan_streak_scalar(flips, streak_target, last_flip, current_streak):
+    """
+    Reference scan that walks a batch one flip at a time.
+
+    Args:
+        flips (np.ndarray): Batch of flips
+        streak_target (int): Streak length to reach (>= 2)
+        last_flip (int): Last flip before this batch
+        current_streak (int): Streak length carried into this batch
+
+    Returns:
+        tuple: (consumed, last_flip, current_streak) - consumed is the number
+            of flips used to reach the streak, or None if it was not reached
+    """
+    for idx, flip in enumerate(flips):
+        if flip == last_flip:
+            current_streak += 1
+            if current_streak == streak_target:
+                return idx + 1, last_flip, current_streak
+        else:
+            current_streak = 1
+            last_flip = flip
+
+    return None, last_flip, current_streak
+
+
+def scan_streak_rle(flips, streak_target, last_flip, current_streak):
+    """
+    Vectorized scan using run-length encoding of the batch.
+
+    Run boundaries are the change points of the batch. The first run is
+    extended by the streak carried in from the previous batch when it
+    continues the same face, and the trailing run is carried out.
+
+    Args:
+        flips (np.ndarray): Batch of flips
+        streak_target (int): Streak length to reach (>= 2)
+        last_flip (int): Last flip before this batch
+        current_streak (int): Streak length carried into this batch
+
+    Returns:
+        tuple: (consumed, last_flip, current_streak) - same contract as
+            scan_streak_scalar
+    """
+    n = len(flips)
+    if n == 0:
+        return None, last_flip, current_streak
+
+    # Start index of every run in the batch
+    starts = np.flatnonzero(np.diff(flips))
+    starts += 1
+    starts = np.concatenate(([0], starts))
+    lengths = np.diff(np.append(starts, n))
+
+    # The first run continues the carried streak if it is the same face
+    carry = current_streak if flips[0] == last_flip else 0
+    lengths[0] += carry
+
+    hits = np.flatnonzero(lengths >= streak_target)
+    if hits.size:
+        run = hits[0]
+        base = carry if run == 0 else 0
+        return int(starts[run]) + streak_target - base, last_flip, current_streak
+
+    return None, flips[-1].item(), int(lengths[-1])
+
+
+def unpack_words(words):
+    """
+    Expand packed 64-bit words into one flip per bit (least significant bit first).
+
+    Args:
+        words (np.ndarray): uint64 words
+
+    Returns:
+        np.ndarray: uint8 flips, 64 per word
+    """
+    return np.unpackbits(words.astype('<u8').view(np.uint8), bitorder='little')
+
+
+def _shift_up(words, shift):
+    """Move every bit of packed bit strings (first axis) `shift` positions later, filling with zeros."""
+    word_shift, bit_shift = divmod(shift, WORD_BITS)
+    num_words = len(words)
+    out = np.empty_like(words)
+    out[:word_shift] = 0
+    if word_shift >= num_words:
+        return out
+    src = words[:num_words - word_shift]
+    if bit_shift == 0:
+        out[word_shift:] = src
+        return out
+    np.left_shift(src, np.uint64(bit_shift), out=out[word_shift:])
+    out[word_shift + 1:] |= src[:-1] >> np.uint64(WORD_BITS - bit_shift)
+    return out
+
+
+def _first_set_bit(words):
+    """Return the position of the first set bit of a packed bit string, or None."""
+    nonzero = np.flatnonzero(words)
+    if not nonzero.size:
+        return None
+    idx = int(nonzero[0])
+    word = int(words[idx])
+    return idx * WORD_BITS + (word & -word).bit_length() - 1
+
+
+def _last_set_bit(words):
+    """Return the position of the last set bit of a packed bit string, or None."""
+    nonzero = np.flatnonzero(words)
+    if not nonzero.size:
+        return None
+    idx = int(nonzero[-1])
+    return idx * WORD_BITS + int(words[idx]).bit_length() - 1
+
+
+def scan_streak_bitpacked(words, streak_target, last_flip, current_streak):
+    """
+    Word-level scan over a batch of bit-packed flips.
+
+    Each bit is marked when it equals the previous flip. A streak of length
+    n ends wherever n - 1 consecutive bits are marked, which is found by
+    repeatedly AND-ing the mark words with shifted copies of themselves
+    (doubling the covered window each pass). Runs that continue the carried
+    streak are resolved from the length of the leading marked prefix.
+
+    Args:
+        words (np.ndarray): Batch of uint64 words, 64 flips per word
+        streak_target (int): Streak length to reach (>= 2)
+        last_flip (int): Last flip before this batch
+        current_streak (int): Streak length carried into this batch
+
+    Returns:
+        tuple: (consumed, last_flip, current_streak) - same contract as
+            scan_streak_scalar
+    """
+    n_bits = len(words) * WORD_BITS
+    if n_bits == 0:
+        return None, last_flip, current_streak
+
+    # Mark flips equal to the previous one
+    previous = _shift_up(words, 1)
+    previous[0] |= np.uint64(last_flip)
+    breaks = words ^ previous
+    matches = ~breaks
+
+    # Leading matches extend the carried streak
+    first_break = _first_set_bit(breaks)
+    prefix = n_bits if first_break is None else first_break
+    if current_streak + prefix >= streak_target:
+        return streak_target - current_streak, last_flip, current_streak
+
+    # Later streaks need streak_target - 1 consecutive matches
+    window = streak_target - 1
+    covered = 1
+    while covered < window:
+        step = min(covered, window - covered)
+        matches &= _shift_up(matches, step)
+        covered += step
+
+    hit = _first_set_bit(matches)
+    if hit is not None:
+        return hit + 1, last_flip, current_streak
+
+    last_bit = int(words[-1] >> np.uint64(WORD_BITS - 1))
+    if first_break is None:
+        return None, last_bit, current_streak + n_bits
+    return None, last_bit, n_bits - _last_set_bit(breaks)
+
+
+class FlipBuffer:
+    """
+    Reusable buffer of 0/1 flips unpacked from raw 64-bit words.
+
+    The buffer only grows, so repeated draws of similar sizes reuse the same
+    memory. Each draw overwrites the flips returned by the previous one.
+
+    Only the unpacked flips are reused: the raw words still come from
+    bit_generator.random_raw, which has no out= argument, so every draw
+    allocates one 8-byte word per 64 flips (an eighth of the unpacked size).
+    Drawing words ahead into a buffer would change the random stream.
+    """
+
+    _SHIFTS = np.arange(8, dtype=np.uint8)
+
+    def __init__(self):
+        self._flips = np.empty(0, dtype=np.uint8)
+
+    def draw(self, rng, size):
+        """
+        Draw `size` flips (least significant bit of each word first).
+
+        Args:
+            rng (np.random.Generator): Random generator
+            size (int): Number of flips
+
+        Returns:
+            np.ndarray: uint8 view of the buffer holding the flips
+        """
+        # A fresh (small) words array: random_raw cannot fill an existing one
+        words = rng.bit_generator.random_raw(-(-size // WORD_BITS))
+        n_bits = len(words) * WORD_BITS
+        if len(self._flips) < n_bits:
+            self._flips = np.empty(n_bits, dtype=np.uint8)
+
+        unpacked = self._flips[:n_bits].reshape(-1, 8)
+        packed = words.astype('<u8', copy=False).view(np.uint8)
+        np.right_shift(packed[:, None], self._SHIFTS, out=unpacked)
+        np.bitwise_and(unpacked, 1, out=unpacked)
+        return self._flips[:size]
+
+
+_flip_buffer = FlipBuffer()
+
+
+def _draw_flips(rng, size):
+    return _flip_buffer.draw(rng, size)
+
+
+def _draw_words(rng, size):
+    return rng.bit_generator.random_raw(-(-size // WORD_BITS))
+
+
+# backend -> (draw batch, scan kernel, flips per batch element,
+#             approximate working bytes per flip)
+BACKENDS = {
+    'scalar': (_draw_flips, scan_streak_scalar, 1, 1),
+    'rle': (_draw_flips, scan_streak_rle, 1, 16),
+    'bitpacked': (_draw_words, scan_streak_bitpacked, WORD_BITS, 1),
+}
+
+
+def expected_flips(streak_target):
+    """
+    Expected number of counted flips to reach a streak of either face.
+
+    Args:
+        streak_target (int): Streak length to reach
+
+    Returns:
+        int: 2^n - 2 (the seeding flip is not counted)
+    """
+    return max(2 ** streak_target - 2, 0)
+
+
+def batch_sizes(streak_target, max_batch):
+    """
+    Yield batch sizes for a streak search, doubling after every miss.
+
+    Args:
+        streak_target (int): Streak length to reach
+        max_batch (int): Largest batch size
+
+    Yields:
+        int: Number of flips to draw for the next batch
+    """
+    size = min(max(expected_flips(streak_target), MIN_BATCH), max_batch)
+    while True:
+        yield size
+        size = min(2 * size, max_batch)
+
+
+def flip_until_streak_numpy(streak_target, rng=None, backend='rle', max_batch=None,
+                            memory_limit=MEMORY_LIMIT):
+    """
+    Flip a coin until the same face comes up `streak_target` times in a row.
+
+    Args:
+        streak_target (int): Streak length to reach
+        rng (np.random.Generator): Random generator (default: fresh generator)
+        backend (str): One of BACKENDS (default: 'rle')
+        max_batch (int): Largest number of flips drawn per batch
+            (default: as many as fit in memory_limit)
+        memory_limit (int): Ceiling on a batch's working memory in bytes
+
+    Returns:
+        int: Number of flips after the first one needed to reach the streak
+    """
+    if rng is None:
+        rng = np.random.default_rng()
+    draw, scan, flips_per_element, bytes_per_flip = BACKENDS[backend]
+    if max_batch is None:
+        max_batch = max(MIN_BATCH, memory_limit // bytes_per_flip)
+
+    total_flips = 0
+    current_streak = 1
+
+    # Start with a random flip
+    last_flip = int(rng.integers(0, 2))
+
+    sizes = batch_sizes(streak_target, max_batch)
+    while current_streak < streak_target:
+        # Generate the next batch of random flips
+        batch = draw(rng, next(sizes))
+        consumed, last_flip, current_streak = scan(
+            batch, streak_target, last_flip, current_streak
+        )
+        if consumed is not None:
+            return total_flips + consumed
+        total_flips += len(batch) * flips_per_element
+
+    return total_flips
+
+
+def flip_until_streaks(max_streak, rng=None, max_batch=None, memory_limit=MEMORY_LIMIT,
+                       metrics=None):
+    """
+    Record the hitting time of every streak length 1..max_streak in one sequence.
+
+    A single flip sequence is scanned until a streak of `max_streak` appears;
+    the first time each shorter streak was reached is read off the running
+    maximum of the run lengths. The hitting times of different targets are
+    therefore correlated, unlike separate flip_until_streak_numpy calls.
+
+    Args:
+        max_streak (int): Longest streak length to reach
+        rng (np.random.Generator): Random generator (default: fresh generator)
+        max_batch (int): Largest number of flips drawn per batch
+            (default: as many as fit in memory_limit)
+        memory_limit (int): Ceiling on a batch's working memory in bytes
+        metrics (RunMetrics): Receives flips drawn and rng/reduction time
+
+    Returns:
+        np.ndarray: Flips after the first one needed for streaks 1..max_streak
+    """
+    if rng is None:
+        rng = np.random.default_rng()
+    if max_batch is None:
+        max_batch = max(MIN_BATCH, memory_limit // BACKENDS['rle'][3])
+
+    hits = np.zeros(max_streak, dtype=np.int64)
+    total_flips = 0
+    current_streak = 1
+    longest = 1  # streak lengths up to here already have a hitting time
+
+    # Start with a random flip
+    last_flip = int(rng.integers(0, 2))
+
+    sizes = batch_sizes(max_streak, max_batch)
+    while longest < max_streak:
+        start = time.perf_counter()
+        flips = _draw_flips(rng, next(sizes))
+        drawn = time.perf_counter()
+
+        starts = np.flatnonzero(np.diff(flips))
+        starts += 1
+        starts = np.concatenate(([0], starts))
+        lengths = np.diff(np.append(starts, len(flips)))
+        carry = current_streak if flips[0] == last_flip else 0
+        lengths[0] += carry
+
+        # First run reaching each pending target
+        running_max = np.maximum.accumulate(lengths)
+        targets = np.arange(longest + 1, min(running_max[-1], max_streak) + 1)
+        if targets.size:
+            runs = np.searchsorted(running_max, targets)
+            base = np.where(runs == 0, carry, 0)
+            hits[targets - 1] = total_flips + starts[runs] + targets - base
+            longest = int(targets[-1])
+
+        total_flips += len(flips)
+        last_flip = flips[-1].item()
+        current_streak = int(lengths[-1])
+        if metrics is not None:
+            metrics.add(flips=len(flips), rng=drawn - start,
+                        reduction=time.perf_counter() - drawn)
+
+    if metrics is not None:
+        metrics.add(runs=1)
+    return hits
+
+
+
+def _first_set_bits(words):
+    """Return the position of the first set bit in each column of packed bits, or -1."""
+    nonzero = words != 0
+    idx = nonzero.argmax(axis=0)
+    word = words[idx, np.arange(words.shape[1])]
+    word = np.where(word != 0, word, np.uint64(1))
+    lowest = word & (~word + np.uint64(1))
+    position = idx * WORD_BITS + np.log2(lowest).astype(np.int64)
+    return np.where(nonzero.any(axis=0), position, -1)
+
+
+def _last_set_bits(words):
+    """Return the position of the last set bit in each column of packed bits, or -1."""
+    nonzero = words != 0
+    idx = len(words) - 1 - nonzero[::-1].argmax(axis=0)
+    word = words[idx, np.arange(words.shape[1])]
+    for shift in (1, 2, 4, 8, 16, 32):
+        word |= word >> np.uint64(shift)
+    highest = word ^ (word >> np.uint64(1))
+    highest = np.where(highest != 0, highest, np.uint64(1))
+    position = idx * WORD_BITS + np.log2(highest).astype(np.int64)
+    return np.where(nonzero.any(axis=0), position, -1)
+
+
+def scan_streak_rows(words, streak_target, last_flip, current_streak):
+    """
+    Scan a block of packed flips where every column is the next chunk of a separate run.
+
+    Applies the scan_streak_bitpacked algorithm to all runs at once. The
+    block is laid out word-major (words x runs) so that shifting a bit
+    string across word boundaries works on whole contiguous rows.
+
+    Args:
+        words (np.ndarray): 2D block of uint64 words, one column per run
+        streak_target (int): Streak length to reach (>= 2)
+        last_flip (np.ndarray): Last flip of each run before this block
+        current_streak (np.ndarray): Streak length carried into each run
+
+    Returns:
+        tuple: (consumed, last_flip, current_streak) - consumed holds the
+            flips each run used to reach the streak, or -1 if it was not
+            reached; the carried state is returned for every run
+    """
+    n_bits = len(words) * WORD_BITS
+
+    # Mark flips equal to the previous one
+    previous = _shift_up(words, 1)
+    previous[0] |= last_flip.astype(np.uint64)
+    breaks = words ^ previous
+    matches = np.invert(breaks, out=previous)
+
+    # Leading matches extend the carried streak
+    first_break = _first_set_bits(breaks)
+    prefix = np.where(first_break >= 0, first_break, n_bits)
+    consumed = np.where(current_streak + prefix >= streak_target,
+                        streak_target - current_streak, -1)
+
+    # Later streaks need streak_target - 1 consecutive matches
+    window = streak_target - 1
+    covered = 1
+    while covered < window:
+        step = min(covered, window - covered)
+        matches &= _shift_up(matches, step)
+        covered += step
+
+    hit = _first_set_bits(matches)
+    consumed = np.where((consumed < 0) & (hit >= 0), hit + 1, consumed)
+
+    last_bit = (words[-1] >> np.uint64(WORD_BITS - 1)).astype(np.int8)
+    trailing = np.where(first_break >= 0, n_bits - _last_set_bits(breaks),
+                        current_streak + n_bits)
+    return consumed, last_bit, trailing
+
+
+def simulate_streak_runs(streak_target, num_runs, rng=None, memory_limit=MEMORY_LIMIT,
+                         metrics=None):
+    """
+    Simulate many independent runs of flip_until_streak_numpy at once.
+
+    Active runs are advanced together as the columns of a (chunk x runs)
+    block of bit-packed flips, with per-run last flip and current streak
+    vectors. Runs that reach the streak are recorded and dropped from the
+    active set. The chunk starts near the expected waiting time and doubles
+    after every block, but a block never holds more flips than fit in
+    `memory_limit` (about one byte of working memory per flip).
+
+    Args:
+        streak_target (int): Streak length to reach
+        num_runs (int): Number of independent runs
+        rng (np.random.Generator): Random generator (default: fresh generator)
+        memory_limit (int): Ceiling on a block's working memory in bytes
+        metrics (RunMetrics): Receives flips drawn, runs finished and
+            rng/reduction time per block
+
+    Returns:
+        np.ndarray: Flips after the first one needed by each run
+    """
+    if rng is None:
+        rng = np.random.default_rng()
+
+    hits = np.zeros(num_runs, dtype=np.int64)
+
+    # Start every run with a random flip
+    last_flip = rng.integers(0, 2, size=num_runs, dtype=np.int8)
+    if streak_target <= 1:
+        if metrics is not None:
+            metrics.add(runs=num_runs)
+        return hits
+
+    active = np.arange(num_runs)
+    current_streak = np.ones(num_runs, dtype=np.int64)
+    total_flips = 0
+
+    sizes = batch_sizes(streak_target, memory_limit)
+    while active.size:
+        chunk_words = max(1, min(-(-next(sizes) // WORD_BITS),
+                                 memory_limit // (active.size * WORD_BITS)))
+        start = time.perf_counter()
+        words = rng.bit_generator.random_raw(active.size * chunk_words)
+        drawn = time.perf_counter()
+        consumed, last_flip, current_streak = scan_streak_rows(
+            words.reshape(chunk_words, active.size), streak_target,
+            last_flip, current_streak
+        )
+
+        # Record finished runs and compact the active set
+        done = consumed >= 0
+        hits[active[done]] = total_flips + consumed[done]
+        active = active[~done]
+        last_flip = last_flip[~done]
+        current_streak = current_streak[~done]
+        total_flips += chunk_words * WORD_BITS
+        if metrics is not None:
+            metrics.add(flips=words.size * WORD_BITS, runs=np.count_nonzero(done),
+                        rng=drawn - start, reduction=time.perf_counter() - drawn)
+
+    return hits
+
+
+def sample_streak_attempts(streak_target, size, rng=None):
+    """
+    Sample waiting times for a streak from streak attempts instead of single flips.
+
+    After the seeding flip, every attempt either extends the streak to
+    `streak_target` (probability 2^-(n-1)) or breaks after k flips, where k
+    is a Geometric(1/2) length truncated to 1..n-1. The number of failed
+    attempts F is geometric, and given F the number of failed attempts of
+    each length k is Multinomial(F, p_k) with p_k proportional to 2^-k. A
+    waiting time is therefore the weighted sum of those counts plus the
+    n - 1 flips of the final attempt.
+
+    This has exactly the distribution of flip_until_streak_numpy, but a
+    waiting time costs O(n) draws however many attempts it took, so streaks
+    of 40-60 are as cheap as short ones.
+
+    Args:
+        streak_target (int): Streak length to reach (waiting times beyond
+            n = 59 no longer reliably fit in int64)
+        size (int): Number of waiting times to draw
+        rng (np.random.Generator): Random generator (default: fresh generator)
+
+    Returns:
+        np.ndarray: Flips after the first one needed for each sample
+
+    Raises:
+        OverflowError: If a sampled waiting time does not fit in int64
+    """
+    if rng is None:
+        rng = np.random.default_rng()
+    if streak_target <= 1:
+        return np.zeros(size, dtype=np.int64)
+
+    m = streak_target - 1
+    lengths = np.arange(1, m + 1, dtype=np.int64)
+    pvals = 0.5 ** lengths
+    pvals /= pvals.sum()
+
+    failures = rng.geometric(0.5 ** m, size=size) - 1
+    counts = rng.multinomial(failures, pvals)
+
+    if np.any(counts.astype(np.float64) @ lengths.astype(np.float64) >= 2.0 ** 63 - m):
+        raise OverflowError(f"Waiting time for a streak of {streak_target} exceeds int64")
+    return counts @ lengths + m
+
+
+def _sample_attempts_metered(streak_target, size, rng, metrics):
+    """sample_streak_attempts, counting the flips the samples stand for as simulated."""
+    start = time.perf_counter()
+    hits = sample_streak_attempts(streak_target, size, rng)
+    metrics.add(flips=hits.sum(dtype=np.float64), runs=size, rng=time.perf_counter() - start)
+    return hits
+
+
+def _per_target(max_streak, metrics, simulate):
+    """Columns simulate(streak_target) for every target, each timed as a metrics cell."""
+    columns = []
+    for streak_target in range(1, max_streak + 1):
+        with metrics.cell(streak_target):
+            columns.append(simulate(streak_target))
+    return columns
+
+
+def _simulate_shard(job, metrics=None):
+    """Simulate one shard of runs from its own seed sequence (process pool entry point)."""
+    seed_seq, num_runs, max_streak, single_pass, sampler, memory_limit = job
+    if metrics is None:
+        metrics = RunMetrics('shard')
+    rng = np.random.default_rng(seed_seq)
+    if sampler == 'attempts':
+        return np.column_stack(_per_target(
+            max_streak, metrics,
+            lambda streak_target: _sample_attempts_metered(streak_target, num_runs, rng, metrics)
+        )).reshape(num_runs, max_streak)
+    if single_pass:
+        with metrics.cell(f'1-{max_streak}'):
+            return np.array([flip_until_streaks(max_streak, rng, memory_limit=memory_limit,
+                                                metrics=metrics)
+                             for _ in range(num_runs)],
+                            dtype=np.int64).reshape(num_runs, max_streak)
+    return np.column_stack(_per_target(
+        max_streak, metrics,
+        lambda streak_target: simulate_streak_runs(streak_target, num_runs, rng,
+                                                   memory_limit=memory_limit, metrics=metrics)
+    )).reshape(num_runs, max_streak)
+
+
+def _collect_metrics(simulate, job):
+    """Run simulate(job, metrics) in a worker process; returns (result, metric counters)."""
+    metrics = RunMetrics('worker')
+    return simulate(job, metrics), metrics.as_dict()
+
+
+def seed_params(seed_seq):
+    """
+    JSON-friendly form of a seed sequence, enough to recreate it.
+
+    Args:
+        seed_seq (np.random.SeedSequence): Seed sequence
+
+    Returns:
+        dict: {'entropy': ..., 'spawn_key': [...]}, for
+            np.random.SeedSequence(entropy, spawn_key=spawn_key)
+    """
+    return {'entropy': seed_seq.entropy, 'spawn_key': list(seed_seq.spawn_key)}
+
+
+def _write_atomic(path, write):
+    """Write a file through a temporary name so readers never see it half-written."""
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        write(f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def checkpoint_seed(checkpoint_dir, seed=None, resume=False):
+    """
+    Master seed sequence of a checkpointed sweep.
+
+    A new sweep records its seed (including fresh entropy when seed is None)
+    in checkpoint_dir/seed.json; a resumed sweep reads it back so that an
+    unseeded sweep continues with the same streams.
+
+    Args:
+        checkpoint_dir (str): Checkpoint directory
+        seed (int or np.random.SeedSequence): Master seed (default: fresh entropy)
+        resume (bool): Reuse the recorded seed if there is one
+
+    Returns:
+        np.random.SeedSequence: Master seed sequence
+    """
+    seed_seq = seed if isinstance(seed, np.random.SeedSequence) else np.random.SeedSequence(seed)
+    path = os.path.join(checkpoint_dir, 'seed.json')
+    if resume and os.path.exists(path):
+        with open(path) as f:
+            stored = json.load(f)
+        if seed is not None and seed_params(seed_seq) != stored:
+            raise ValueError(f"Seed does not match the checkpoint in {checkpoint_dir}")
+        return np.random.SeedSequence(stored['entropy'], spawn_key=stored['spawn_key'])
+
+    os.makedirs(checkpoint_dir, exist_ok=True)
+    _write_atomic(path, lambda f: f.write(json.dumps(seed_params(seed_seq)).encode()))
+    return seed_seq
+
+
+def _open_checkpoint(checkpoint_dir, params, resume, num_shards):
+    """Validate or start a table checkpoint; returns the indices of the shards already finished."""
+    os.makedirs(checkpoint_dir, exist_ok=True)
+    params_path = os.path.join(checkpoint_dir, 'params.json')
+    shard_paths = [os.path.join(checkpoint_dir, f'shard_{index:05d}.npy')
+                   for index in range(num_shards)]
+
+    if resume and os.path.exists(params_path):
+        with open(params_path) as f:
+            stored = json.load(f)
+        if stored != params:
+            raise ValueError(f"Checkpoint in {checkpoint_dir} was made with different "
+                             f"parameters: {stored}")
+        finished = {index for index, path in enumerate(shard_paths) if os.path.exists(path)}
+        return shard_paths, finished
+
+    # Starting over: drop shards from an earlier sweep before recording the new one
+    for name in os.listdir(checkpoint_dir):
+        if name.startswith('shard_'):
+            os.remove(os.path.join(checkpoint_dir, name))
+    _write_atomic(params_path, lambda f: f.write(json.dumps(params).encode()))
+    return shard_paths, set()
+
+
+def simulate_streak_table(num_runs, max_streak, seed=None, workers=1, single_pass=False,
+                          sampler='flips', memory_limit=MEMORY_LIMIT, checkpoint_dir=None,
+                          resume=False, metrics=None):
+    """
+    Simulate every streak target 1..max_streak for a number of runs.
+
+    Runs are split into shards of SHARD_RUNS, each drawing from its own child
+    of the master seed sequence, and merged back in run order (see
+    iter_streak_table to consume the shards one at a time instead).
+
+    With checkpoint_dir every finished shard is saved there atomically as it
+    completes. With resume=True the shards already saved are loaded instead
+    of simulated, so an interrupted sweep picks up where it stopped and
+    produces the same table as an uninterrupted one; the parameters and seed
+    must match those of the checkpoint (see checkpoint_seed for unseeded
+    sweeps).
+
+    Args:
+        num_runs (int): Number of runs
+        max_streak (int): Longest streak target
+        seed (int or np.random.SeedSequence): Master seed (default: fresh entropy)
+        workers (int): Number of worker processes
+        single_pass (bool): Share one flip sequence across a run's targets
+            (see flip_until_streaks)
+        sampler (str): 'flips' to simulate every flip, or 'attempts' to draw
+            waiting times with sample_streak_attempts
+        memory_limit (int): Ceiling on a batch's working memory in bytes
+        checkpoint_dir (str): Directory for per-shard checkpoints (default: none)
+        resume (bool): Continue from the shards saved in checkpoint_dir
+        metrics (RunMetrics): Receives throughput and timings; per-target
+            seconds are summed over shards (and so over workers)
+
+    Returns:
+        np.ndarray: Flips required, one row per run and one column per target
+    """
+    tables = list(iter_streak_table(num_runs, max_streak, seed=seed, workers=workers,
+                                    single_pass=single_pass, sampler=sampler,
+                                    memory_limit=memory_limit, checkpoint_dir=checkpoint_dir,
+                                    resume=resume, metrics=metrics))
+    if not tables:
+        return np.zeros((0, max_streak), dtype=np.int64)
+    return np.concatenate(tables)
+
+
+def iter_streak_table(num_runs, max_streak, seed=None, workers=1, single_pass=False,
+                      sampler='flips', memory_limit=MEMORY_LIMIT, checkpoint_dir=None,
+                      resume=False, metrics=None):
+    """
+    Simulate the table of simulate_streak_table one shard at a time.
+
+    Yields the shards in run order; concatenated they are exactly the table
+    simulate_streak_table returns for the same arguments. With workers > 1
+    at most 2 * workers shards are simulated ahead of the one being
+    consumed, so memory depends on SHARD_RUNS and workers, not on num_runs.
+
+    Args:
+        Same as simulate_streak_table
+
+    Yields:
+        np.ndarray: Flips required of the next SHARD_RUNS runs (fewer for
+            the last shard), one column per target
+    """
+    if sampler not in ('flips', 'attempts'):
+        raise ValueError(f"Unknown sampler: {sampler}")
+    if sampler == 'attempts' and single_pass:
+        raise ValueError("single_pass requires the 'flips' sampler")
+
+    seed_seq = seed if isinstance(seed, np.random.SeedSequence) else np.random.SeedSequence(seed)
+    shard_sizes = [min(SHARD_RUNS, num_runs - start) for start in range(0, num_runs, SHARD_RUNS)]
+    jobs = [(child, size, max_streak, single_pass, sampler, memory_limit)
+            for child, size in zip(seed_seq.spawn(len(shard_sizes)), shard_sizes)]
+
+    shard_paths = None
+    finished = set()
+    if checkpoint_dir is not None:
+        # Everything that decides which flips land in which cell
+        params = {'num_runs': num_runs, 'max_streak': max_streak,
+                  'single_pass': single_pass, 'sampler': sampler,
+                  'memory_limit': memory_limit, 'shard_runs': SHARD_RUNS,
+                  'seed': seed_params(seed_seq)}
+        shard_paths, finished = _open_checkpoint(checkpoint_dir, params, resume, len(jobs))
+
+    def finish(index, table):
+        if shard_paths is not None:
+            _write_atomic(shard_paths[index], lambda f: np.save(f, table))
+        return table
+
+    pending = [index for index in range(len(jobs)) if index not in finished]
+    if workers > 1 and len(pending) > 1:
+        with ProcessPoolExecutor(max_workers=min(workers, len(pending))) as executor:
+            futures = {}
+            queue = iter(pending)
+            for index in range(len(jobs)):
+                # Keep the workers busy on the next few shards only
+                while len(futures) < 2 * workers:
+                    ahead = next(queue, None)
+                    if ahead is None:
+                        break
+                    futures[ahead] = executor.submit(_collect_metrics, _simulate_shard,
+                                                     jobs[ahead])
+                if index in finished:
+                    yield np.load(shard_paths[index])
+                    continue
+                table, counters = futures.pop(index).result()
+                if metrics is not None:
+                    metrics.merge(counters)
+                yield finish(index, table)
+    else:
+        for index in range(len(jobs)):
+            if index in finished:
+                yield np.load(shard_paths[index])
+            else:
+                yield finish(index, _simulate_shard(jobs[index], metrics))
+
+
+def _simulate_precise_target(job, metrics=None):
+    """Draw runs of one target until its mean is precise (process pool entry point)."""
+    seed_seq, streak_target, tolerance, min_runs, max_runs, sampler, confidence, memory_limit = job
+    if metrics is None:
+        metrics = RunMetrics('target')
+    rng = np.random.default_rng(seed_seq)
+    if sampler == 'attempts':
+        def draw(size):
+            return _sample_attempts_metered(streak_target, size, rng, metrics)
+    else:
+        def draw(size):
+            return simulate_streak_runs(streak_target, size, rng, memory_limit=memory_limit,
+                                        metrics=metrics)
+    with metrics.cell(streak_target):
+        return sample_until_precise(draw, tolerance,
+                                    lambda values: relative_half_width(values, confidence),
+                                    max_runs, min_samples=min_runs)
+
+
+def simulate_streak_until_precise(max_streak, tolerance, min_runs=100, max_runs=100000,
+                                  seed=None, workers=1, sampler='flips', confidence=0.95,
+                                  memory_limit=MEMORY_LIMIT, metrics=None):
+    """
+    Simulate each streak target until its mean flips are known to a relative tolerance.
+
+    Every target draws from its own child of the master seed sequence, so
+    the result for a given seed does not depend on `workers`.
+
+    Args:
+        max_streak (int): Longest streak target
+        tolerance (float): Target confidence-interval half-width relative to the mean
+        min_runs (int): Runs in the first batch of every target
+        max_runs (int): Budget of runs per target
+        seed (int or np.random.SeedSequence): Master seed (default: fresh entropy)
+        workers (int): Number of worker processes (one target per task)
+        sampler (str): 'flips' or 'attempts'
+        confidence (float): Two-sided confidence level
+        memory_limit (int): Ceiling on a batch's working memory in bytes
+        metrics (RunMetrics): Receives throughput and per-target timings
+
+    Returns:
+        tuple: (flips, half_widths) - a list with the runs of every target and
+            the relative half-width each target reached
+    """
+    if sampler not in ('flips', 'attempts'):
+        raise ValueError(f"Unknown sampler: {sampler}")
+
+    seed_seq = seed if isinstance(seed, np.random.SeedSequence) else np.random.SeedSequence(seed)
+    jobs = [(child, streak_target, tolerance, min_runs, max_runs, sampler, confidence, memory_limit)
+            for child, streak_target in zip(seed_seq.spawn(max_streak), range(1, max_streak + 1))]
+
+    if workers > 1 and len(jobs) > 1:
+        results = [None] * len(jobs)
+        with ProcessPoolExecutor(max_workers=min(workers, len(jobs))) as executor:
+            futures = {executor.submit(_collect_metrics, _simulate_precise_target, job): index
+                       for index, job in enumerate(jobs)}
+            for future in as_completed(futures):
+                results[futures[future]], counters = future.result()
+                if metrics is not None:
+                    metrics.merge(counters)
+    else:
+        results = [_simulate_precise_target(job, metrics) for job in jobs]
+
+    return [flips for flips, _, _ in results], np.array([width for _, width, _ in results])
@@ -0,0 +1,28 @@
+import unittest
+import numpy as np
+import pandas as pd
+import sys
+import os
+
+# Add parent directory to path to import from analyze_streak_results.py
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from analyze_streak_results import streak_statistics
+
+class TestAnalyzeStreakResults(unittest.TestCase):
+    def test_streak_statistics_match_groupby(self):
+        """Test that the precomputed plot data equals the per-streak groupby of the rows."""
+        rng = np.random.default_rng(0)
+        streaks = np.tile(np.arange(1, 9), 40)
+        df = pd.DataFrame({'Run': np.repeat(np.arange(1, 41), 8), 'Streak': streaks,
+                           'Flips': rng.geometric(0.5 ** streaks)})
+        stats = streak_statistics(df, 8)
+        flips = df.groupby('Streak')['Flips']
+        np.testing.assert_allclose(stats['mean'], flips.mean())
+        np.testing.assert_allclose(stats['std'], flips.std())
+        np.testing.assert_allclose(stats['median'], flips.median())
+        np.testing.assert_allclose(stats['trimmed_mean'], flips.apply(
+            lambda x: x.sort_values().iloc[int(0.05 * len(x)):int(0.95 * len(x))].mean()))
+        np.testing.assert_array_equal(stats['run_flips'], df['Flips'].to_numpy().reshape(40, 8))
+
+if __name__ == '__main__':
+    unittest.main()
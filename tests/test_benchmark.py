@@ -0,0 +1,29 @@
+import unittest
+import sys
+import os
+
+# Add parent directory to path to import from benchmark.py
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from benchmark import run_case, find_regressions, case_id
+
+class TestBenchmark(unittest.TestCase):
+    def test_run_case_records_every_metric(self):
+        """Test that a small case reports time, allocations and peak RSS."""
+        metrics = run_case('calculate_statistics', {'runs': 100, 'max_flips': 10}, repeat=1)
+        self.assertGreater(metrics['seconds'], 0)
+        self.assertGreater(metrics['alloc_peak_bytes'], 0)
+        self.assertGreater(metrics['peak_rss_bytes'], 0)
+
+    def test_regressions_need_relative_and_absolute_growth(self):
+        """Test that only growth past both the threshold and the noise floor counts."""
+        key = case_id('run_convergence_analysis', {'runs': 1000, 'max_flips': 50})
+        self.assertEqual(key, 'run_convergence_analysis[runs=1000,max_flips=50]')
+        baseline = {key: {'seconds': 1.0, 'alloc_peak_bytes': 1000, 'peak_rss_bytes': 2 ** 30}}
+        results = {key: {'seconds': 1.5, 'alloc_peak_bytes': 5000, 'peak_rss_bytes': 2 ** 30},
+                   'new_case': {'seconds': 9.0}}
+        self.assertEqual(find_regressions(results, baseline, threshold=0.25),
+                         [(key, 'seconds', 1.0, 1.5)])
+        self.assertEqual(find_regressions(results, baseline, threshold=0.6), [])
+
+if __name__ == '__main__':
+    unittest.main()
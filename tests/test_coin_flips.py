@@ -0,0 +1,27 @@
+import unittest
+import numpy as np
+import sys
+import os
+
+# Add parent directory to path to import from coin_flips.py
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from coin_flips import chunk_runs, count_heads, flip_coins, CHUNK_ALIGN
+
+class TestCoinFlips(unittest.TestCase):
+    def test_chunks_fit_budget_and_word_boundaries(self):
+        """Test that chunks are multiples of CHUNK_ALIGN runs within the budget."""
+        self.assertEqual(chunk_runs(10_000, 8 * 2**30), 858_976)
+        self.assertEqual(chunk_runs(10_000, 2**20) % CHUNK_ALIGN, 0)
+        self.assertLessEqual(chunk_runs(10_000, 2**20) * 10_000, 2**20)
+        self.assertEqual(chunk_runs(10**9, 2**20), CHUNK_ALIGN)
+
+    def test_chunked_head_counts_match_one_call(self):
+        """Test that counting heads chunk by chunk consumes the seed stream like one call."""
+        np.random.seed(7)
+        expected = flip_coins(1000, 53).sum(axis=1)
+        for memory_limit in [53 * 32, 53 * 96, 1]:
+            np.random.seed(7)
+            np.testing.assert_array_equal(count_heads(1000, 53, memory_limit), expected)
+
+if __name__ == '__main__':
+    unittest.main()
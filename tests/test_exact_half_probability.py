@@ -0,0 +1,119 @@
+import unittest
+import numpy as np
+import sys
+import os
+import contextlib
+import io
+import tempfile
+import pandas as pd
+from math import comb
+
+# Add parent directory to path to import from exact_half_probability.py
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from exact_half_probability import (run_equal_probability_analysis, probability_summary,
+                                    PATH_BYTES_PER_FLIP, RAW_COLUMNS)
+from result_writer import open_result_writer
+
+def _simulate(**kwargs):
+    """Run the analysis quietly, returning its counts and every streamed row."""
+    with tempfile.TemporaryDirectory() as tmp:
+        columns = RAW_COLUMNS[kwargs.get('mode', 'independent')]
+        with open_result_writer(os.path.join(tmp, 'rows'), columns) as writer, \
+                contextlib.redirect_stdout(io.StringIO()):
+            counts = run_equal_probability_analysis(writer=writer, **kwargs)
+        rows = pd.read_csv(writer.path, dtype={columns[2]: str})
+    return counts, rows
+
+class TestExactHalfProbability(unittest.TestCase):
+    def test_path_mode_reads_prefixes_of_one_walk(self):
+        """Test that every flip count of a run is a prefix of the same sequence."""
+        np.random.seed(0)
+        # Chunks of 32 runs
+        counts, df = _simulate(runs=70, max_flips=10, mode='path', memory_limit=PATH_BYTES_PER_FLIP * 10 * 32)
+        self.assertEqual(len(df), 70 * 5)
+        np.testing.assert_array_equal(np.sort(df['Flips']), np.repeat([2, 4, 6, 8, 10], 70))
+        np.testing.assert_array_equal(counts['Equal_Runs'],
+                                      df.groupby('Flips')['IsEqual'].sum())
+        # Every row holds the flips since the previous flip count
+        self.assertNotIn('Sequence', df.columns)
+        self.assertTrue((df['Segment'].str.len() == 2).all())
+        for _, walk in df.sort_values('Flips').groupby('Run'):
+            prefixes = walk['Segment'].cumsum()
+            for prefix, flips, is_equal in zip(prefixes, walk['Flips'], walk['IsEqual']):
+                self.assertEqual(len(prefix), flips)
+                self.assertEqual(is_equal, prefix.count('H') * 2 == flips)
+
+    def test_path_sample_keeps_whole_walks(self):
+        """Test that a raw sample in path mode holds the same runs for every flip count."""
+        np.random.seed(5)
+        with tempfile.TemporaryDirectory() as tmp:
+            with open_result_writer(os.path.join(tmp, 'rows'),
+                                    RAW_COLUMNS['path'], sample_rows=20,
+                                    sample_by='Flips', seed=0) as writer, \
+                    contextlib.redirect_stdout(io.StringIO()):
+                run_equal_probability_analysis(runs=300, max_flips=30, mode='path',
+                                               flip_counts=[2, 10, 30], memory_limit=PATH_BYTES_PER_FLIP * 30 * 64,
+                                               writer=writer)
+            df = pd.read_csv(writer.path, dtype={'Segment': str})
+        runs = [sorted(group['Run']) for _, group in df.groupby('Flips')]
+        self.assertEqual(len(runs[0]), 20)
+        self.assertTrue(all(group == runs[0] for group in runs))
+        walks = df.sort_values('Flips').groupby('Run')['Segment'].sum()
+        self.assertTrue((walks.str.len() == 30).all())
+
+    def test_path_mode_matches_theory(self):
+        """Test that path-mode frequencies agree with C(n, n/2) / 2^n."""
+        np.random.seed(1)
+        with contextlib.redirect_stdout(io.StringIO()):
+            counts = run_equal_probability_analysis(runs=20000, max_flips=20, mode='path')
+        self.assertTrue((counts['Total_Runs'] == 20000).all())
+        empirical = counts['Equal_Runs'] / counts['Total_Runs']
+        for n, probability in zip(counts['Flips'], empirical):
+            expected = comb(n, n // 2) / 2 ** n
+            self.assertAlmostEqual(probability, expected,
+                                   delta=4 * np.sqrt(expected * (1 - expected) / 20000),
+                                   msg=f"Failed for n={n}")
+
+    def test_grid_of_flip_counts(self):
+        """Test that both modes simulate exactly the flip counts of a grid."""
+        for mode in ['independent', 'path']:
+            np.random.seed(2)
+            counts, df = _simulate(runs=50, max_flips=40, mode=mode, flip_counts=[2, 8, 40])
+            self.assertEqual(counts['Flips'].tolist(), [2, 8, 40])
+            np.testing.assert_array_equal(np.sort(df['Flips']), np.repeat([2, 8, 40], 50))
+            if mode == 'independent':
+                self.assertTrue((df['Sequence'].str.len() == df['Flips']).all())
+            else:
+                walks = df.sort_values('Flips').groupby('Run')['Segment'].sum()
+                self.assertTrue((walks.str.len() == 40).all())
+        with self.assertRaises(ValueError):
+            run_equal_probability_analysis(runs=5, max_flips=10, flip_counts=[2, 12])
+
+    def test_memory_limit_does_not_change_results(self):
+        """Test that chunking runs to a memory budget reproduces the unchunked results."""
+        for mode in ['independent', 'path']:
+            frames = []
+            # One chunk, chunks of 32 runs, and the minimum chunk over budget
+            bytes_per_flip = PATH_BYTES_PER_FLIP if mode == 'path' else 1
+            for memory_limit in [2**30, bytes_per_flip * 24 * 32, 1]:
+                np.random.seed(3)
+                counts, df = _simulate(runs=100, max_flips=24, mode=mode,
+                                       memory_limit=memory_limit)
+                # Path mode streams rows chunk by chunk
+                frames.append((counts, df.sort_values(['Flips', 'Run'], ignore_index=True)))
+            for counts, df in frames[1:]:
+                self.assertTrue(counts.equals(frames[0][0]), msg=f"Failed for mode={mode}")
+                self.assertTrue(df.equals(frames[0][1]), msg=f"Failed for mode={mode}")
+
+    def test_summary_matches_rows(self):
+        """Test that the summary from counts equals the groupby over the streamed rows."""
+        np.random.seed(4)
+        counts, df = _simulate(runs=300, max_flips=12, tolerance=0.05, max_runs=2000)
+        expected = df.groupby('Flips')['IsEqual'].agg(['count', 'mean', 'std']).reset_index()
+        summary = probability_summary(counts)
+        np.testing.assert_array_equal(summary['Total_Runs'], expected['count'])
+        np.testing.assert_allclose(summary['Empirical_Probability'], expected['mean'])
+        np.testing.assert_allclose(summary['Standard_Deviation'], expected['std'])
+
+if __name__ == '__main__':
+    unittest.main()
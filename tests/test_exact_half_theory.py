@@ -0,0 +1,37 @@
+import unittest
+import numpy as np
+from math import comb, pi, sqrt
+import sys
+import os
+
+# Add parent directory to path to import from exact_half_theory.py
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from exact_half_theory import exact_half_probability, log_exact_half_probability, SERIES_FROM
+
+class TestExactHalfTheory(unittest.TestCase):
+    def test_matches_exact_binomials(self):
+        """Test that the array API agrees with big-integer binomials on both sides of the series cutoff."""
+        ns = np.array(list(range(0, 4 * SERIES_FROM + 1)) + [1000, 1075, 5000, 100000])
+        # Integer true division is correctly rounded, even where 0.5 ** n underflows
+        expected = np.array([comb(int(n), int(n) // 2) / 2 ** int(n) if n % 2 == 0 else 0.0
+                             for n in ns])
+        np.testing.assert_allclose(exact_half_probability(ns), expected, rtol=2e-15, atol=0)
+        self.assertGreater(exact_half_probability(1076), 0)
+
+    def test_very_large_n(self):
+        """Test that the probability stays accurate up to a billion flips."""
+        for n in [10**6, 10**9, 2 * 10**9]:
+            # C(n, n/2) 2^-n = sqrt(2 / (pi n)) (1 - 1/(4n) + 1/(32n^2) + O(1/n^3))
+            expected = sqrt(2 / (pi * n)) * (1 - 1 / (4 * n) + 1 / (32 * n**2))
+            self.assertAlmostEqual(exact_half_probability(n) / expected, 1, delta=1e-14)
+        self.assertEqual(log_exact_half_probability(10**9 + 1), -np.inf)
+
+    def test_scalars_and_arrays_agree(self):
+        """Test that cached scalar calls return the same values as array calls."""
+        ns = np.arange(1, 200)
+        values = exact_half_probability(ns)
+        self.assertEqual([exact_half_probability(int(n)) for n in ns], values.tolist())
+        self.assertIsInstance(exact_half_probability(np.int64(10)), float)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,45 @@
+import unittest
+import tempfile
+import sys
+import os
+
+# Add parent directory to path to import from figure_pool.py
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from figure_pool import FigurePool
+from analyze_trimmed_data import plot_trimmed_comparison
+
+def _stats(scale, max_streak=10):
+    return {'trimmed_means': [scale * 2 ** n for n in range(1, max_streak + 1)],
+            'exact_trimmed_means': [2 ** n for n in range(1, max_streak + 1)]}
+
+def _failing_plot(results_dir):
+    raise ValueError("cannot draw")
+
+class TestFigurePool(unittest.TestCase):
+    def test_inline_rendering(self):
+        """Test that without workers each figure is drawn as it is submitted."""
+        with tempfile.TemporaryDirectory() as results_dir:
+            with FigurePool(0) as figures:
+                figures.render(plot_trimmed_comparison, _stats(0.9), _stats(1.0), _stats(1.1),
+                               10, results_dir)
+                self.assertTrue(os.path.exists(os.path.join(results_dir, 'trimmed_comparison_n10.png')))
+            with self.assertRaises(ValueError):
+                FigurePool(0).render(_failing_plot, results_dir)
+
+    def test_workers_render_figures_and_raise_errors(self):
+        """Test that worker processes save every figure and re-raise plot errors on close."""
+        with tempfile.TemporaryDirectory() as results_dir:
+            with FigurePool(2) as figures:
+                for max_streak in [10, 20]:
+                    stats = [_stats(scale, max_streak) for scale in (0.9, 1.0, 1.1)]
+                    figures.render(plot_trimmed_comparison, *stats, max_streak, results_dir)
+            self.assertEqual(sorted(os.listdir(results_dir)),
+                             ['trimmed_comparison_n10.png', 'trimmed_comparison_n20.png'])
+
+            figures = FigurePool(1)
+            figures.render(_failing_plot, results_dir)
+            with self.assertRaises(ValueError):
+                figures.close()
+
+if __name__ == '__main__':
+    unittest.main()
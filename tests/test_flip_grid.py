@@ -0,0 +1,38 @@
+import unittest
+import numpy as np
+import sys
+import os
+
+# Add parent directory to path to import from flip_grid.py
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from flip_grid import flip_grid
+
+class TestFlipGrid(unittest.TestCase):
+    def test_linear_grid_matches_every_flip_count(self):
+        """Test that linear grids visit every (even) flip count up to max_flips."""
+        np.testing.assert_array_equal(flip_grid(100), np.arange(2, 101))
+        np.testing.assert_array_equal(flip_grid(100, even=True), np.arange(2, 101, 2))
+
+    def test_log_grid_size_grows_with_decades(self):
+        """Test that a log grid spans 2..max_flips with even counts and about fixed points per decade."""
+        grid = flip_grid(10**6, 'log', points_per_decade=20)
+        self.assertEqual((grid[0], grid[-1]), (2, 10**6))
+        self.assertTrue(np.all(grid % 2 == 0))
+        self.assertTrue(np.all(np.diff(grid) > 0))
+        # Six orders of magnitude cost about as many flip counts as the 2..100 linear sweep
+        self.assertLessEqual(len(grid), 20 * 6 + 1)
+        self.assertLess(len(flip_grid(10**6, 'log', points_per_decade=5)), len(grid))
+        self.assertEqual(flip_grid(99, 'log')[-1], 98)
+
+    def test_custom_grid(self):
+        """Test that custom grids are sorted, deduplicated and validated."""
+        np.testing.assert_array_equal(flip_grid(0, 'custom', flips=[10, 4, 10]), [4, 10])
+        with self.assertRaises(ValueError):
+            flip_grid(0, 'custom', flips=[4, 7], even=True)
+        with self.assertRaises(ValueError):
+            flip_grid(0, 'custom', flips=[1, 4])
+        with self.assertRaises(ValueError):
+            flip_grid(100, 'cubic')
+
+if __name__ == '__main__':
+    unittest.main()
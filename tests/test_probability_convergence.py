@@ -6,7 +6,17 @@ import os
 
 # Add parent directory to path to import from probability_convergence.py
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from probability_convergence import theoretical_probability, theoretical_convergence
+from probability_convergence import (
+    theoretical_probability, theoretical_convergence, run_convergence_analysis,
+    calculate_statistics, HeadCountHistogram, histogram_statistics, comprehensive_fits,
+    calculate_fit_statistics, plot_comprehensive_analysis, write_comprehensive_analysis
+)
+from flip_grid import flip_grid
+import pandas as pd
+from scipy.stats import ks_2samp
+import contextlib
+import io
+import tempfile
 
 class TestProbabilityConvergence(unittest.TestCase):
     def test_theoretical_convergence(self):
@@ -51,5 +61,132 @@ class TestProbabilityConvergence(unittest.TestCase):
                           f"Probability should decrease for n={n}")
             prev_prob = curr_prob
 
+    def test_results_use_compact_columns(self):
+        """Test that results are laid out flip count by flip count in compact dtypes."""
+        np.random.seed(0)
+        with contextlib.redirect_stdout(io.StringIO()):
+            df = run_convergence_analysis(runs=50, max_flips=6)
+        self.assertEqual(df.dtypes.tolist(), [np.uint32, np.uint16, np.float64])
+        np.testing.assert_array_equal(df['Run'], np.tile(np.arange(1, 51), 5))
+        np.testing.assert_array_equal(df['Flips'], np.repeat(np.arange(2, 7), 50))
+        # Every probability is a whole number of heads over the flip count
+        heads = df['Probability'] * df['Flips']
+        np.testing.assert_allclose(heads, np.round(heads), atol=1e-12)
+
+    def test_binomial_sampler_matches_matrix_sampler(self):
+        """Test that drawing head counts directly gives the same distribution as flipping."""
+        np.random.seed(1)
+        with contextlib.redirect_stdout(io.StringIO()):
+            matrix = run_convergence_analysis(runs=5000, max_flips=30)
+            binomial = run_convergence_analysis(runs=5000, max_flips=30, sampler='binomial',
+                                                rng=np.random.default_rng(2))
+        self.assertEqual(binomial.dtypes.tolist(), matrix.dtypes.tolist())
+        for flip_count in [2, 7, 30]:
+            self.assertGreater(ks_2samp(matrix[matrix['Flips'] == flip_count]['Probability'],
+                                        binomial[binomial['Flips'] == flip_count]['Probability']
+                                        ).pvalue, 0.001, msg=f"Failed for n={flip_count}")
+        stats = calculate_statistics(binomial)
+        np.testing.assert_allclose(stats['Std'], theoretical_convergence(stats['Flips']), rtol=0.05)
+
+    def test_histogram_statistics_match_row_statistics(self):
+        """Test that stats from head-count histograms equal stats over every run."""
+        rng = np.random.default_rng(3)
+        rows, histograms = [], {}
+        for flip_count in [1, 2, 7, 30]:
+            histograms[flip_count] = HeadCountHistogram(flip_count)
+            # Add in batches so the stored range has to grow
+            for size in [1, 40, 997]:
+                heads = rng.binomial(flip_count, 0.5, size=size)
+                histograms[flip_count].add(heads)
+                rows.append(pd.DataFrame({'Flips': flip_count, 'Probability': heads / flip_count}))
+        expected = calculate_statistics(pd.concat(rows))
+        actual = histogram_statistics(histograms)
+        self.assertEqual(actual.columns.tolist(), expected.columns.tolist())
+        np.testing.assert_array_equal(actual[['Flips', 'Count']], expected[['Flips', 'Count']])
+        np.testing.assert_array_equal(actual[['Q1', 'Median', 'Q3', 'Min', 'Max']],
+                                      expected[['Q1', 'Median', 'Q3', 'Min', 'Max']])
+        np.testing.assert_allclose(actual[['Mean', 'Std']], expected[['Mean', 'Std']], rtol=1e-12)
+        np.testing.assert_allclose(actual['Exact_50_Frequency'], expected['Exact_50_Frequency'],
+                                   rtol=1e-12)
+
+    def test_row_and_histogram_paths_agree(self):
+        """Test that stats over the returned rows equal the histogram stats of the same runs."""
+        for sampler in ['matrix', 'binomial']:
+            np.random.seed(5)
+            histograms = {}
+            with contextlib.redirect_stdout(io.StringIO()):
+                df = run_convergence_analysis(runs=2000, max_flips=40, sampler=sampler,
+                                              rng=np.random.default_rng(5),
+                                              histograms=histograms)
+            expected = calculate_statistics(df)
+            actual = histogram_statistics(histograms)
+            self.assertEqual(actual.columns.tolist(), expected.columns.tolist())
+            for column in expected.columns:
+                np.testing.assert_allclose(actual[column], expected[column], rtol=1e-12,
+                                           atol=1e-15, err_msg=f"Failed for {sampler} {column}")
+
+    def test_statistics_count_exact_half_runs(self):
+        """Test that the stats table records the share of runs with exactly 50% heads."""
+        df = pd.DataFrame({'Flips': [2, 2, 2, 2, 3, 3, 4, 4],
+                           'Probability': [0.5, 0.0, 0.5, 1.0, 1 / 3, 2 / 3, 0.5, 0.25]})
+        stats = calculate_statistics(df)
+        self.assertEqual(stats['Exact_50_Frequency'].tolist(), [0.5, 0.0, 0.5])
+
+    def test_histograms_without_rows(self):
+        """Test that histograms can be collected without keeping any run."""
+        histograms = {}
+        with contextlib.redirect_stdout(io.StringIO()):
+            df = run_convergence_analysis(runs=500, max_flips=8, sampler='binomial',
+                                          rng=np.random.default_rng(4),
+                                          histograms=histograms, keep_rows=False)
+        self.assertIsNone(df)
+        self.assertEqual(sorted(histograms), list(range(2, 9)))
+        self.assertEqual(histograms[8].total, 500)
+        self.assertAlmostEqual(histograms[2].exact_half_frequency(), 0.5, delta=0.1)
+        self.assertEqual(histograms[3].exact_half_frequency(), 0.0)
+
+    def test_log_grid_to_a_million_flips(self):
+        """Test that a log grid reaches a million flips and the stats follow the grid."""
+        grid = flip_grid(10**6, 'log', points_per_decade=4)
+        histograms = {}
+        with contextlib.redirect_stdout(io.StringIO()):
+            run_convergence_analysis(runs=2000, sampler='binomial', rng=np.random.default_rng(5),
+                                     histograms=histograms, keep_rows=False, flip_counts=grid)
+        stats = histogram_statistics(histograms)
+        np.testing.assert_array_equal(stats['Flips'], grid)
+        np.testing.assert_allclose(stats['Std'], theoretical_convergence(stats['Flips']), rtol=0.1)
+        np.testing.assert_allclose(stats['Exact_50_Frequency'], theoretical_probability(grid),
+                                   atol=0.04)
+
+    def test_memory_limit_does_not_change_results(self):
+        """Test that chunking the matrix sampler to a memory budget reproduces the unchunked results."""
+        frames = []
+        for memory_limit in [2**30, 37 * 32, 1]:
+            np.random.seed(6)
+            with contextlib.redirect_stdout(io.StringIO()):
+                frames.append(run_convergence_analysis(runs=100, max_flips=37,
+                                                       memory_limit=memory_limit))
+        for df in frames[1:]:
+            self.assertTrue(df.equals(frames[0]))
+
+    def test_fits_skip_grids_they_cannot_fit(self):
+        """Test that grids without even counts, or with one flip count, still get their reports."""
+        for grid in [[11, 21, 31, 41], [10000]]:
+            histograms = {}
+            with contextlib.redirect_stdout(io.StringIO()):
+                run_convergence_analysis(runs=500, sampler='binomial', rng=np.random.default_rng(7),
+                                         histograms=histograms, keep_rows=False, flip_counts=grid)
+            stats = histogram_statistics(histograms)
+            fits = comprehensive_fits(stats)
+            self.assertIsNone(fits['popt_exact'])
+            self.assertIsNone(fits['fitted_std'])
+            with tempfile.TemporaryDirectory() as results_dir:
+                calculate_fit_statistics(stats, results_dir)
+                plot_comprehensive_analysis(fits, results_dir)
+                write_comprehensive_analysis(fits, results_dir)
+                self.assertEqual(sorted(os.listdir(results_dir)),
+                                 ['comprehensive_analysis.md', 'comprehensive_analysis.png',
+                                  'statistical_analysis.md'])
+
 if __name__ == '__main__':
     unittest.main() 
\ No newline at end of file
@@ -0,0 +1,96 @@
+import unittest
+import numpy as np
+import pandas as pd
+import sys
+import os
+import tempfile
+
+# Add parent directory to path to import from run_progressive_analysis.py
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import run_progressive_analysis
+import streak_engine
+from run_progressive_analysis import run_progressive_simulations, progressive_prefix_stats
+from streak_engine import simulate_streak_table
+
+class TestProgressiveAnalysis(unittest.TestCase):
+    def test_prefix_stats_match_nested_groupby(self):
+        """Test that prefix aggregates reproduce the groupby over nested sets."""
+        cwd = os.getcwd()
+        with tempfile.TemporaryDirectory() as tmp:
+            os.chdir(tmp)
+            try:
+                df = run_progressive_simulations(max_runs=25, max_streak=8, seed=3,
+                                                 incremental=True)
+            finally:
+                os.chdir(cwd)
+        self.assertEqual(len(df), 25 * 8)
+        
+        # Expand into the quadratic table the non-incremental mode would group
+        nested = pd.concat([df[df['Current Run'] <= k].assign(**{'Total Runs': k})
+                            for k in range(1, 26)])
+        expected = nested.groupby('Total Runs').agg({
+            'Absolute Difference': ['mean', 'std', 'min', 'max'],
+            'Percentage Difference': ['mean', 'std', 'min', 'max']
+        }).reset_index()
+        expected.columns = ['_'.join(col).strip() for col in expected.columns.values]
+        
+        actual = progressive_prefix_stats(df.sample(frac=1, random_state=0))
+        self.assertEqual(list(actual.columns), list(expected.columns))
+        for column in expected.columns:
+            np.testing.assert_allclose(actual[column], expected[column], rtol=1e-9,
+                                       err_msg=f"Failed for {column}")
+
+    def test_streamed_stats_match_groupby(self):
+        """Test that statistics computed while streaming equal the groupby over the rows."""
+        cwd = os.getcwd()
+        with tempfile.TemporaryDirectory() as tmp:
+            os.chdir(tmp)
+            try:
+                df = run_progressive_simulations(max_runs=12, max_streak=6, seed=5)
+                actual = run_progressive_simulations(max_runs=12, max_streak=6, seed=5,
+                                                     keep_rows=False)
+            finally:
+                os.chdir(cwd)
+        expected = df.groupby('Total Runs').agg({
+            'Absolute Difference': ['mean', 'std', 'min', 'max'],
+            'Percentage Difference': ['mean', 'std', 'min', 'max']
+        }).reset_index()
+        expected.columns = ['_'.join(col).strip() for col in expected.columns.values]
+        self.assertEqual(list(actual.columns), list(expected.columns))
+        for column in expected.columns:
+            np.testing.assert_allclose(actual[column], expected[column], rtol=1e-9,
+                                       err_msg=f"Failed for {column}")
+
+    def test_simulated_blocks_do_not_grow_with_max_runs(self):
+        """Test that sets are simulated shard by shard, with the same rows as one table."""
+        original_shard_runs = streak_engine.SHARD_RUNS
+        original_iter = run_progressive_analysis.iter_streak_table
+        blocks = []
+        
+        def recording_iter(*args, **kwargs):
+            for shard in original_iter(*args, **kwargs):
+                blocks.append(len(shard))
+                yield shard
+        
+        cwd = os.getcwd()
+        streak_engine.SHARD_RUNS = 7
+        run_progressive_analysis.iter_streak_table = recording_iter
+        try:
+            with tempfile.TemporaryDirectory() as tmp:
+                os.chdir(tmp)
+                largest = {}
+                for max_runs in [10, 30]:
+                    blocks.clear()
+                    df = run_progressive_simulations(max_runs=max_runs, max_streak=4, seed=8)
+                    largest[max_runs] = max(blocks)
+            expected = simulate_streak_table(30 * 31 // 2, 4, seed=8)
+        finally:
+            os.chdir(cwd)
+            run_progressive_analysis.iter_streak_table = original_iter
+            streak_engine.SHARD_RUNS = original_shard_runs
+        
+        self.assertEqual(largest, {10: 7, 30: 7})
+        np.testing.assert_array_equal(df['Flips Required'].to_numpy(), expected.ravel())
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,156 @@
+import unittest
+import numpy as np
+import pandas as pd
+import sys
+import os
+import tempfile
+
+# Add parent directory to path to import from result_writer.py
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from result_writer import (ResultWriter, ColumnarWriter, ReservoirWriter, is_columnar,
+                           load_columns, open_result_writer)
+
+class TestResultWriter(unittest.TestCase):
+    def test_chunks_match_single_to_csv(self):
+        """Test that streamed chunks produce the same file as one to_csv call."""
+        rng = np.random.default_rng(0)
+        columns = ['Run', 'Flips', 'Probability', 'IsEqual']
+        chunks = []
+        for flips in range(2, 12):
+            size = int(rng.integers(1, 40))
+            chunks.append({
+                'Run': np.arange(1, size + 1),
+                'Flips': flips,
+                'Probability': rng.random(size),
+                'IsEqual': rng.random(size) < 0.5
+            })
+        expected = pd.DataFrame({column: np.concatenate(
+            [np.broadcast_to(chunk[column], len(chunk['Run'])) for chunk in chunks])
+            for column in columns})
+        
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'out.csv')
+            with ResultWriter(path, columns, chunk_rows=17) as writer:
+                for chunk in chunks:
+                    writer.write(chunk)
+            self.assertEqual(writer.rows_written, len(expected))
+            with open(path) as f:
+                self.assertEqual(f.read(), expected.to_csv(index=False))
+
+    def test_reused_buffers_are_copied(self):
+        """Test that a caller may overwrite an array after handing it over."""
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'out.csv')
+            buffer = np.zeros(5, dtype=np.int64)
+            with ResultWriter(path, ['Value'], chunk_rows=1000) as writer:
+                for value in range(3):
+                    buffer[:] = value
+                    writer.write({'Value': buffer})
+            self.assertEqual(pd.read_csv(path)['Value'].tolist(), [0] * 5 + [1] * 5 + [2] * 5)
+
+    def test_missing_column_raises(self):
+        """Test that a chunk without every column is rejected before anything is queued."""
+        with tempfile.TemporaryDirectory() as tmp:
+            with ResultWriter(os.path.join(tmp, 'out.csv'), ['A', 'B']) as writer:
+                with self.assertRaises(KeyError):
+                    writer.write({'A': np.arange(3)})
+
+    def test_columnar_store_round_trip(self):
+        """Test that a columnar store loads back memory-mapped with its parameters."""
+        rng = np.random.default_rng(1)
+        probability = rng.random(100)
+        sequences = np.array(['HT' * (i % 5 + 1) for i in range(100)], dtype=object)
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'out.cols')
+            with ColumnarWriter(path, ['Run', 'Probability', 'Sequence'], chunk_rows=30,
+                                params={'runs': 100}, dtypes={'Sequence': 'S10'}) as writer:
+                self.assertFalse(is_columnar(path))
+                for start in range(0, 100, 7):
+                    writer.write({'Run': np.arange(start, min(start + 7, 100)),
+                                  'Probability': probability[start:start + 7],
+                                  'Sequence': sequences[start:start + 7]})
+            self.assertTrue(is_columnar(path))
+            
+            df = load_columns(path)
+            self.assertEqual(df.attrs['params'], {'runs': 100})
+            self.assertEqual(list(df.columns), ['Run', 'Probability', 'Sequence'])
+            np.testing.assert_array_equal(df['Run'], np.arange(100))
+            np.testing.assert_array_equal(df['Probability'], probability)
+            self.assertEqual(df['Sequence'].tolist(), sequences.tolist())
+            # Numeric columns are the read-only mapped files, not copies
+            self.assertFalse(df['Probability'].to_numpy().flags.writeable)
+            del df
+
+    def test_columnar_strings_need_width(self):
+        """Test that variable-width strings are rejected without a fixed dtype."""
+        with tempfile.TemporaryDirectory() as tmp:
+            writer = ColumnarWriter(os.path.join(tmp, 'out.cols'), ['Sequence'])
+            writer.write({'Sequence': np.array(['HT', 'HHT'], dtype=object)})
+            with self.assertRaises(IOError):
+                writer.close()
+            self.assertFalse(is_columnar(os.path.join(tmp, 'out.cols')))
+
+    def test_reservoir_keeps_real_rows_per_group(self):
+        """Test that the sample holds at most the requested rows of each group, in arrival order."""
+        with tempfile.TemporaryDirectory() as tmp:
+            with open_result_writer(os.path.join(tmp, 'sample'), ['Run', 'Flips', 'Probability'],
+                                    'columnar', params={'runs': 30}, sample_rows=8,
+                                    sample_by='Flips', seed=1) as writer:
+                for first in range(1, 31, 7):
+                    runs = np.arange(first, min(first + 7, 31))
+                    # Chunks mixing two flip counts, plus one short group
+                    writer.write({'Run': np.concatenate([runs, runs]),
+                                  'Flips': np.repeat([4, 2], len(runs)),
+                                  'Probability': np.concatenate([runs / 100, runs / 1000])})
+                writer.write({'Run': [1, 2, 3], 'Flips': 6, 'Probability': 0.5})
+            self.assertIsInstance(writer, ReservoirWriter)
+            self.assertEqual((writer.rows_seen, writer.rows_written), (63, 19))
+            df = load_columns(writer.path)
+        self.assertEqual(df.attrs['params']['sample_rows'], 8)
+        self.assertEqual(df['Flips'].tolist(), [2] * 8 + [4] * 8 + [6] * 3)
+        for flips, scale in [(2, 1000), (4, 100)]:
+            group = df[df['Flips'] == flips]
+            self.assertTrue(group['Run'].is_monotonic_increasing)
+            np.testing.assert_allclose(group['Probability'], group['Run'] / scale)
+
+    def test_reservoir_sample_is_uniform(self):
+        """Test that every row is equally likely to be kept, wherever it arrived."""
+        kept = np.zeros(50)
+        for seed in range(2000):
+            writer = ReservoirWriter('unused', ['Run', 'Flips'], 'Flips', rows=10, seed=seed)
+            for chunk in np.split(np.arange(50), [3, 10, 11, 30]):
+                writer.write({'Run': chunk, 'Flips': 4})
+            sample = writer.sample()['Run']
+            self.assertEqual(len(np.unique(sample)), 10)
+            kept[sample] += 1
+        # Each row is kept with probability 10 / 50
+        np.testing.assert_allclose(kept / 2000, 0.2, atol=0.04)
+
+    def test_lazy_columns_are_built_for_kept_rows(self):
+        """Test that a column given as a function is only evaluated for rows that are written."""
+        built = []
+
+        def labels(runs):
+            def build(rows):
+                built.append(len(rows))
+                return np.array([f'run{run}' for run in runs[rows]], dtype=object)
+            return build
+
+        writer = ReservoirWriter('unused', ['Run', 'Flips', 'Label'], 'Flips', rows=5, seed=0)
+        for first in range(0, 1000, 100):
+            runs = np.arange(first, first + 100)
+            writer.write({'Run': runs, 'Flips': 4, 'Label': labels(runs)})
+        sample = writer.sample()
+        self.assertEqual([f'run{run}' for run in sample['Run']], sample['Label'].tolist())
+        self.assertLess(sum(built), 100)
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'out.csv')
+            with ResultWriter(path, ['Run', 'Label'], chunk_rows=64) as full:
+                runs = np.arange(150)
+                full.write({'Run': runs, 'Label': labels(runs)})
+            df = pd.read_csv(path)
+        self.assertEqual(df['Label'].tolist(), [f'run{run}' for run in range(150)])
+
+if __name__ == '__main__':
+    unittest.main()
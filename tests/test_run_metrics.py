@@ -0,0 +1,65 @@
+import unittest
+import sys
+import os
+import json
+import tempfile
+import time
+
+# Add parent directory to path to import from run_metrics.py
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from run_metrics import RunMetrics
+from streak_engine import simulate_streak_table
+import streak_engine
+
+class TestRunMetrics(unittest.TestCase):
+    def test_cells_and_phases(self):
+        """Test that work inside a cell is counted for the cell and the totals."""
+        metrics = RunMetrics('test')
+        with metrics.cell(3):
+            metrics.add(flips=30, runs=10, rng=0.5)
+            metrics.add(flips=6, runs=2, rng=0.25, reduction=0.1)
+        metrics.add(output=0.2)
+        counters = metrics.as_dict()
+        self.assertEqual((counters['flips'], counters['runs']), (36, 12))
+        self.assertEqual(counters['cells']['3']['runs'], 12)
+        self.assertGreater(counters['cells']['3']['seconds'], 0)
+        self.assertEqual(counters['phases'], {'rng': 0.75, 'reduction': 0.1, 'output': 0.2})
+
+    def test_snapshots_are_written_periodically(self):
+        """Test that the snapshot file is rewritten while running and finalized on close."""
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'metrics.json')
+            with RunMetrics('test', path, interval=0.01) as metrics:
+                metrics.add(flips=100, runs=1)
+                time.sleep(0.1)
+                with open(path) as f:
+                    snapshot = json.load(f)
+                self.assertEqual(snapshot['status'], 'running')
+                self.assertEqual(snapshot['flips'], 100)
+            with open(path) as f:
+                snapshot = json.load(f)
+            self.assertEqual(snapshot['status'], 'finished')
+            self.assertEqual(os.listdir(tmp), ['metrics.json'])
+
+    def test_table_metrics_independent_of_worker_count(self):
+        """Test that merged worker metrics count the same work as a serial sweep."""
+        original = streak_engine.SHARD_RUNS
+        streak_engine.SHARD_RUNS = 7
+        try:
+            serial, parallel = RunMetrics('serial'), RunMetrics('parallel')
+            table = simulate_streak_table(30, 6, seed=4, metrics=serial)
+            simulate_streak_table(30, 6, seed=4, workers=3, metrics=parallel)
+            serial, parallel = serial.as_dict(), parallel.as_dict()
+            self.assertEqual(serial['runs'], 30 * 6)
+            self.assertEqual(serial['flips'], parallel['flips'])
+            self.assertEqual(serial['runs'], parallel['runs'])
+            self.assertEqual(sorted(serial['cells']), [str(n) for n in range(1, 7)])
+            # Every run draws whole words, at least as many flips as it needed
+            self.assertGreaterEqual(serial['flips'], table.sum())
+            self.assertGreater(serial['phases']['rng'], 0)
+            self.assertGreater(serial['phases']['reduction'], 0)
+        finally:
+            streak_engine.SHARD_RUNS = original
+
+if __name__ == '__main__':
+    unittest.main()
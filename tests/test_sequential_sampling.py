@@ -0,0 +1,52 @@
+import unittest
+import numpy as np
+import sys
+import os
+
+# Add parent directory to path to import from sequential_sampling.py
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from sequential_sampling import (
+    sample_until_precise, mean_half_width, proportion_half_width
+)
+from streak_engine import simulate_streak_until_precise
+
+class TestSequentialSampling(unittest.TestCase):
+    def test_stops_once_precise(self):
+        """Test that sampling stops just past the tolerance, not far beyond it."""
+        rng = np.random.default_rng(0)
+        samples, width, converged = sample_until_precise(
+            lambda n: rng.normal(0, 1, n), 0.02, mean_half_width, 10 ** 6)
+        self.assertTrue(converged)
+        self.assertLessEqual(width, 0.02)
+        # (1.96 / 0.02)^2 = 9604 samples are needed for unit variance
+        self.assertGreater(len(samples), 8000)
+        self.assertLess(len(samples), 13000)
+
+    def test_respects_budget(self):
+        """Test that a cell stops at its budget when the tolerance is out of reach."""
+        rng = np.random.default_rng(1)
+        samples, width, converged = sample_until_precise(
+            lambda n: rng.normal(0, 1, n), 1e-4, mean_half_width, 5000)
+        self.assertFalse(converged)
+        self.assertEqual(len(samples), 5000)
+        self.assertGreater(width, 1e-4)
+
+    def test_proportion_width_without_successes(self):
+        """Test that a proportion with no successes is not treated as exact."""
+        self.assertGreater(proportion_half_width(np.zeros(100, dtype=bool)), 0.01)
+        self.assertLess(proportion_half_width(np.zeros(100000, dtype=bool)), 1e-4)
+
+    def test_streak_targets_get_their_own_sample_sizes(self):
+        """Test that every streak target reaches the relative tolerance with its own run count."""
+        flips, widths = simulate_streak_until_precise(8, 0.05, min_runs=50, seed=4)
+        self.assertTrue(np.all(widths <= 0.05))
+        self.assertEqual(len(flips[0]), 50)  # a streak of one is exact
+        for streak_target, target_flips in enumerate(flips[1:], start=2):
+            self.assertAlmostEqual(target_flips.mean() / (2 ** streak_target - 2), 1, delta=0.15)
+        
+        again, _ = simulate_streak_until_precise(8, 0.05, min_runs=50, seed=4)
+        for first, second in zip(flips, again):
+            np.testing.assert_array_equal(first, second)
+
+if __name__ == '__main__':
+    unittest.main()
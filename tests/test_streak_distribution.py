@@ -0,0 +1,57 @@
+import unittest
+import numpy as np
+import sys
+import os
+
+# Add parent directory to path to import from streak_distribution.py
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import streak_distribution
+from streak_engine import simulate_streak_runs
+
+class TestStreakDistribution(unittest.TestCase):
+    def test_small_streak_probabilities(self):
+        """Test exact probabilities that can be counted by hand."""
+        # n=2: every counted flip matches with probability 1/2
+        self.assertAlmostEqual(streak_distribution.pmf(2, 1), 0.5)
+        self.assertAlmostEqual(streak_distribution.survival(2, 3), 0.125)
+        # n=3: needs two matches in a row, P(T=2) = 1/4, P(T=3) = 1/8
+        np.testing.assert_allclose(streak_distribution.pmf(3, [0, 1, 2, 3, 4]),
+                                   [0, 0, 0.25, 0.125, 0.125])
+        # n=1: the seeding flip alone completes the streak
+        self.assertEqual(streak_distribution.cdf(1, 0), 1)
+
+    def test_moments_match_pmf(self):
+        """Test closed-form mean and variance against sums over the PMF."""
+        for n in [2, 3, 5, 8]:
+            t = np.arange(0, 200000)
+            p = streak_distribution.pmf(n, t)
+            self.assertAlmostEqual(p.sum(), 1, places=12)
+            expected_mean = (t * p).sum()
+            self.assertAlmostEqual(streak_distribution.mean(n), expected_mean, places=6)
+            expected_var = (t * t * p).sum() - expected_mean ** 2
+            self.assertAlmostEqual(streak_distribution.variance(n) / expected_var, 1, places=9)
+
+    def test_long_streaks_stay_finite(self):
+        """Test that the tail is evaluated without building huge tables."""
+        for n in [30, 45, 60]:
+            self.assertAlmostEqual(streak_distribution.trimmed_mean(n, 0) / (2 ** n - 2), 1,
+                                   places=9)
+            median = streak_distribution.median(n)
+            self.assertAlmostEqual(median / (np.log(2) * 2 ** n), 1, places=3)
+            if n <= 45:
+                # Beyond this, neighbouring survival values are closer than float spacing
+                self.assertGreaterEqual(streak_distribution.cdf(n, median), 0.5)
+                self.assertLess(streak_distribution.cdf(n, median - 1), 0.5)
+
+    def test_matches_simulation(self):
+        """Test quantiles and trimmed mean against a large simulation."""
+        hits = np.sort(simulate_streak_runs(10, 200000, np.random.default_rng(0)))
+        for level in [0.1, 0.5, 0.9]:
+            exact = streak_distribution.quantile(10, level)
+            self.assertAlmostEqual(np.quantile(hits, level) / exact, 1, delta=0.02)
+        trim = int(len(hits) * 0.02)
+        self.assertAlmostEqual(hits[trim:-trim].mean() / streak_distribution.trimmed_mean(10, 0.02),
+                               1, delta=0.01)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,204 @@
+import unittest
+import numpy as np
+import sys
+import os
+
+# Add parent directory to path to import from streak_engine.py
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from streak_engine import (
+    scan_streak_scalar, scan_streak_rle, scan_streak_bitpacked,
+    scan_streak_rows, unpack_words, flip_until_streak_numpy,
+    flip_until_streaks, simulate_streak_runs, simulate_streak_table,
+    FlipBuffer, batch_sizes, sample_streak_attempts
+)
+from scipy.stats import ks_2samp
+import streak_engine
+import tempfile
+
+class TestStreakEngine(unittest.TestCase):
+    def test_rle_matches_scalar_scan(self):
+        """Test that the RLE kernel agrees with the scalar loop on random batches."""
+        rng = np.random.default_rng(12345)
+        for _ in range(200):
+            flips = rng.integers(0, 2, size=rng.integers(1, 200), dtype=np.int8)
+            streak_target = int(rng.integers(2, 8))
+            last_flip = int(rng.integers(0, 2))
+            current_streak = int(rng.integers(1, streak_target))
+            expected = scan_streak_scalar(flips, streak_target, last_flip, current_streak)
+            actual = scan_streak_rle(flips, streak_target, last_flip, current_streak)
+            self.assertEqual(actual[0], expected[0])
+            if expected[0] is None:
+                self.assertEqual(actual[1:], expected[1:])
+
+    def test_backends_agree_across_batches(self):
+        """Test that hitting times match the scalar loop when streaks span batches."""
+        for seed in range(20):
+            for streak_target in [1, 2, 5, 9]:
+                expected = flip_until_streak_numpy(
+                    streak_target, np.random.default_rng(seed), backend='scalar', max_batch=7)
+                actual = flip_until_streak_numpy(
+                    streak_target, np.random.default_rng(seed), backend='rle', max_batch=7)
+                self.assertEqual(actual, expected,
+                                 msg=f"Failed for seed={seed}, n={streak_target}")
+
+    def test_bitpacked_matches_scalar_scan(self):
+        """Test that the word-level kernel agrees with the scalar loop on the same bits."""
+        rng = np.random.default_rng(2024)
+        for _ in range(300):
+            words = rng.bit_generator.random_raw(int(rng.integers(1, 4)))
+            streak_target = int(rng.integers(2, 80))
+            last_flip = int(rng.integers(0, 2))
+            current_streak = int(rng.integers(1, streak_target))
+            flips = unpack_words(words)
+            expected = scan_streak_scalar(flips, streak_target, last_flip, current_streak)
+            actual = scan_streak_bitpacked(words, streak_target, last_flip, current_streak)
+            self.assertEqual(actual[0], expected[0])
+            if expected[0] is None:
+                self.assertEqual(actual[1:], expected[1:])
+
+    def test_bitpacked_carries_state_across_batches(self):
+        """Test hitting times on fixed seeds when streaks span many word batches."""
+        for seed in range(10):
+            for streak_target in [6, 12, 14]:
+                rng = np.random.default_rng(seed)
+                words = rng.bit_generator.random_raw(4096)
+                state = (None, 0, 1)
+                expected = scan_streak_scalar(unpack_words(words), streak_target, 0, 1)[0]
+                consumed = 0
+                for batch in np.split(words, 2048):
+                    state = scan_streak_bitpacked(batch, streak_target, *state[1:])
+                    if state[0] is not None:
+                        consumed += state[0]
+                        break
+                    consumed += len(batch) * 64
+                self.assertEqual(consumed if state[0] is not None else None, expected,
+                                 msg=f"Failed for seed={seed}, n={streak_target}")
+
+    def test_single_pass_matches_per_target_scans(self):
+        """Test that one sequence yields the first hitting time of every target."""
+        for seed in range(10):
+            hits = flip_until_streaks(8, np.random.default_rng(seed), max_batch=7)
+            
+            # Replay the same stream and scan it once per target
+            rng = np.random.default_rng(seed)
+            first_flip = int(rng.integers(0, 2))
+            buffer = FlipBuffer()
+            flips = np.concatenate([buffer.draw(rng, 7).copy() for _ in range(200)])
+            for streak_target in range(2, 9):
+                expected = scan_streak_scalar(flips, streak_target, first_flip, 1)[0]
+                self.assertEqual(hits[streak_target - 1], expected,
+                                 msg=f"Failed for seed={seed}, n={streak_target}")
+            self.assertEqual(hits[0], 0)
+
+    def test_rows_match_scalar_scan(self):
+        """Test that every column of a batched block matches the scalar loop."""
+        rng = np.random.default_rng(99)
+        for _ in range(20):
+            words = rng.bit_generator.random_raw((3, 50))
+            streak_target = int(rng.integers(2, 70))
+            last_flip = rng.integers(0, 2, size=50, dtype=np.int8)
+            current_streak = rng.integers(1, streak_target, size=50)
+            consumed, last, streak = scan_streak_rows(
+                words, streak_target, last_flip, current_streak)
+            for col in range(50):
+                expected = scan_streak_scalar(unpack_words(words[:, col]), streak_target,
+                                              last_flip[col], current_streak[col])
+                if expected[0] is None:
+                    self.assertEqual(consumed[col], -1)
+                    self.assertEqual((last[col], streak[col]), expected[1:])
+                else:
+                    self.assertEqual(consumed[col], expected[0])
+
+    def test_batched_runs_mean(self):
+        """Test that batched runs average close to the expected 2^n - 2 flips."""
+        hits = simulate_streak_runs(8, 20000, np.random.default_rng(7), memory_limit=50_000)
+        self.assertEqual(len(hits), 20000)
+        self.assertTrue(np.all(hits >= 7))
+        self.assertAlmostEqual(hits.mean(), 2 ** 8 - 2, delta=(2 ** 8) * 0.03)
+
+    def test_table_independent_of_worker_count(self):
+        """Test that a seeded table is bit-identical for any number of workers."""
+        original = streak_engine.SHARD_RUNS
+        streak_engine.SHARD_RUNS = 7
+        try:
+            for single_pass in [False, True]:
+                serial = simulate_streak_table(30, 6, seed=42, workers=1,
+                                               single_pass=single_pass)
+                parallel = simulate_streak_table(30, 6, seed=42, workers=3,
+                                                 single_pass=single_pass)
+                self.assertEqual(serial.shape, (30, 6))
+                np.testing.assert_array_equal(serial, parallel)
+        finally:
+            streak_engine.SHARD_RUNS = original
+
+    def test_resume_matches_uninterrupted_table(self):
+        """Test that a sweep killed mid-way resumes to the same table."""
+        original_shard_runs = streak_engine.SHARD_RUNS
+        original_simulate = streak_engine._simulate_shard
+        streak_engine.SHARD_RUNS = 7
+        calls = []
+        limit = [3]
+        
+        def counting(job, metrics=None):
+            # Simulate a kill after `limit` shards
+            if len(calls) == limit[0]:
+                raise KeyboardInterrupt
+            calls.append(job)
+            return original_simulate(job, metrics)
+        
+        try:
+            expected = simulate_streak_table(40, 6, seed=9)
+            streak_engine._simulate_shard = counting
+            with tempfile.TemporaryDirectory() as tmp:
+                with self.assertRaises(KeyboardInterrupt):
+                    simulate_streak_table(40, 6, seed=9, checkpoint_dir=tmp)
+                
+                # Only the unfinished shards are simulated again
+                calls.clear()
+                limit[0] = None
+                resumed = simulate_streak_table(40, 6, seed=9, checkpoint_dir=tmp, resume=True)
+                np.testing.assert_array_equal(resumed, expected)
+                self.assertEqual(len(calls), 3)
+                
+                with self.assertRaises(ValueError):
+                    simulate_streak_table(40, 5, seed=9, checkpoint_dir=tmp, resume=True)
+        finally:
+            streak_engine.SHARD_RUNS = original_shard_runs
+            streak_engine._simulate_shard = original_simulate
+
+    def test_flip_buffer_unpacks_raw_words(self):
+        """Test that buffered draws are the bits of the raw words and reuse memory."""
+        buffer = FlipBuffer()
+        first = buffer.draw(np.random.default_rng(5), 1000)
+        expected = unpack_words(np.random.default_rng(5).bit_generator.random_raw(16))[:1000]
+        np.testing.assert_array_equal(first, expected)
+        second = buffer.draw(np.random.default_rng(6), 500)
+        self.assertTrue(np.shares_memory(first, second))
+
+    def test_batch_sizes_grow_from_expected_wait(self):
+        """Test that batches start at the expected wait, double, and respect the ceiling."""
+        sizes = batch_sizes(10, 5000)
+        self.assertEqual([next(sizes) for _ in range(4)], [1022, 2044, 4088, 5000])
+        self.assertEqual(next(batch_sizes(1, 5000)), 64)
+        self.assertEqual(next(batch_sizes(40, 5000)), 5000)
+
+    def test_attempt_sampler_matches_flip_simulation(self):
+        """Test that attempt-level samples follow the flip-level distribution."""
+        for streak_target in [2, 3, 5, 7]:
+            flips = simulate_streak_runs(streak_target, 20000, np.random.default_rng(1))
+            attempts = sample_streak_attempts(streak_target, 20000, np.random.default_rng(2))
+            self.assertGreater(ks_2samp(flips, attempts).pvalue, 0.001,
+                               msg=f"Failed for n={streak_target}")
+            self.assertTrue(np.all(attempts >= streak_target - 1))
+
+    def test_attempt_sampler_long_streak_mean(self):
+        """Test that long streaks are cheap to sample and average 2^n - 2 flips."""
+        hits = sample_streak_attempts(45, 40000, np.random.default_rng(3))
+        self.assertAlmostEqual(hits.mean() / (2 ** 45 - 2), 1, delta=0.03)
+
+    def test_streak_of_one_needs_no_flips(self):
+        """Test that the seeding flip alone completes a streak of one."""
+        self.assertEqual(flip_until_streak_numpy(1, np.random.default_rng(0)), 0)
+
+if __name__ == '__main__':
+    unittest.main()